@@ -9,7 +9,7 @@ const Init = require(__dirname + "/driver/init.js");
 const Storage = require(__dirname + "/driver/storage.js");
 
 const { ScrapeWithTimeout } = require(__dirname + "/driver/scrape.js");
-const { IsValidHttpUrl } = require(__dirname + "/helpers/utils.js");
+const { IsValidHttpUrl, IsValidFolderName } = require(__dirname + "/helpers/utils.js");
 
 const config = require(__dirname + "/configs/puppeteer.json");
 
@@ -44,7 +44,8 @@ async function CollectTraces(website, listName) {
 function ProcessCliArguments(args) {
     assert(typeof(args) == "object");
 
-    if (args.length !== 1) return null;
+    if (args.length < 1 || args.length > 2) return null;
+    if (args.length === 2 && !IsValidFolderName(args[1])) return null;
 
     let target = args[0];
 
@@ -57,15 +58,23 @@ function ProcessCliArguments(args) {
 }
 
 function Usage() {
-    console.log("Usage: node app.js <targetURL>");
-    console.log("    targetURL\t\tThe URL of the website to crawl\n");
+    console.log("Usage: node app.js <targetURL> [folder]");
+    console.log("    targetURL\t\tThe URL of the website to crawl");
+    console.log("    folder\t\tName of the results folder (default: derived from the hostname)\n");
     console.log("Read the documentation for more information.")
     return 0;
 }
 
+/****** Exports ******/
+
+module.exports = {
+    ProcessCliArguments
+};
+
 /****** Main ******/
 
-(async function main() {
+/* Only run as a command; service.js requires this file */
+if (require.main === module) (async function main() {
 
     try {
 
@@ -77,7 +86,8 @@ function Usage() {
         const target = args;
         const label = (new URL(target)).hostname;
 
-        const dir = Storage.GetTracesDir(label, __dirname + config.outputPath);
+        const folder = process.argv[3];
+        const dir = Storage.GetTracesDir(label, __dirname + config.outputPath, folder);
 
         console.log("[INFO] Crawling", target);
         const traces = await CollectTraces(target, label);
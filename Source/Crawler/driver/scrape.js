@@ -15,17 +15,18 @@ const config = require(__dirname + "/../configs/puppeteer.json");
 
 const PAGE_LOAD_OPTIONS = Init.GetPageLoadOptions(config);
 
+/* Origins whose storage must be cleared before the next cleared-context
+ * visit. An origin stays here until its storage was actually cleared. */
+const ClearedOrigins = new Set();
+
 /****** Functions ******/
 
-async function Scrape(browser, targetURL, listName) {
-    assert(typeof(browser) == "object");
-    assert(typeof(browser.newPage) == "function");
+async function ScrapePage(page, targetURL, listName) {
+    assert(typeof(page) == "object");
+    assert(typeof(page.goto) == "function");
     assert(typeof(targetURL) == "string" && targetURL.length);
     assert(typeof(listName) == "string" && listName.length);
 
-    const pages = await browser.pages();
-    const page = pages[0];
-
     const client = await page.target().createCDPSession();
     assert(typeof(client) == "object");
 
@@ -53,8 +54,6 @@ async function Scrape(browser, targetURL, listName) {
         "landingWebsite": page.url()
     };
 
-    await browser.close();
-
     return {
         "requests": requests,
         "cookies": firstPartyCookies,
@@ -65,26 +64,99 @@ async function Scrape(browser, targetURL, listName) {
     };
 }
 
-async function ScrapeWithTimeout(browser, targetURL, listName, timeout) {
+/* One website per browser: uses the initial tab and closes the browser */
+async function Scrape(browser, targetURL, listName) {
+    assert(typeof(browser) == "object");
+    assert(typeof(browser.newPage) == "function");
+
+    const pages = await browser.pages();
+    const traces = await ScrapePage(pages[0], targetURL, listName);
+
+    await browser.close();
+
+    return traces;
+}
+
+/* One website in a fresh incognito context of a long-lived browser. The
+ * context has its own cookie jar and storage and is discarded afterwards. */
+async function ScrapeInContext(browser, targetURL, listName) {
+    assert(typeof(browser) == "object");
+    assert(typeof(browser.createIncognitoBrowserContext) == "function");
+
+    const context = await browser.createIncognitoBrowserContext();
+    try {
+        const page = await context.newPage();
+        return await ScrapePage(page, targetURL, listName);
+    } finally {
+        await context.close().catch(_ => {});
+    }
+}
+
+/* One website in the default context of a long-lived browser, so that
+ * extensions such as Consent-O-Matic (not enabled in incognito contexts)
+ * keep working. Cookies, storage and cache of the previous site are
+ * cleared before the visit and the tab is closed afterwards. */
+async function ScrapeInClearedContext(browser, targetURL, listName) {
+    assert(typeof(browser) == "object");
+    assert(typeof(browser.newPage) == "function");
+
+    const page = await browser.newPage();
+    try {
+        const client = await page.target().createCDPSession();
+        await client.send("Network.clearBrowserCookies");
+        await client.send("Network.clearBrowserCache");
+        for (const origin of [...ClearedOrigins]) {
+            await client.send("Storage.clearDataForOrigin", { "origin": origin, "storageTypes": "all" });
+            ClearedOrigins.delete(origin);
+        }
+        await client.detach();
+
+        /* Recorded as the page goes, so a scrape that fails half-way still
+         * gets every origin it wrote to cleared before the next site */
+        page.on("request", request => RememberOrigin(request.url()));
+        page.on("framenavigated", frame => RememberOrigin(frame.url()));
+        return await ScrapePage(page, targetURL, listName);
+    } finally {
+        RememberOrigin(page.url());
+        await page.close().catch(_ => {});
+    }
+}
+
+function RememberOrigin(url) {
+    try {
+        const origin = (new URL(url)).origin;
+        if (origin !== "null") ClearedOrigins.add(origin);
+    } catch (e) {
+        /* Not a URL with an origin (e.g. data:) */
+    }
+}
+
+async function ScrapeWithTimeout(browser, targetURL, listName, timeout, scrape = Scrape) {
     assert(typeof(browser) == "object");
     assert(typeof(browser.newPage) == "function");
     assert(typeof(targetURL) == "string" && targetURL.length);
     assert(typeof(listName) == "string" && listName.length);
     assert(typeof(timeout) == "number" && timeout > 0);
+    assert(typeof(scrape) == "function");
+
+    let timer = null;
 
     return new Promise((resolve, reject) => {
-        Scrape(browser, targetURL, listName).then(resolve).catch(reject);
+        scrape(browser, targetURL, listName).then(resolve).catch(reject);
 
-        setTimeout(_ => {
+        timer = setTimeout(_ => {
             browser.process().kill("SIGKILL");
             reject("Hard timeout of " + timeout + " ms exceeded");
         }, timeout);
 
-    });
+    }).finally(() => clearTimeout(timer));
 }
 
 /****** Exports ******/
 
 module.exports = {
+    Scrape,
+    ScrapeInContext,
+    ScrapeInClearedContext,
     ScrapeWithTimeout
 };
\ No newline at end of file
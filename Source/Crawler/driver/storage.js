@@ -4,15 +4,22 @@
 
 const assert = require("assert");
 const fs     = require("fs");
+const zlib   = require("zlib");
 
 const tracesConfig = require(__dirname + "/../configs/traces.json");
 
-const { SanitizeUrlName } = require(__dirname + "/../helpers/utils.js");
+const { SanitizeUrlName, IsValidFolderName } = require(__dirname + "/../helpers/utils.js");
 
 /****** Definitions ******/
 
 const JSON_FORMAT_IDENTATION = 2;
 
+/* "json" keeps the indented files; ".gz" compresses them and "ndjson"
+ * writes arrays one element per line (objects stay JSON) */
+const TRACE_FORMATS = ["json", "json.gz", "ndjson", "ndjson.gz"];
+const TRACE_FORMAT = tracesConfig.format || "json";
+assert(TRACE_FORMATS.includes(TRACE_FORMAT), "Unknown trace format: " + TRACE_FORMAT);
+
 /****** Functions ******/
 
 function StoreString(data, filename) {
@@ -27,12 +34,60 @@ function StoreString(data, filename) {
     });
 }
 
-function StoreJson(json, filename) {
-    assert(typeof(json) == "object");
+function StoreBuffer(data, filename) {
+    assert(Buffer.isBuffer(data));
     assert(typeof(filename) == "string" && filename.length);
 
-    let data = JSON.stringify(json, null, JSON_FORMAT_IDENTATION);
-    return StoreString(data, filename);
+    return new Promise((resolve, reject) => {
+        fs.writeFile(filename, data, err => {
+            if (err) reject(err);
+            else resolve(data);
+        });
+    });
+}
+
+function Gzip(data) {
+    return new Promise((resolve, reject) => {
+        zlib.gzip(data, (err, buffer) => {
+            if (err) reject(err);
+            else resolve(buffer);
+        });
+    });
+}
+
+/* Removes the copies of a trace stored in other formats by earlier runs,
+ * so readers never pick up a stale one */
+function RemoveOtherFormats(filename, kept) {
+    const base = filename.slice(0, -".json".length);
+    for (const format of TRACE_FORMATS) {
+        const other = base + "." + format;
+        if (other != kept) fs.rmSync(other, { force: true });
+    }
+}
+
+/* `filename` ends in ".json"; the stored file gets the extension of the
+ * configured trace format, e.g. "/requests.ndjson.gz" */
+async function StoreJson(json, filename) {
+    assert(typeof(json) == "object");
+    assert(typeof(filename) == "string" && filename.endsWith(".json"));
+
+    let target = filename;
+    let data;
+    if (TRACE_FORMAT == "json") {
+        data = JSON.stringify(json, null, JSON_FORMAT_IDENTATION);
+    } else if (TRACE_FORMAT.startsWith("ndjson") && Array.isArray(json)) {
+        target = filename.slice(0, -".json".length) + ".ndjson";
+        data = json.map(item => JSON.stringify(item) + "\n").join("");
+    } else {
+        data = JSON.stringify(json);
+    }
+    if (TRACE_FORMAT.endsWith(".gz")) target += ".gz";
+
+    RemoveOtherFormats(filename, target);
+    if (target.endsWith(".gz")) {
+        return StoreBuffer(await Gzip(data), target);
+    }
+    return StoreString(data, target);
 }
 
 function EnsureDirectoryExists(dir) {
@@ -72,11 +127,15 @@ async function StoreTraces(traces, targetDir) {
     await Promise.all(promises).catch(error => { throw String(error) });
 }
 
-function GetTracesDir(website, resultsDir) {
+/* The site's folder under resultsDir: `folder` if given, otherwise derived
+ * from the website's hostname */
+function GetTracesDir(website, resultsDir, folder) {
     assert(typeof(website) == "string" && website.length);
     assert(typeof(resultsDir) == "string" && resultsDir.length);
+    assert(folder === undefined || IsValidFolderName(folder));
 
     if (!resultsDir.endsWith("/")) resultsDir += "/"
+    if (folder !== undefined) return resultsDir + folder;
     return resultsDir + SanitizeUrlName(website);
 }
 
@@ -46,9 +46,18 @@ function IsValidHttpUrl(str) {
     }
 }
 
+/* Results folder names chosen by the caller (domain_list.site_folder):
+ * a single path component of letters, digits, '.', '_' and '-' */
+function IsValidFolderName(str) {
+    assert(typeof(str) == "string");
+
+    return /^[A-Za-z0-9._-]{1,255}$/.test(str) && str !== "." && str !== "..";
+}
+
 /****** Exports ******/
 
 module.exports = {
     SanitizeUrlName,
-    IsValidHttpUrl
+    IsValidHttpUrl,
+    IsValidFolderName
 };
\ No newline at end of file
@@ -0,0 +1,203 @@
+"use strict";
+
+/****** Dependencies ******/
+
+const puppeteer = require("puppeteer");
+const assert    = require("assert");
+const fs        = require("fs");
+const readline  = require("readline");
+const util      = require("util");
+
+const Init = require(__dirname + "/driver/init.js");
+const Storage = require(__dirname + "/driver/storage.js");
+
+const { ScrapeWithTimeout, ScrapeInContext, ScrapeInClearedContext } = require(__dirname + "/driver/scrape.js");
+const { ProcessCliArguments } = require(__dirname + "/app.js");
+
+const config = require(__dirname + "/configs/puppeteer.json");
+
+/****** Definitions ******/
+
+const BROWSER_OPTIONS = Init.GetBrowserOptions(config);
+
+/* "incognito": a fresh incognito context per site (extensions do not run
+ * there); "cleared": the default context, wiped between sites */
+const SCRAPE_IN_SITE_CONTEXT = {
+    "incognito": ScrapeInContext,
+    "cleared": ScrapeInClearedContext
+}[config.siteIsolation || "cleared"];
+
+/* How often the browser's memory is sampled during a crawl (ms) */
+const RSS_SAMPLE_INTERVAL = 1000;
+
+/* The warm browser and the number of sites it has crawled */
+let Browser = null;
+let BrowserSites = 0;
+
+/****** Functions ******/
+
+/* Resident memory (MB) of a process and its descendants; null where /proc
+ * is not available. Chrome keeps most of its memory in child processes. */
+function GetTreeRssMb(pid) {
+    assert(typeof(pid) == "number");
+
+    try {
+        const status = fs.readFileSync("/proc/" + pid + "/status", "utf8");
+        const match = status.match(/VmRSS:\s+(\d+) kB/);
+        let total = (match ? parseInt(match[1]) : 0) / 1024;
+
+        const children = fs.readFileSync("/proc/" + pid + "/task/" + pid + "/children", "utf8");
+        for (const child of children.split(" ").filter(x => x.length)) {
+            total += GetTreeRssMb(parseInt(child)) || 0;
+        }
+        return total;
+    } catch (e) {
+        return null;
+    }
+}
+
+async function GetBrowser() {
+    if (Browser && Browser.isConnected()) return Browser;
+
+    Browser = await puppeteer.launch(BROWSER_OPTIONS);
+    BrowserSites = 0;
+    console.log("[INFO] Created browser instance");
+    return Browser;
+}
+
+/* Closes the browser after `browserRecycleSites` sites or once it grows past
+ * `browserRecycleRssMb`; the next site starts a new one */
+async function RecycleBrowser(force) {
+    if (!Browser) return;
+
+    const rss = Browser.isConnected() ? GetTreeRssMb(Browser.process().pid) : null;
+    const expired = BrowserSites >= config.browserRecycleSites;
+    const bloated = rss !== null && rss > config.browserRecycleRssMb;
+    if (!force && Browser.isConnected() && !expired && !bloated) return;
+
+    console.log("[INFO] Recycling browser after", BrowserSites, "sites" +
+                (rss !== null ? " (" + rss.toFixed(0) + " MB)" : ""));
+    const browser = Browser;
+    Browser = null;
+    await browser.close().catch(_ => {
+        const proc = browser.process();
+        if (proc) proc.kill("SIGKILL");
+    });
+}
+
+/* Runs fn() with console output redirected into a buffer, so stdout only
+ * carries protocol lines. Returns [result, output]; a thrown error is
+ * returned as the result. */
+async function Captured(fn) {
+    assert(typeof(fn) == "function");
+
+    const saved = { log: console.log, info: console.info, warn: console.warn, error: console.error };
+    let output = [];
+    const capture = (...args) => { output.push(util.format(...args)); };
+    console.log = console.info = console.warn = console.error = capture;
+
+    let result;
+    try {
+        result = await fn();
+    } catch (e) {
+        result = (e instanceof Error) ? e : new Error(String(e));
+    } finally {
+        Object.assign(console, saved);
+    }
+    return [result, output.join("\n")];
+}
+
+/* Same steps as app.js, with a warm browser and a per-site context */
+async function HandleRequest(request) {
+    assert(typeof(request) == "object" && request !== null);
+
+    const folder = (request.folder === undefined) ? undefined : String(request.folder);
+    const target = ProcessCliArguments(folder === undefined ? [String(request.url)]
+                                                            : [String(request.url), folder]);
+    if (!target) {
+        return { "id": request.id, "ok": false,
+                 "error": "Invalid URL or folder: " + request.url + " " + request.folder };
+    }
+
+    const started = process.hrtime.bigint();
+    let peakRss = null;
+    const [dir, output] = await Captured(async () => {
+        const label = (new URL(target)).hostname;
+        const dir = Storage.GetTracesDir(label, __dirname + config.outputPath, folder);
+
+        console.log("[INFO] Crawling", target);
+        const browser = await GetBrowser();
+        BrowserSites += 1;
+
+        const SampleRss = () => {
+            const rss = browser.isConnected() ? GetTreeRssMb(browser.process().pid) : null;
+            if (rss !== null) peakRss = Math.max(peakRss || 0, rss);
+        };
+        const sampler = setInterval(SampleRss, RSS_SAMPLE_INTERVAL);
+        let traces = null;
+        try {
+            traces = await ScrapeWithTimeout(browser, target, label, config.hardTimeout * 1000,
+                                             SCRAPE_IN_SITE_CONTEXT);
+        } catch (err) {
+            console.error("Error at", target + ": ", err);
+        } finally {
+            clearInterval(sampler);
+            SampleRss();
+        }
+        await RecycleBrowser(false);
+
+        if (!traces) throw new Error("No traces collected");
+        await Storage.StoreTraces(traces, dir);
+        console.log("[INFO] Process complete");
+        return dir;
+    });
+
+    let response = { "id": request.id, "ok": true, "output": output };
+    if (dir instanceof Error) {
+        response.ok = false;
+        response.error = "[ERROR] " + dir.message;
+    } else {
+        response.dir = dir;
+    }
+    response.duration = Number(process.hrtime.bigint() - started) / 1e9;
+    if (peakRss !== null) response.metrics = { "peak_rss_mb": Math.round(peakRss * 10) / 10 };
+    return response;
+}
+
+function Reply(response) {
+    process.stdout.write(JSON.stringify(response) + "\n");
+}
+
+/****** Main ******/
+
+/* JSON-lines protocol over stdin/stdout, one site at a time:
+ *   in:  {"id": 1, "url": "https://www.example.com", "folder": "example.com_f9b0c7780e"}
+ *   out: {"id": 1, "ok": true, "dir": ".../Results/example.com_f9b0c7780e",
+ *         "output": "...", "duration": 12.3, "metrics": {"peak_rss_mb": 812.5}}
+ * "folder" is optional; without it the folder is derived from the hostname
+ * like `node app.js <url>`. Failed requests carry ok=false and an "error"
+ * message. The browser stays up between sites until it is recycled or
+ * stdin closes. */
+(function main() {
+    const input = readline.createInterface({ input: process.stdin, terminal: false });
+
+    let pending = Promise.resolve();
+    input.on("line", (line) => {
+        if (!line.trim()) return;
+        pending = pending.then(async () => {
+            let request;
+            try {
+                request = JSON.parse(line);
+            } catch (e) {
+                Reply({ "id": null, "ok": false, "error": "Invalid request: " + e.message });
+                return;
+            }
+            try {
+                Reply(await HandleRequest(request));
+            } catch (e) {
+                Reply({ "id": request.id, "ok": false, "error": "Invalid request: " + e.message });
+            }
+        });
+    });
+    input.on("close", () => pending.then(() => RecycleBrowser(true)).then(() => process.exit(0)));
+})();
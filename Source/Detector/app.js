@@ -5,52 +5,61 @@
 const assert = require("assert");
 const fs     = require("fs");
 
-const { IdLeaking, CookieSynchronization } = require(__dirname + "/detectors/leaks.js")
-const { GetThirdParties } = require(__dirname + "/detectors/thirdParties.js");
-const { GetFingerprinting } = require(__dirname + "/detectors/fingerprinting.js");
-const { LoadData, StoreData } = require(__dirname + "/helpers/storage.js");
+const { IdLeakingAccumulator, CookieSynchronizationAccumulator } = require(__dirname + "/detectors/leaks.js")
+const { ThirdPartiesAccumulator } = require(__dirname + "/detectors/thirdParties.js");
+const { FingerprintingAccumulator } = require(__dirname + "/detectors/fingerprinting.js");
+const { LoadData, StreamData, StoreData, GetOutputPath } = require(__dirname + "/helpers/storage.js");
 
 const config = require(__dirname + "/configs/io.json");
 
 /****** Functions ******/
 
-function Analyse(dir) {
+/* Cookies and website information are small and loaded whole; requests
+ * and used functions are streamed record by record through the detectors,
+ * so memory does not grow with the size of the traces. */
+async function Analyse(dir) {
     assert(typeof(dir) == "string" && dir.length > 0);
 
     try {
         const cookies      = LoadData(dir + config.cookiesFile);
         const thirdCookies = LoadData(dir + config.thirdPartyCookiesFile);
-        const requests     = LoadData(dir + config.requestsFile);
-        const usedFuncs    = LoadData(dir + config.functionsFile);
         const websiteInfo  = LoadData(dir + config.websiteFile);
         console.log("[INFO] Loaded data");
 
         let visitedWebsite = websiteInfo.landingWebsite;
-        let idLeaking = [];
-        let cookieSync = [];
+        let idLeaking = null;
+        let cookieSync = null;
 
         let firstParty = visitedWebsite;
 
         /* Some websites do not store cookies. These are not involved in ID
          * Leaking as defined in the paper. */
         if (cookies.length > 0 && cookies[0].domain) {
-            idLeaking = IdLeaking(cookies, requests);
+            idLeaking = IdLeakingAccumulator(cookies);
 
             firstParty = ( (cookies[0].domain.startsWith(".")) ? cookies[0].domain.substr(1) : cookies[0].domain );
             assert(!firstParty.startsWith("."));
-            cookieSync = CookieSynchronization(thirdCookies, requests, firstParty);
+            cookieSync = CookieSynchronizationAccumulator(thirdCookies, firstParty);
 
         }
 
-        let fingerprints = GetFingerprinting(usedFuncs);
-        let thirdParties = GetThirdParties(requests, firstParty);
+        let fingerprints = FingerprintingAccumulator();
+        let thirdParties = ThirdPartiesAccumulator(firstParty);
+
+        await StreamData(dir + config.requestsFile, req => {
+            if (idLeaking) idLeaking.Add(req);
+            if (cookieSync) cookieSync.Add(req);
+            thirdParties.Add(req);
+        });
+        await StreamData(dir + config.functionsFile, func => fingerprints.Add(func));
+        console.log("[INFO] Streamed traces");
 
         return {
             "visitedWebsite": visitedWebsite,
-            "idLeaking": idLeaking,
-            "cookieSync": cookieSync,
-            "fingerprinting": fingerprints,
-            "thirdParties": thirdParties
+            "idLeaking": idLeaking ? idLeaking.Result() : [],
+            "cookieSync": cookieSync ? cookieSync.Result() : [],
+            "fingerprinting": fingerprints.Result(),
+            "thirdParties": thirdParties.Result()
         };
 
     } catch(error) {
@@ -80,7 +89,7 @@ async function ProcessWebsite(targetDir) {
     assert(typeof(targetDir) == "string" && targetDir.length);
 
     let websiteData = { "path": targetDir };
-    const violations = Analyse(targetDir);
+    const violations = await Analyse(targetDir);
 
     PrintViolationsInfo(violations);
 
@@ -105,9 +114,17 @@ function Usage() {
     return 0;
 }
 
+/****** Exports ******/
+
+module.exports = {
+    Analyse,
+    ProcessWebsite
+};
+
 /****** Main ******/
 
-(async function main() {
+/* Only run as a command; service.js requires this file for Analyse() */
+if (require.main === module) (async function main() {
     try {
         const args = ProcessCliArguments(process.argv.slice(2));
         if (!args) {
@@ -127,7 +144,7 @@ function Usage() {
 
         console.log("[INFO] Processed website");
 
-        const outputPath = args + "/result.json";
+        const outputPath = GetOutputPath(args);
         StoreData(outputPath, data);
         console.log("[INFO] Stored data to", outputPath);
 
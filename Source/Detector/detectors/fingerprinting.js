@@ -6,36 +6,50 @@ const assert = require("assert");
 
 const fingerprintingFuncs = require(__dirname + "/../configs/fingerprintingFuncs.json");
 
-const {RemoveDuplicates} = require(__dirname + "/../helpers/utils.js");
-
 /****** Definitions ******/
 
 const Fingerprinters = new Set(fingerprintingFuncs);
 
 /****** Functions ******/
 
-function GetFingerprinting(usedFunctions) {
-    assert(typeof(usedFunctions) == "object");
-    assert(typeof(usedFunctions.forEach) == "function");
+/* Incremental GetFingerprinting: Add() every used function, then Result() */
+function FingerprintingAccumulator() {
+    /* Fingerprinting functions in order of first appearance */
+    let functions = new Set();
 
-    let result = {
-        "status": false,
-        "functions": []
-    };
+    return {
+        Add(func) {
+            if (func.callFrame.url.startsWith("chrome-extension://")) return;
+
+            const name = func.callFrame.functionName;
+            if (Fingerprinters.has(name)) functions.add(name);
+        },
+        Result() {
+            let result = {
+                "status": false,
+                "functions": [...functions]
+            };
 
-    let functions = usedFunctions.filter(func => !func.callFrame.url.startsWith("chrome-extension://"))
-                                 .map(data => data.callFrame.functionName)
-                                 .filter(func => Fingerprinters.has(func));
+            if (result.functions.length) result.status = true;
 
-    result.functions = RemoveDuplicates(functions);
+            return result;
+        }
+    };
+}
+
+function GetFingerprinting(usedFunctions) {
+    assert(typeof(usedFunctions) == "object");
+    assert(typeof(usedFunctions.forEach) == "function");
 
-    if (result.functions.length) result.status = true;
+    const fingerprinting = FingerprintingAccumulator();
+    usedFunctions.forEach(func => fingerprinting.Add(func));
 
-    return result;
+    return fingerprinting.Result();
 }
 
 /****** Exports ******/
 
 module.exports = {
-    GetFingerprinting
+    GetFingerprinting,
+    FingerprintingAccumulator
 };
\ No newline at end of file
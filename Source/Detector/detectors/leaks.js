@@ -7,87 +7,43 @@ const Cookies = require(__dirname + "/../helpers/cookies.js");
 const Requests = require(__dirname + "/../helpers/requests.js");
 const Utils = require(__dirname + "/../helpers/utils.js");
 
-/****** Functions ******/
-
-function IsCrossDomain(cookie, req, firstParty) {
-    assert(Cookies.IsCookieValid(cookie));
-    assert(Requests.IsRequestValid(req));
+const { MultiPatternMatcher } = require(__dirname + "/../helpers/matcher.js");
 
-    let domain = Cookies.GetCookieDomain(cookie);
-    assert(typeof(domain) == "string" && domain.length);
+/****** Definitions ******/
 
-    let receivingDomain = Utils.ExtractHostname(req.url);
-    assert(receivingDomain.length > 0);
+/* Parsed URL parameters are cached per URL (the same referers and endpoints
+ * recur throughout a trace); a full cache is cleared */
+const PARAMS_CACHE_SIZE = 4096;
 
-    let isCrossDomain = !Utils.AreSameDomain(domain, receivingDomain);
+/****** Functions ******/
 
-    /* If the user specified a first party then we need to ensure that not only
-     * is the request cross-domain but it is not towards the first party */
-    if (typeof(firstParty) === "string" && firstParty.length > 0) {
-        return (
-            isCrossDomain &&
-            !Utils.AreSameDomain(firstParty, receivingDomain)
-        );
+function CachedParams(cache, url, parse) {
+    let params = cache.get(url);
+    if (params === undefined) {
+        params = parse(url);
+        if (cache.size >= PARAMS_CACHE_SIZE) cache.clear();
+        cache.set(url, params);
     }
-
-    return isCrossDomain;
-}
-
-function SearchForCookieValues(cookieValues, params) {
-    assert(typeof(cookieValues) == "object");
-    assert(typeof(params) == "object");
-
-    /* No need to iterate over lists if either of them is empty */
-    if (cookieValues.length === 0 || params.length === 0) return [];
-
-    /* There are multiple ways to search for cookie values. The most straight
-     * forward is to look for exact matches (i.e. we accept only cookie values
-     * that can be found as an exact search parameter). In that case, use the
-     * code:
-     *
-     * return cookieValues.filter(x => params.includes(x));
-     *
-     * Alternatively, you might want to search for substrings (i.e. we accept
-     * cookies which are substrings in search parameters). This is very useful
-     * for cases where the search parameters are complex strings or JSON objects
-     * e.g.
-     *
-     * Cookie Name: TrackingUserID
-     * Cookie Value: 123456789
-     *
-     * Request: https://tracker.com/path?data=%7Bid%3D123456789%7D
-     * Search params: 'data' => '{id=123456789}'
-     */
-
-    return cookieValues.filter(n => {
-        for(var i = 0; i < params.length; ++i) {
-            if (params[i].includes(n)) return true; /* Search inside strings */
-        }
-        return false;
-    });
+    return params;
 }
 
-function IsPartOfGetRequest(cookieValues, req) {
-    assert(typeof(cookieValues) == "object");
-    assert(Requests.IsRequestValid(req));
+function GetRequestParams(url) {
+    assert(typeof(url) == "string" && url.length);
 
     /* For GET requests search for cookie values in the search parameters of the
      * URL. If there are no such parameters search for custom ones using a
      * different delimiter. */
-    let params = Requests.GetUrlParams(req.url);
-    if (params.length == 0) params = Requests.GetCustomUrlParams(req.url);
+    let params = Requests.GetUrlParams(url);
+    if (params.length == 0) params = Requests.GetCustomUrlParams(url);
 
-    return SearchForCookieValues(cookieValues, params).length > 0;
+    return params;
 }
 
-function IsPartOfPostRequest(cookieValues, req) {
-    assert(typeof(cookieValues) == "object");
+function GetPostParams(req) {
     assert(Requests.IsRequestValid(req));
 
     /* Ignore POST requests without data */
-    if (req.postData === undefined || req.postData === null) return false;
-
-    let params = [];
+    if (req.postData === undefined || req.postData === null) return [];
 
     /* For POST requests examine the type of data. If it is a JSON object then
      * search for cookie values in the values of the object. If it is a URI then
@@ -97,89 +53,43 @@ function IsPartOfPostRequest(cookieValues, req) {
      * look for cookie values in keys of JSON objects or search parameters
      * becauses these keys contain common keywords.
      */
-    if (Utils.IsJson(req.postData)) params = Utils.GetJsonValues(req.postData);
-    else if (Utils.IsUri(req.postData)) params = Requests.GetUrlParams(req.postData);
-    else params.push(req.postData);
-
-    return SearchForCookieValues(cookieValues, params).length > 0;
+    if (Utils.IsJson(req.postData)) return Utils.GetJsonValues(req.postData);
+    else if (Utils.IsUri(req.postData)) return Requests.GetUrlParams(req.postData);
+    return [req.postData];
 }
 
-function IsPartOfRefererHeader(cookieValues, req) {
-    assert(typeof(cookieValues) == "object");
-    assert(Requests.IsRequestValid(req));
-
-    if (!req.headers.referer) return false;
+/* The cookie domains d for which Utils.AreSameDomain(d, hostname) holds */
+function SameDomains(hostname) {
+    let domains = [hostname, "www." + hostname, "www2." + hostname];
 
-    /* For the Referer header search for cookie values only in the search
-     * parameters (like in GET requests). */
-    let params = Requests.GetUrlParams(req.headers.referer);
+    if (hostname.startsWith("www.")) domains.push(hostname.substr(4));
+    if (hostname.startsWith("www2.")) domains.push(hostname.substr(5));
 
-    return SearchForCookieValues(cookieValues, params).length > 0;
+    return domains;
 }
 
-function IsPartOfRequest(cookie, req) {
+function ProcessSentCookieLeak(cookie, sent, thirdParties, results) {
     assert(Cookies.IsCookieValid(cookie));
-    assert(Requests.IsRequestValid(req));
-
-    let cookieValues = Cookies.ExtractCookieValues(cookie.value);
-
-    let bool = (
-        IsPartOfGetRequest(cookieValues, req) ||
-        IsPartOfPostRequest(cookieValues, req) ||
-        IsPartOfRefererHeader(cookieValues, req)
-    );
-
-    return bool;
-}
-
-function IsCookieLeak(cookie, packet, firstParty) {
-    assert(Cookies.IsCookieValid(cookie));
-    assert(Requests.IsRequestValid(packet));
-
-    /* Decide wether the cookie has been leaked. We only consider cases where:
-     *
-     * 1. The value beeing leaked is not a common value that cannot uniquely
-     *    identify users
-     * 2. The cookie being leaked is not a cookie that stores the consent of the
-     *    user. Such cookies can and should be sent to other parties.
-     * 3. The request is valid.
-     * 4. The cookie value is sent to a domain different than the one that set
-     *    the cookie.
-     * 5. The cookie value can be found inside the request (URL params, referer
-     *    header, post data).
-     */
-    return (
-        !Cookies.IsCommonCookieValue(cookie.value) &&
-        !Cookies.IsConsentCookie(cookie.name) &&
-        Requests.IsActualRequest(packet.url) &&
-        IsCrossDomain(cookie, packet, firstParty) &&
-        IsPartOfRequest(cookie, packet)
-    );
-}
-
-function ProcessSentCookieLeak(cookie, req, results) {
-    assert(Cookies.IsCookieValid(cookie));
-    assert(Requests.IsRequestValid(req));
+    assert(typeof(sent) == "object");
+    assert(typeof(thirdParties) == "object");
     assert(typeof(results) == "object");
 
-    //let url = req.method + ":" + req.url.substr(0, 300);
-    let url = "[" + req.method + "] " + req.url;
-    let thirdParty = Utils.ExtractHostname(req.url);
-
     /* Examine whether this exact cookie has already been sent to another domain */
     let entry = results.find(e => e.cookie == cookie.name && e.value == cookie.value );
 
     if (entry) {
-        if (!entry.sent.includes(url)) entry.sent.push(url);
-        if (!entry.associated3rdParties.includes(thirdParty)) entry.associated3rdParties.push(thirdParty);
+        sent.forEach(url => { if (!entry.sent.includes(url)) entry.sent.push(url); });
+        thirdParties.forEach(thirdParty => {
+            if (!entry.associated3rdParties.includes(thirdParty)) entry.associated3rdParties.push(thirdParty);
+        });
     } else {
 
         let newEntry = {
             "cookie" : cookie.name,
             "value" : cookie.value,
             "domain": cookie.domain,
-            "associated3rdParties" : [ thirdParty ],
-            "sent" : [ url ]
+            "associated3rdParties" : [...thirdParties],
+            "sent" : [...sent]
         };
 
         /* Enable the following line if you want to examine the identified
@@ -190,33 +100,162 @@ function ProcessSentCookieLeak(cookie, req, results) {
          */
         results.push(newEntry);
     }
-
-    /* Return true if you want to stop searching for this specific cookie in
-     * other requests, false otherwise */
-    return false;
 }
 
-function CookieLeak(cookies, requests, firstParty) {
+/* Incremental cookie leak detection: Add() every request, then Result().
+ *
+ * Decide wether a cookie has been leaked by a request. We only consider
+ * cases where:
+ *
+ * 1. The value beeing leaked is not a common value that cannot uniquely
+ *    identify users
+ * 2. The cookie being leaked is not a cookie that stores the consent of the
+ *    user. Such cookies can and should be sent to other parties.
+ * 3. The request is valid.
+ * 4. The cookie value is sent to a domain different than the one that set
+ *    the cookie.
+ * 5. The cookie value can be found inside the request (URL params, referer
+ *    header, post data).
+ *
+ * Cookies are indexed by domain, so each request skips the cookies of its
+ * own domain with a few lookups, and all cookie values are searched for at
+ * once with a multi-pattern matcher over the request's parameters. Only the
+ * requests that leak a cookie are remembered (as their URL and receiving
+ * third party), so memory does not grow with the number of requests.
+ */
+function CookieLeakAccumulator(cookies, firstParty) {
     assert(typeof(cookies) == "object");
-    assert(typeof(requests) == "object");
-
-    let results = [];
 
+    /* If a cookie is not important there is no need to check it against
+     * any request. Domains and values are extracted once; a cookie that
+     * cannot be processed fails the analysis at the first request it would
+     * have been checked against. */
+    let candidates = [];
     cookies.forEach(cookie => {
         assert(Cookies.IsCookieValid(cookie));
-
-        /* If the cookie is not important there is no need to check it against
-         * all requests */
         if (Cookies.IsCommonCookieValue(cookie.value) ||
             Cookies.IsConsentCookie(cookie.name)) return;
 
-        requests.some(req => {
-            assert(Requests.IsRequestValid(req));
-            if (IsCookieLeak(cookie, req, firstParty)) return ProcessSentCookieLeak(cookie, req, results);
+        let candidate = { "cookie": cookie, "sent": new Set(), "thirdParties": new Set() };
+        try { candidate.domain = Cookies.GetCookieDomain(cookie); }
+        catch(e) { candidate.domainError = e; }
+        try { candidate.values = Cookies.ExtractCookieValues(cookie.value); }
+        catch(e) { candidate.valuesError = e; }
+        candidates.push(candidate);
+    });
+
+    let byDomain = new Map();
+    let owners = new Map();     /* Cookie value => candidates holding it */
+    candidates.forEach((candidate, index) => {
+        if (candidate.domain) {
+            if (!byDomain.has(candidate.domain)) byDomain.set(candidate.domain, []);
+            byDomain.get(candidate.domain).push(index);
+        }
+        (candidate.values || []).forEach(value => {
+            if (!owners.has(value)) owners.set(value, []);
+            owners.get(value).push(index);
         });
     });
 
-    return results;
+    const values = [...owners.keys()];
+    const valueOwners = [...owners.values()];
+    const matcher = MultiPatternMatcher(values);
+
+    const domainErrors = candidates.filter(c => c.domainError).map(c => c.domainError);
+    const valuesErrors = candidates.map((c, index) => index).filter(index => candidates[index].valuesError);
+
+    let urlParams = new Map();
+    let refererParams = new Map();
+
+    /* Adds to `matched` the eligible candidates with a value inside one of
+     * `params`. There are multiple ways to search for cookie values. The
+     * most straight forward is to look for exact matches (i.e. we accept
+     * only cookie values that can be found as an exact search parameter).
+     * Instead, we search for substrings (i.e. we accept cookies which are
+     * substrings in search parameters). This is very useful for cases where
+     * the search parameters are complex strings or JSON objects e.g.
+     *
+     * Cookie Name: TrackingUserID
+     * Cookie Value: 123456789
+     *
+     * Request: https://tracker.com/path?data=%7Bid%3D123456789%7D
+     * Search params: 'data' => '{id=123456789}'
+     */
+    function MatchParams(params, excluded, matched) {
+        assert(typeof(params) == "object");
+
+        params.forEach(param => {
+            for (const value of matcher.Search(param)) {
+                valueOwners[value].forEach(index => { if (!excluded.has(index)) matched.add(index); });
+            }
+        });
+    }
+
+    return {
+        Add(req) {
+            if (candidates.length === 0) return;
+            assert(Requests.IsRequestValid(req));
+            if (!Requests.IsActualRequest(req.url)) return;
+            if (domainErrors.length) throw domainErrors[0];
+
+            const receivingDomain = Utils.ExtractHostname(req.url);
+            assert(receivingDomain.length > 0);
+
+            /* If the user specified a first party then we need to ensure that
+             * not only is the request cross-domain but it is not towards the
+             * first party */
+            if (typeof(firstParty) === "string" && firstParty.length > 0 &&
+                Utils.AreSameDomain(firstParty, receivingDomain)) return;
+
+            let excluded = new Set();
+            SameDomains(receivingDomain).forEach(domain => {
+                (byDomain.get(domain) || []).forEach(index => excluded.add(index));
+            });
+
+            const eligible = candidates.length - excluded.size;
+            if (eligible === 0) return;
+
+            const failed = valuesErrors.find(index => !excluded.has(index));
+            if (failed !== undefined) throw candidates[failed].valuesError;
+
+            /* URL parameters first; the POST data and the Referer header are
+             * only examined while some cookie has not been found */
+            let matched = new Set();
+            MatchParams(CachedParams(urlParams, req.url, GetRequestParams), excluded, matched);
+            if (matched.size < eligible) MatchParams(GetPostParams(req), excluded, matched);
+            if (matched.size < eligible && req.headers.referer) {
+                /* For the Referer header search for cookie values only in the
+                 * search parameters (like in GET requests). */
+                MatchParams(CachedParams(refererParams, req.headers.referer, Requests.GetUrlParams), excluded, matched);
+            }
+
+            //let url = req.method + ":" + req.url.substr(0, 300);
+            matched.forEach(index => {
+                candidates[index].sent.add("[" + req.method + "] " + req.url);
+                candidates[index].thirdParties.add(receivingDomain);
+            });
+        },
+        Result() {
+            /* Entries are reported in cookie order, each with its requests
+             * in the order they were made */
+            let results = [];
+            candidates.forEach(candidate => {
+                if (candidate.sent.size === 0) return;
+                ProcessSentCookieLeak(candidate.cookie, candidate.sent, candidate.thirdParties, results);
+            });
+            return results;
+        }
+    };
+}
+
+function CookieLeak(cookies, requests, firstParty) {
+    assert(typeof(cookies) == "object");
+    assert(typeof(requests) == "object");
+
+    const leaks = CookieLeakAccumulator(cookies, firstParty);
+    requests.forEach(req => leaks.Add(req));
+
+    return leaks.Result();
 }
 
 /* ID leaking: a first-party alias is leaked from the visited website to
@@ -238,9 +277,26 @@ function CookieSynchronization(cookies, requests, firstParty) {
     return CookieLeak(cookies, requests, firstParty);
 }
 
+/* Incremental IdLeaking */
+function IdLeakingAccumulator(cookies) {
+    assert(typeof(cookies) == "object");
+
+    return CookieLeakAccumulator(cookies);
+}
+
+/* Incremental CookieSynchronization */
+function CookieSynchronizationAccumulator(cookies, firstParty) {
+    assert(typeof(cookies) == "object");
+    assert(typeof(firstParty) == "string" && firstParty.length > 0);
+
+    return CookieLeakAccumulator(cookies, firstParty);
+}
+
 /****** Exports ******/
 
 module.exports = {
     IdLeaking,
-    CookieSynchronization
+    CookieSynchronization,
+    IdLeakingAccumulator,
+    CookieSynchronizationAccumulator
 }
\ No newline at end of file
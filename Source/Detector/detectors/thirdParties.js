@@ -17,28 +17,42 @@ function IsValidURL(url) {
     );
 }
 
-function GetThirdParties(requests, firstParty) {
-    assert(typeof(requests) == "object");
+/* Incremental GetThirdParties: Add() every request, then Result() */
+function ThirdPartiesAccumulator(firstParty) {
     assert(typeof(firstParty) == "string" && firstParty.length > 0);
-    requests.forEach(req => assert(typeof(req) == "object") && assert(typeof(req.url) == "string" && req.url.length));
 
     /* In case the domain has been extracted from a cookie value */
     if (firstParty.startsWith(".")) firstParty = firstParty.substr(1);
 
-    let domains = requests.filter(req => IsValidURL(req.url))
-                          .map(req => Utils.ExtractHostname(req.url))
-                          .map(host => host.trim())
-                          .filter(host => host.length);
+    /* Hostnames in order of first appearance */
+    let domains = new Set();
+
+    return {
+        Add(req) {
+            assert(typeof(req) == "object");
+            if (!IsValidURL(req.url)) return;
+
+            const host = Utils.ExtractHostname(req.url).trim();
+            if (host.length) domains.add(host);
+        },
+        Result() {
+            return [...domains].filter(domain => !Utils.AreSameDomain(domain, firstParty));
+        }
+    };
+}
 
-    domains = Utils.RemoveDuplicates(domains);
+function GetThirdParties(requests, firstParty) {
+    assert(typeof(requests) == "object");
 
-    let thirdParties = domains.filter(domain => !Utils.AreSameDomain(domain, firstParty));
+    const thirdParties = ThirdPartiesAccumulator(firstParty);
+    requests.forEach(req => thirdParties.Add(req));
 
-    return thirdParties;
+    return thirdParties.Result();
 }
 
 /****** Exports ******/
 
 module.exports = {
-    GetThirdParties
+    GetThirdParties,
+    ThirdPartiesAccumulator
 };
\ No newline at end of file
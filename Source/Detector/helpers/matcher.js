@@ -0,0 +1,75 @@
+"use strict";
+
+/****** Dependencies ******/
+
+const assert = require("assert");
+
+/****** Functions ******/
+
+/* Aho-Corasick automaton over `patterns`. Search(text) returns the indices
+ * of the patterns that occur in `text` as substrings, i.e. the i for which
+ * text.includes(patterns[i]), in one pass over the text. */
+function MultiPatternMatcher(patterns) {
+    assert(typeof(patterns) == "object");
+
+    /* Per state: transitions by UTF-16 code unit, failure link, and the
+     * patterns that end here (own and through failure links) */
+    let next = [new Map()];
+    let fail = [0];
+    let output = [[]];
+
+    patterns.forEach((pattern, index) => {
+        assert(typeof(pattern) == "string");
+
+        let state = 0;
+        for (let i = 0; i < pattern.length; ++i) {
+            const c = pattern.charCodeAt(i);
+            let target = next[state].get(c);
+            if (target === undefined) {
+                target = next.length;
+                next.push(new Map());
+                fail.push(0);
+                output.push([]);
+                next[state].set(c, target);
+            }
+            state = target;
+        }
+        output[state].push(index);
+    });
+
+    /* Breadth-first, so failure links point to already finished states */
+    let queue = [...next[0].values()];
+    for (let head = 0; head < queue.length; ++head) {
+        const state = queue[head];
+        for (const [c, target] of next[state]) {
+            let f = fail[state];
+            while (f && !next[f].has(c)) f = fail[f];
+            const candidate = next[f].get(c);
+            fail[target] = (candidate !== undefined && candidate !== target) ? candidate : 0;
+            if (output[fail[target]].length) output[target] = output[target].concat(output[fail[target]]);
+            queue.push(target);
+        }
+    }
+
+    return {
+        Search(text) {
+            assert(typeof(text) == "string");
+
+            let found = new Set(output[0]);
+            let state = 0;
+            for (let i = 0; i < text.length; ++i) {
+                const c = text.charCodeAt(i);
+                while (state && !next[state].has(c)) state = fail[state];
+                state = next[state].get(c) || 0;
+                for (const index of output[state]) found.add(index);
+            }
+            return found;
+        }
+    };
+}
+
+/****** Exports ******/
+
+module.exports = {
+    MultiPatternMatcher
+};
@@ -4,28 +4,231 @@
 
 const assert = require("assert");
 const fs     = require("fs");
+const zlib   = require("zlib");
+
+const config = require(__dirname + "/../configs/io.json");
+
+/****** Definitions ******/
+
+/* Formats a trace may be stored in by the crawler, in lookup order. NDJSON
+ * files hold an array, one element per line. */
+const TRACE_FORMATS = ["json", "json.gz", "ndjson", "ndjson.gz"];
+
+/* zstd is only built into newer Node releases */
+if (zlib.zstdDecompressSync) TRACE_FORMATS.push("json.zst", "ndjson.zst");
+
+const OUTPUT_FORMATS = ["json", "json.gz"];
+
+/* Records above this size are not expected in a trace; a larger one means
+ * the file is not an array of records */
+const MAX_RECORD_LENGTH = 256 * 1024 * 1024;
 
 /****** Functions ******/
 
+function Decompress(buffer, path) {
+    if (path.endsWith(".gz")) return zlib.gunzipSync(buffer);
+    if (path.endsWith(".zst")) return zlib.zstdDecompressSync(buffer);
+    return buffer;
+}
+
+function ParseNdjson(text) {
+    let data = [];
+    for (const line of text.split("\n")) {
+        if (line.length) data.push(JSON.parse(line));
+    }
+    return data;
+}
+
+/* The file `path` (ending in ".json") was stored as, and whether it is NDJSON */
+function ResolveData(path) {
+    assert(typeof(path) == "string" && path.length > 0);
+
+    if (path.endsWith(".json") && !fs.existsSync(path)) {
+        const base = path.slice(0, -".json".length);
+        for (const format of TRACE_FORMATS) {
+            const candidate = base + "." + format;
+            if (fs.existsSync(candidate)) return [candidate, format.startsWith("ndjson")];
+        }
+    }
+
+    return [path, false];
+}
+
+/* Loads `path` (ending in ".json") from whichever format it was stored in */
 function LoadData(path) {
     assert(typeof(path) == "string" && path.length > 0);
 
-    const text = fs.readFileSync(path, "utf8");
-    const data = JSON.parse(text);
+    const [file, ndjson] = ResolveData(path);
+    const text = Decompress(fs.readFileSync(file), file).toString("utf8");
+    const data = ndjson ? ParseNdjson(text) : JSON.parse(text);
 
     return data;
 }
 
+/* Splits NDJSON text, pushed in chunks of any size, into records */
+function NdjsonSplitter(onRecord) {
+    let pending = "";
+
+    function Record(line) {
+        if (line.trim().length) onRecord(JSON.parse(line));
+    }
+
+    return {
+        Push(text) {
+            let start = 0;
+            let end;
+            while ((end = text.indexOf("\n", start)) >= 0) {
+                Record(pending + text.slice(start, end));
+                pending = "";
+                start = end + 1;
+            }
+            pending += text.slice(start);
+            assert(pending.length < MAX_RECORD_LENGTH, "Record too large");
+        },
+        End() {
+            Record(pending);
+            pending = "";
+        }
+    };
+}
+
+/* Splits a JSON array, pushed as text chunks of any size, into its elements.
+ * Only string and bracket state is tracked; each element is then parsed on
+ * its own, so memory is bounded by the largest element. */
+function JsonArraySplitter(onRecord) {
+    const QUOTE = 34, BACKSLASH = 92, COMMA = 44;
+    const OPEN_ARRAY = 91, CLOSE_ARRAY = 93, OPEN_OBJECT = 123, CLOSE_OBJECT = 125;
+
+    let depth = 0;              /* 1 inside the top-level array */
+    let closed = false;
+    let inString = false;
+    let escaped = false;
+    let inElement = false;
+    let primitive = false;      /* a number, true, false or null element */
+    let pending = "";
+
+    function IsSpace(c) {
+        return c == 32 || c == 10 || c == 13 || c == 9;
+    }
+
+    function Emit(text, start, end) {
+        onRecord(JSON.parse(pending + text.slice(start, end)));
+        pending = "";
+        inElement = primitive = false;
+    }
+
+    return {
+        Push(text) {
+            let start = 0;
+            for (let i = 0; i < text.length; ++i) {
+                const c = text.charCodeAt(i);
+
+                if (inString) {
+                    if (escaped) escaped = false;
+                    else if (c == BACKSLASH) escaped = true;
+                    else if (c == QUOTE) {
+                        inString = false;
+                        if (depth == 1) Emit(text, start, i + 1);
+                    }
+                    continue;
+                }
+
+                if (primitive && (c == COMMA || c == CLOSE_ARRAY || IsSpace(c))) Emit(text, start, i);
+                if (IsSpace(c)) continue;
+
+                /* Worded like JSON.parse's errors, which the driver classifies as detector_json */
+                if (closed) throw new SyntaxError(`Unexpected token '${text[i]}' after the end of the JSON array`);
+                if (depth == 0) {
+                    if (c != OPEN_ARRAY) throw new SyntaxError(`Unexpected token '${text[i]}', expected a JSON array`);
+                    depth = 1;
+                    continue;
+                }
+
+                if (depth == 1 && !inElement && c != COMMA && c != CLOSE_ARRAY) {
+                    inElement = true;
+                    start = i;
+                    primitive = (c != QUOTE && c != OPEN_ARRAY && c != OPEN_OBJECT);
+                }
+
+                if (c == QUOTE) inString = true;
+                else if (c == OPEN_ARRAY || c == OPEN_OBJECT) depth += 1;
+                else if (c == CLOSE_ARRAY || c == CLOSE_OBJECT) {
+                    depth -= 1;
+                    if (depth == 1) Emit(text, start, i + 1);
+                    else if (depth == 0) closed = true;
+                }
+            }
+
+            if (inElement) {
+                pending += text.slice(start);
+                assert(pending.length < MAX_RECORD_LENGTH, "Record too large");
+            }
+        },
+        End() {
+            if (!closed) throw new SyntaxError("Unexpected end of JSON input");
+        }
+    };
+}
+
+/* Text stream of a stored file, decompressed if needed */
+function OpenText(file) {
+    let stream = fs.createReadStream(file);
+
+    let decompress = null;
+    if (file.endsWith(".gz")) decompress = zlib.createGunzip();
+    else if (file.endsWith(".zst")) decompress = zlib.createZstdDecompress();
+    if (decompress) {
+        stream.on("error", error => decompress.destroy(error));
+        stream = stream.pipe(decompress);
+    }
+
+    stream.setEncoding("utf8");
+    return stream;
+}
+
+/* Calls onRecord(element) for every element of the array stored at `path`
+ * (ending in ".json"), in order and in any format, without holding the
+ * whole file in memory */
+async function StreamData(path, onRecord) {
+    assert(typeof(onRecord) == "function");
+
+    const [file, ndjson] = ResolveData(path);
+    const splitter = ndjson ? NdjsonSplitter(onRecord) : JsonArraySplitter(onRecord);
+
+    for await (const chunk of OpenText(file)) splitter.Push(chunk);
+    splitter.End();
+}
+
+/* Stores `data` as JSON, gzip-compressed if `path` ends in ".gz" */
 function StoreData(path, data) {
     assert(typeof(path) == "string" && path.length > 0);
     assert(typeof(data) == "object");
 
-    fs.writeFileSync(path, JSON.stringify(data, null, 2));
+    const text = JSON.stringify(data, null, 2);
+    fs.writeFileSync(path, path.endsWith(".gz") ? zlib.gzipSync(text) : text);
+}
+
+/* Where the result of a site directory is stored, per `outputFormat`.
+ * A result left over in the other format is removed. */
+function GetOutputPath(dir) {
+    assert(typeof(dir) == "string" && dir.length > 0);
+
+    const format = config.outputFormat || "json";
+    assert(OUTPUT_FORMATS.includes(format), "Unknown output format: " + format);
+
+    const base = dir + config.outputFile;
+    const path = (format == "json") ? base : base + ".gz";
+    for (const other of [base, base + ".gz"]) {
+        if (other != path) fs.rmSync(other, { force: true });
+    }
+    return path;
 }
 
 /****** Exports ******/
 
 module.exports = {
     LoadData,
-    StoreData
-};
\ No newline at end of file
+    StreamData,
+    StoreData,
+    GetOutputPath
+};
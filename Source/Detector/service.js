@@ -0,0 +1,97 @@
+"use strict";
+
+/****** Dependencies ******/
+
+const assert   = require("assert");
+const readline = require("readline");
+const util     = require("util");
+
+const { ProcessWebsite } = require(__dirname + "/app.js");
+const { StoreData, GetOutputPath } = require(__dirname + "/helpers/storage.js");
+
+/****** Functions ******/
+
+/* Runs fn() with console output redirected into a buffer, so stdout only
+ * carries protocol lines. Returns [result, output]; a thrown error is
+ * returned as the result. */
+async function Captured(fn) {
+    assert(typeof(fn) == "function");
+
+    const saved = { log: console.log, info: console.info, warn: console.warn, error: console.error };
+    let output = [];
+    const capture = (...args) => { output.push(util.format(...args)); };
+    console.log = console.info = console.warn = console.error = capture;
+
+    let result;
+    try {
+        result = await fn();
+    } catch (e) {
+        result = e;
+    } finally {
+        Object.assign(console, saved);
+    }
+    return [result, output.join("\n")];
+}
+
+/* Same steps as app.js: analyse the directory and store result.json */
+async function HandleRequest(request) {
+    assert(typeof(request) == "object" && request !== null);
+    assert(typeof(request.dir) == "string" && request.dir.length > 0);
+
+    const started = process.hrtime.bigint();
+    const [data, output] = await Captured(async () => {
+        const data = await ProcessWebsite(request.dir);
+        if (data.error) return data;
+        StoreData(GetOutputPath(request.dir), data);
+        return data;
+    });
+
+    let response = { "id": request.id, "ok": true, "output": output };
+    if (data instanceof Error) {
+        response.ok = false;
+        response.error = "Fatal error: " + (data.stack || String(data));
+    } else if (data.error) {
+        response.ok = false;
+        response.error = "Detector failed: " + data.error;
+    }
+    response.duration = Number(process.hrtime.bigint() - started) / 1e9;
+    response.metrics = { "rss_mb": Math.round(process.memoryUsage().rss / 1024 / 1024 * 10) / 10 };
+    return response;
+}
+
+function Reply(response) {
+    process.stdout.write(JSON.stringify(response) + "\n");
+}
+
+/****** Main ******/
+
+/* JSON-lines protocol over stdin/stdout, one request at a time:
+ *   in:  {"id": 1, "dir": "../Results/www_example_com"}
+ *   out: {"id": 1, "ok": true, "output": "...", "duration": 0.42,
+ *         "metrics": {"rss_mb": 61.2}}
+ * Failed requests carry ok=false and an "error" message. The process stays
+ * up until stdin closes, keeping the configs and dictionary loaded. */
+(function main() {
+    const input = readline.createInterface({ input: process.stdin, terminal: false });
+
+    /* Requests are handled in order even if the client pipelines them */
+    let pending = Promise.resolve();
+    input.on("line", (line) => {
+        if (!line.trim()) return;
+        pending = pending.then(async () => {
+            let request;
+            try {
+                request = JSON.parse(line);
+            } catch (e) {
+                Reply({ "id": null, "ok": false, "error": "Invalid request: " + e.message });
+                return;
+            }
+            try {
+                Reply(await HandleRequest(request));
+            } catch (e) {
+                Reply({ "id": request.id, "ok": false, "error": "Invalid request: " + e.message });
+            }
+        });
+    });
+    input.on("close", () => pending.then(() => process.exit(0)));
+})();
@@ -4,138 +4,108 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
+from figures import FigureJob, capture_style, render_figures
+from report_engine import Report
+from results_store import read_results
+from violation_metrics import ViolationMetrics
+
 # Set plotting style
-sns.set_theme(style="whitegrid")
+def apply_style():
+    sns.set_theme(style="whitegrid")
+
+apply_style()
+STYLE = capture_style(apply_style)
 
-# Define the input file path
-# NOTE: Ensure you place your Result.xlsx file in the root of your repo 
-# or update this path accordingly.
-INPUT_FILE = "Result.xlsx" 
+# Results are read from the Parquet results store written by analyze.ipynb
+# (see results_store.py). None selects the latest run.
+RESULTS_RUN = None
+COLUMNS = ['Website', 'ID_Leaking_Count', 'Cookie_Sync_Count', 'Fingerprinting_Count',
+           'Total_Violations', 'Is_Compliant']
 OUTPUT_DIR = "analysis_results"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def load_data(file_path):
-    """Loads data from the Excel file."""
+def load_data(run=None):
+    """Loads one run from the results store (only the needed columns)."""
     try:
-        # Use the correct engine for Excel files
-        df = pd.read_excel(file_path)
-        # Clean up column names by stripping whitespace
-        df.columns = df.columns.str.strip()
-        return df
+        return read_results(columns=COLUMNS, run=run)
     except Exception as e:
         print(f"Error loading data: {e}")
         return None
 
 def calculate_metrics(df):
-    """Calculates core compliance and violation metrics."""
-    
-    total_sites = len(df)
-    
-    # 1. Compliance Metrics
-    # The 'Is_Compliant' column is a boolean (True/False)
-    compliant_sites = df['Is_Compliant'].sum()
-    non_compliant_sites = total_sites - compliant_sites
-    compliance_rate = compliant_sites / total_sites
-    non_compliance_rate = non_compliant_sites / total_sites
-    
-    # 2. Violation Distribution
-    total_violations = df['Total_Violations'].sum()
-    id_leaking_total = df['ID_Leaking_Count'].sum()
-    cookie_sync_total = df['Cookie_Sync_Count'].sum()
-    fingerprinting_total = df['Fingerprinting_Count'].sum()
-    
-    # 3. Average Violations
-    avg_violations_per_site = df['Total_Violations'].mean()
-    # Calculate average violations only for non-compliant sites
-    non_compliant_df = df[df['Is_Compliant'] == False]
-    avg_violations_non_compliant = non_compliant_df['Total_Violations'].mean() if not non_compliant_df.empty else 0
-    
-    # 4. Violation Type Percentages
-    violation_counts = {
-        'ID Leaking': id_leaking_total,
-        'Cookie Sync': cookie_sync_total,
-        'Fingerprinting': fingerprinting_total
-    }
-    violation_series = pd.Series(violation_counts)
-    violation_percentages = (violation_series / total_violations) * 100
-    
-    metrics = {
-        'Total Sites': total_sites,
-        'Compliant Sites': compliant_sites,
-        'Non-Compliant Sites': non_compliant_sites,
-        'Compliance Rate (%)': compliance_rate * 100,
-        'Non-Compliance Rate (%)': non_compliance_rate * 100,
-        'Total Violations Detected': total_violations,
-        'Avg Violations (All Sites)': avg_violations_per_site,
-        'Avg Violations (Non-Compliant)': avg_violations_non_compliant,
-        'ID Leaking Total': id_leaking_total,
-        'Cookie Sync Total': cookie_sync_total,
-        'Fingerprinting Total': fingerprinting_total,
-        'ID Leaking (%)': violation_percentages.get('ID Leaking', 0),
-        'Cookie Sync (%)': violation_percentages.get('Cookie Sync', 0),
-        'Fingerprinting (%)': violation_percentages.get('Fingerprinting', 0)
-    }
-    
-    return metrics
+    """Calculates core compliance and violation metrics.
 
-def generate_visualizations(df, metrics):
-    """Generates and saves key visualizations."""
-    
-    # --- 1. Compliance Rate Pie Chart ---
-    compliance_data = df['Is_Compliant'].value_counts()
+    The sums behind them are kept in a ViolationMetrics state, which can
+    also be built site by site or merged across shards (see
+    violation_metrics.py) instead of from one in-memory frame.
+    """
+    return ViolationMetrics.from_frame(df).metrics()
+
+def plot_compliance_pie(path, data):
     labels = ['Compliant', 'Non-Compliant']
-    sizes = [compliance_data.get(True, 0), compliance_data.get(False, 0)]
     colors = ['#4CAF50', '#FF5722'] # Green for compliant, Red for non-compliant
     
     plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90,
+    plt.pie(data['sizes'], labels=labels, colors=colors, autopct='%1.1f%%', startangle=90,
             wedgeprops={'edgecolor': 'black', 'linewidth': 1})
-    plt.title(f'Overall Compliance Rate (N={len(df)})', fontsize=16)
-    plt.savefig(os.path.join(OUTPUT_DIR, 'compliance_rate_pie.png'))
+    plt.title(f'Overall Compliance Rate (N={data["n"]})', fontsize=16)
+    plt.savefig(path)
     plt.close()
-    
-    # --- 2. Violation Type Distribution Bar Chart ---
-    violation_types = pd.DataFrame({
-        'Type': ['ID Leaking', 'Cookie Sync', 'Fingerprinting'],
-        'Count': [metrics['ID Leaking Total'], metrics['Cookie Sync Total'], metrics['Fingerprinting Total']]
-    })
-    
+
+def plot_violation_types(path, violation_types):
     plt.figure(figsize=(10, 6))
     sns.barplot(x='Type', y='Count', data=violation_types, palette=['#004B87', '#C41E3A', '#FFC300'])
     plt.title('Distribution of Tracking Violation Types', fontsize=16)
     plt.ylabel('Total Count of Violations', fontsize=12)
     plt.xlabel('Violation Type', fontsize=12)
-    plt.savefig(os.path.join(OUTPUT_DIR, 'violation_type_bar.png'))
+    plt.savefig(path)
     plt.close()
-    
-    # --- 3. Severity Ranking (Top 10 Non-Compliant Sites) ---
-    non_compliant_df = df[df['Is_Compliant'] == False].sort_values(by='Total_Violations', ascending=False).head(10)
-    
+
+def plot_severity_ranking(path, non_compliant_df):
     plt.figure(figsize=(12, 7))
     sns.barplot(x='Total_Violations', y='Website', data=non_compliant_df, palette='Reds_d')
     plt.title('Top 10 Most Non-Compliant Websites (Severity Ranking)', fontsize=16)
     plt.xlabel('Total Violations Detected', fontsize=12)
     plt.ylabel('Website', fontsize=12)
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'severity_ranking_bar.png'))
+    plt.savefig(path)
     plt.close()
-    
-    return [
-        os.path.join(OUTPUT_DIR, 'compliance_rate_pie.png'),
-        os.path.join(OUTPUT_DIR, 'violation_type_bar.png'),
-        os.path.join(OUTPUT_DIR, 'severity_ranking_bar.png')
-    ]
 
-def main():
-    df = load_data(INPUT_FILE)
+def figure_jobs(report):
+    """The three summary charts, each keyed by the slice of data it plots."""
+    metrics = report.metrics
+    compliance_data = report.compliance_counts
     
-    if df is None or df.empty:
-        print("Analysis failed: Data is empty or could not be loaded.")
-        return
+    # --- 1. Compliance Rate Pie Chart ---
+    sizes = [compliance_data.get('Yes', 0), compliance_data.get('No', 0)]
     
-    print(f"Successfully loaded {len(df)} rows of data.")
+    # --- 2. Violation Type Distribution Bar Chart ---
+    violation_types = pd.DataFrame({
+        'Type': ['ID Leaking', 'Cookie Sync', 'Fingerprinting'],
+        'Count': [metrics['ID Leaking Total'], metrics['Cookie Sync Total'], metrics['Fingerprinting Total']]
+    })
+    
+    # --- 3. Severity Ranking (Top 10 Non-Compliant Sites) ---
+    non_compliant_df = report.top_non_compliant.head(10)[['Website', 'Total_Violations']]
     
-    metrics = calculate_metrics(df)
+    return [
+        FigureJob(os.path.join(OUTPUT_DIR, 'compliance_rate_pie.png'), plot_compliance_pie,
+                  {'sizes': sizes, 'n': len(report.df)}, {}, STYLE),
+        FigureJob(os.path.join(OUTPUT_DIR, 'violation_type_bar.png'), plot_violation_types,
+                  violation_types, {}, STYLE),
+        FigureJob(os.path.join(OUTPUT_DIR, 'severity_ranking_bar.png'), plot_severity_ranking,
+                  non_compliant_df, {}, STYLE),
+    ]
+
+def generate_visualizations(report):
+    """Renders the key visualizations whose data changed; returns all their paths."""
+    jobs = figure_jobs(report)
+    render_figures(jobs)
+    return [job.path for job in jobs]
+
+def write_reports(report, figures=True):
+    """Writes the metrics summary, charts and processed data for one report."""
+    metrics = report.metrics
     
     # Save metrics to a file for the report
     with open(os.path.join(OUTPUT_DIR, 'metrics_summary.txt'), 'w') as f:
@@ -144,11 +114,23 @@ def main():
             
     print("Metrics calculated and saved.")
     
-    image_paths = generate_visualizations(df, metrics)
-    print(f"Visualizations generated: {image_paths}")
+    if figures:
+        image_paths = generate_visualizations(report)
+        print(f"Visualizations generated: {image_paths}")
     
     # Save the processed DataFrame (optional, but good practice)
-    df.to_csv(os.path.join(OUTPUT_DIR, 'processed_data.csv'), index=False)
+    report.df.to_csv(os.path.join(OUTPUT_DIR, 'processed_data.csv'), index=False)
+
+def main():
+    df = load_data(RESULTS_RUN)
+    
+    if df is None or df.empty:
+        print("Analysis failed: Data is empty or could not be loaded.")
+        return
+    
+    print(f"Successfully loaded {len(df)} rows of data.")
+    
+    write_reports(Report(df))
     
     print("Analysis complete.")
     
@@ -1,7 +1,9 @@
-import json
 import os
 import pandas as pd
 
+from result_index import ResultIndex
+from trace_store import find_file
+
 # --- ASSUMPTION ---
 # This script assumes that the Consent-Guard Detector has been modified 
 # to save the 'result.json' file directly into the website's data directory 
@@ -21,46 +23,27 @@ WEBSITES = [
 def parse_results_scalable():
     """
     Parses the result.json file for each website and aggregates the compliance data.
-    Reads violation counts directly from the JSON structure.
+    Rows are kept in a result index next to the raw results, so a rerun only
+    parses result.json files that are new or changed since the last call.
     """
-    data = []
+    index = ResultIndex(os.path.join(BASE_DIR, "result_index.sqlite"))
     
     for site_dir in WEBSITES:
         # Construct the expected path for the result.json file
-        result_path = os.path.join(BASE_DIR, site_dir, "result.json")
+        result_path = find_file(os.path.join(BASE_DIR, site_dir), "result.json")
         
-        if not os.path.exists(result_path):
+        if result_path is None:
             print(f"Warning: result.json not found for {site_dir}. Skipping.")
             continue
             
         try:
-            with open(result_path, 'r') as f:
-                result_data = json.load(f)
-                
-            # Extract violation counts from the JSON structure
-            id_leaking = result_data.get("idLeaking", 0)
-            cookie_sync = result_data.get("cookieSync", 0)
-            fingerprinting = result_data.get("fingerprinting", 0)
-            
-            total_violations = id_leaking + cookie_sync + fingerprinting
-            
-            site_data = {
-                "Website": site_dir.replace("www_", "").replace("_", "."),
-                "ID_Leaking_Count": id_leaking,
-                "Cookie_Sync_Count": cookie_sync,
-                "Fingerprinting_Count": fingerprinting,
-                "Total_Violations": total_violations,
-                "Is_Compliant": total_violations == 0
-            }
-            
-            data.append(site_data)
-            
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON for {site_dir}. Skipping.")
+            index.update(BASE_DIR, site_dir)
         except Exception as e:
             print(f"An unexpected error occurred for {site_dir}: {e}")
 
-    return pd.DataFrame(data)
+    df = index.to_dataframe(WEBSITES)
+    index.close()
+    return df
 
 if __name__ == "__main__":
     df = parse_results_scalable()
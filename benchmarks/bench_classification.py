@@ -0,0 +1,61 @@
+"""Region/industry tagging: per-keyword `in` loops vs. the compiled matchers.
+
+Run from the repository root:
+    python -m benchmarks.bench_classification [n_domains]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_domains
+from classification import (EU_DOMAINS, EU_TLDS, INDUSTRY_RULES, classify_industries,
+                            classify_regions)
+
+
+def baseline_region(domain):
+    # classify_region before the matchers
+    domain_lower = domain.lower()
+    for tld in EU_TLDS:
+        if domain_lower.endswith(tld):
+            return 'EU'
+    for eu_domain in EU_DOMAINS:
+        if eu_domain in domain_lower:
+            return 'EU'
+    return 'US'
+
+
+def baseline_industry(website):
+    # classify_industry before the matchers
+    website_lower = website.lower()
+    for industry, keywords in INDUSTRY_RULES.items():
+        if industry == 'Other':
+            continue
+        for keyword in keywords:
+            if keyword in website_lower:
+                return industry
+    return 'Other'
+
+
+def timed(label, fn, n):
+    started = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s {n / elapsed / 1e6:8.2f} M domains/s")
+    return out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    domains = make_domains(n)
+    print(f"{n} domains\n")
+
+    expected_regions = timed("region: loops", lambda: [baseline_region(d) for d in domains], n)
+    regions = timed("region: suffix trie + AC", lambda: classify_regions(domains), n)
+    expected_industries = timed("industry: loops", lambda: [baseline_industry(d) for d in domains], n)
+    industries = timed("industry: Aho-Corasick", lambda: classify_industries(domains), n)
+
+    assert regions == expected_regions
+    assert industries == expected_industries
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"use strict";
+
+/* ID leaking / cookie synchronization: pairwise cookie x request scans vs.
+ * the indexed matcher in Source/Detector/detectors/leaks.js.
+ *
+ * Needs Data/EnglishDictionary like the detector. Run from anywhere:
+ *     node benchmarks/bench_leaks.js [n_requests] [n_cookies]
+ */
+
+/****** Dependencies ******/
+
+const assert = require("assert");
+
+const Detector = __dirname + "/../Source/Detector";
+
+const Cookies = require(Detector + "/helpers/cookies.js");
+const Requests = require(Detector + "/helpers/requests.js");
+const Utils = require(Detector + "/helpers/utils.js");
+const { IdLeaking, CookieSynchronization } = require(Detector + "/detectors/leaks.js");
+
+/****** Definitions ******/
+
+const TRACKERS = [
+    "doubleclick.net", "google-analytics.com", "facebook.com", "adnxs.com",
+    "criteo.com", "rubiconproject.com", "pubmatic.com", "casalemedia.com",
+    "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com"
+];
+
+const FIRST_PARTY = "www.example.com";
+
+/****** Baseline ******/
+
+/* The leak detection before the matcher: every cookie against every
+ * request, re-parsing the request for each cookie */
+function BaselineSearch(cookieValues, params) {
+    if (cookieValues.length === 0 || params.length === 0) return false;
+    return cookieValues.some(n => params.some(p => p.includes(n)));
+}
+
+function BaselineIsPartOfRequest(cookie, req) {
+    const cookieValues = Cookies.ExtractCookieValues(cookie.value);
+
+    let params = Requests.GetUrlParams(req.url);
+    if (params.length == 0) params = Requests.GetCustomUrlParams(req.url);
+    if (BaselineSearch(cookieValues, params)) return true;
+
+    if (req.postData !== undefined && req.postData !== null) {
+        let post = [];
+        if (Utils.IsJson(req.postData)) post = Utils.GetJsonValues(req.postData);
+        else if (Utils.IsUri(req.postData)) post = Requests.GetUrlParams(req.postData);
+        else post.push(req.postData);
+        if (BaselineSearch(cookieValues, post)) return true;
+    }
+
+    if (!req.headers.referer) return false;
+    return BaselineSearch(cookieValues, Requests.GetUrlParams(req.headers.referer));
+}
+
+function BaselineIsCookieLeak(cookie, req, firstParty) {
+    if (!Requests.IsActualRequest(req.url)) return false;
+
+    const receivingDomain = Utils.ExtractHostname(req.url);
+    if (Utils.AreSameDomain(Cookies.GetCookieDomain(cookie), receivingDomain)) return false;
+    if (firstParty && Utils.AreSameDomain(firstParty, receivingDomain)) return false;
+
+    return BaselineIsPartOfRequest(cookie, req);
+}
+
+function BaselineCookieLeak(cookies, requests, firstParty) {
+    let results = [];
+
+    cookies.forEach(cookie => {
+        if (Cookies.IsCommonCookieValue(cookie.value) || Cookies.IsConsentCookie(cookie.name)) return;
+
+        requests.forEach(req => {
+            if (!BaselineIsCookieLeak(cookie, req, firstParty)) return;
+
+            const url = "[" + req.method + "] " + req.url;
+            const thirdParty = Utils.ExtractHostname(req.url);
+            let entry = results.find(e => e.cookie == cookie.name && e.value == cookie.value);
+            if (!entry) {
+                entry = { "cookie": cookie.name, "value": cookie.value, "domain": cookie.domain,
+                          "associated3rdParties": [], "sent": [] };
+                results.push(entry);
+            }
+            if (!entry.sent.includes(url)) entry.sent.push(url);
+            if (!entry.associated3rdParties.includes(thirdParty)) entry.associated3rdParties.push(thirdParty);
+        });
+    });
+
+    return results;
+}
+
+/****** Functions ******/
+
+/* Deterministic pseudo-random numbers, so runs are comparable */
+function Random(seed) {
+    let state = seed >>> 0;
+    return function() {
+        state = (state * 1664525 + 1013904223) >>> 0;
+        return state / 4294967296;
+    };
+}
+
+function MakeTrace(nRequests, nCookies, seed) {
+    assert(nRequests > 0 && nCookies > 0);
+
+    const random = Random(seed);
+    const pick = array => array[Math.floor(random() * array.length)];
+    const hex = () => Math.floor(random() * 0xffffffff).toString(16).padStart(8, "0") +
+                      Math.floor(random() * 0xffffffff).toString(16).padStart(8, "0");
+
+    let cookies = [];
+    let thirdCookies = [];
+    for (let i = 0; i < nCookies; ++i) {
+        cookies.push({ "name": "_fp" + i, "value": hex(), "domain": "." + FIRST_PARTY.substr(4) });
+        thirdCookies.push({ "name": "_tp" + i, "value": hex(), "domain": "." + pick(TRACKERS) });
+    }
+    const values = cookies.concat(thirdCookies).map(c => c.value);
+
+    let requests = [];
+    for (let i = 0; i < nRequests; ++i) {
+        const host = (random() < 0.2) ? FIRST_PARTY : "px" + (i % 7) + "." + pick(TRACKERS);
+        const leaked = (random() < 0.05) ? pick(values) : hex();
+        let req = {
+            "url": "https://" + host + "/sync?uid=" + leaked + "&cb=" + i + "&ref=" + "x".repeat(Math.floor(random() * 200)),
+            "method": (random() < 0.8) ? "GET" : "POST",
+            "headers": { "referer": "https://" + FIRST_PARTY + "/article/" + (i % 50) + "?s=" + hex() }
+        };
+        if (req.method == "POST") req.postData = JSON.stringify({ "event": "view", "id": hex(), "n": i });
+        requests.push(req);
+    }
+
+    return { "cookies": cookies, "thirdCookies": thirdCookies, "requests": requests };
+}
+
+function Timed(label, fn, nPairs) {
+    const started = process.hrtime.bigint();
+    const result = fn();
+    const elapsed = Number(process.hrtime.bigint() - started) / 1e9;
+    console.log(label.padEnd(28), elapsed.toFixed(2).padStart(8) + "s",
+                (nPairs / elapsed / 1e6).toFixed(2).padStart(8), "M pairs/s");
+    return result;
+}
+
+/****** Main ******/
+
+(function main() {
+    const nRequests = parseInt(process.argv[2] || "5000");
+    const nCookies = parseInt(process.argv[3] || "100");
+    const trace = MakeTrace(nRequests, nCookies, 636);
+    const firstParty = FIRST_PARTY.substr(4);
+    const nPairs = nRequests * nCookies;
+    console.log(nRequests, "requests,", nCookies, "first-party and", nCookies, "third-party cookies\n");
+
+    const expectedId = Timed("id leaking: pairwise", () => BaselineCookieLeak(trace.cookies, trace.requests), nPairs);
+    const idLeaking = Timed("id leaking: indexed", () => IdLeaking(trace.cookies, trace.requests), nPairs);
+    const expectedSync = Timed("cookie sync: pairwise",
+                               () => BaselineCookieLeak(trace.thirdCookies, trace.requests, firstParty), nPairs);
+    const cookieSync = Timed("cookie sync: indexed",
+                             () => CookieSynchronization(trace.thirdCookies, trace.requests, firstParty), nPairs);
+
+    assert.deepStrictEqual(idLeaking, expectedId);
+    assert.deepStrictEqual(cookieSync, expectedSync);
+    console.log("\nLeaks found:", idLeaking.length, "ID leaking,", cookieSync.length, "cookie sync");
+})();
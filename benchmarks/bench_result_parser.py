@@ -0,0 +1,58 @@
+"""Throughput of result.json parsing: json.load vs. fast path vs. process pool.
+
+Run from the repository root:
+    python -m benchmarks.bench_result_parser [n_sites] [leaks_per_site]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_results_tree
+from result_parser import count_violations, parse_result_file, parse_result_files
+
+
+def baseline(path):
+    # What parse_results_inlined did: load everything, then len()
+    with open(path) as f:
+        result = json.load(f)
+    return (len(result.get("idLeaking", [])), len(result.get("cookieSync", [])),
+            len(result.get("fingerprinting", {}).get("functions", [])))
+
+
+def fast_path(path):
+    with open(path, "rb") as f:
+        return count_violations(f.read())
+
+
+def timed(label, fn, total_mb):
+    started = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s {total_mb / elapsed:10.1f} MB/s")
+    return out
+
+
+def main():
+    n_sites = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    leaks = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    with tempfile.TemporaryDirectory() as results_dir:
+        site_dirs = write_results_tree(results_dir, n_sites, id_leaking=leaks,
+                                       cookie_sync=leaks * 2, fingerprinting=2)
+        paths = [os.path.join(results_dir, d, "result.json") for d in site_dirs]
+        total_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{n_sites} results, {total_mb / n_sites:.1f} MB each, {total_mb:.0f} MB total\n")
+
+        expected = timed("json.load + len()", lambda: [baseline(p) for p in paths], total_mb)
+        fast = timed("fast path (serial)", lambda: [fast_path(p) for p in paths], total_mb)
+        serial = timed("fast path + sha256 (serial)", lambda: [parse_result_file(p) for p in paths], total_mb)
+        pooled = timed(f"process pool ({os.cpu_count()} cpus)", lambda: parse_result_files(paths), total_mb)
+
+        assert fast == expected
+        assert [r[3] for r in serial] == expected
+        assert [r[3] for r in pooled] == expected
+
+
+if __name__ == "__main__":
+    main()
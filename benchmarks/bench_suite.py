@@ -0,0 +1,444 @@
+"""Timings and peak memory of the analysis layer on synthetic studies.
+
+Generates (and keeps, under benchmarks/data/) a synthetic results table and
+Source/Results tree per scale, runs every case in its own process and
+stores the timings in benchmarks/results/<run_id>.json, so runs can be
+compared for regressions. No Node or Chrome is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite run [--scales 1k,100k,1m] [--cases a,b] [--repeat N]
+    python -m benchmarks.bench_suite compare [old.json] [new.json] [--threshold 0.2]
+    python -m benchmarks.bench_suite cases
+"""
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import (make_result_table, make_third_party_facts,  # noqa: E402
+                                  write_table_tree)
+from results_store import read_results, write_run, write_violations  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SCALES = ["1k", "100k"]
+
+SEED = 636
+
+# A case is slower (or bigger) than its baseline if it grew by more than
+# the threshold and by more than this much in absolute terms
+MIN_SECONDS = 0.05
+MIN_MB = 5.0
+
+
+# --- Synthetic data ---
+
+def data_dir(n, seed=SEED):
+    return os.path.join(DATA_DIR, f"n{n}-s{seed}")
+
+
+def prepare_table(n, seed=SEED):
+    """Directory of the results store holding the synthetic table of `n` sites."""
+    store = os.path.join(data_dir(n, seed), "store")
+    if not os.path.isdir(store):
+        started = time.perf_counter()
+        df = make_result_table(n, seed)
+        write_run(df, "synthetic", store)
+        write_violations(make_third_party_facts(df, seed), "synthetic", store)
+        print(f"Generated a {n}-site table in {time.perf_counter() - started:.1f}s")
+    return store
+
+
+def prepare_tree(n, seed=SEED):
+    """Source/Results-style folder with one result.json per site of the table."""
+    results_dir = os.path.join(data_dir(n, seed), "Results")
+    marker = os.path.join(results_dir, ".complete")
+    if not os.path.exists(marker):
+        started = time.perf_counter()
+        shutil.rmtree(results_dir, ignore_errors=True)
+        df = read_results(run="synthetic", store=prepare_table(n, seed))
+        write_table_tree(results_dir, df, seed)
+        open(marker, "w").close()
+        print(f"Generated a {n}-site results tree in {time.perf_counter() - started:.1f}s")
+    return results_dir
+
+
+# --- Cases ---
+# Each case does its setup and returns the function that is measured
+
+def _table(data):
+    return read_results(run="synthetic", store=data["store"])
+
+
+def _site_dirs(results_dir):
+    with os.scandir(results_dir) as entries:
+        return sorted(e.name for e in entries if e.is_dir())
+
+
+def case_parse_results_inlined(data):
+    # The notebook's parse_results_inlined with an empty result index
+    from result_index import ResultIndex
+    index = ResultIndex(os.path.join(data["workdir"], "result_index.sqlite"))
+
+    def run():
+        index.refresh(data["results_dir"])
+        return index.to_dataframe()
+    return run
+
+
+def case_parse_results_inlined_warm(data):
+    # Rerun on an up-to-date index: one stat per site, nothing re-parsed
+    from result_index import ResultIndex
+    index = ResultIndex(os.path.join(data["workdir"], "result_index.sqlite"))
+    index.refresh(data["results_dir"])
+
+    def run():
+        index.refresh(data["results_dir"])
+        return index.to_dataframe()
+    return run
+
+
+def case_parse_results_scalable(data):
+    import analyze_pilot_results_scalable as scalable
+    scalable.BASE_DIR = data["results_dir"]
+    scalable.WEBSITES = _site_dirs(data["results_dir"])
+    for suffix in ("", "-wal", "-shm"):
+        path = os.path.join(data["results_dir"], "result_index.sqlite" + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+    return scalable.parse_results_scalable
+
+
+def case_calculate_metrics(data):
+    from analyze_full_study import calculate_metrics
+    df = _table(data)
+    return lambda: calculate_metrics(df)
+
+
+def case_classify_region(data):
+    from classification import classify_region
+    websites = _table(data)["Website"].tolist()
+    return lambda: [classify_region(w) for w in websites]
+
+
+def case_classify_regions(data):
+    from classification import classify_regions
+    websites = _table(data)["Website"]
+    return lambda: classify_regions(websites)
+
+
+def case_classify_industry(data):
+    from classification import classify_industry
+    websites = _table(data)["Website"].tolist()
+    return lambda: [classify_industry(w) for w in websites]
+
+
+def case_classify_industries(data):
+    from classification import classify_industries
+    websites = _table(data)["Website"]
+    return lambda: classify_industries(websites)
+
+
+def case_tracker_matrix(data):
+    # Loading the incidence matrix plus prevalence, lift and co-occurrence per slice
+    from tracker_matrix import TrackerMatrix
+
+    def run():
+        matrix = TrackerMatrix.load("synthetic", data["store"])
+        for by in (None, "Region", "Industry"):
+            matrix.prevalence(20, by)
+            matrix.lift(20, by)
+        return matrix.cooccurrence(50)
+    return run
+
+
+def case_report_aggregates(data):
+    # Loading a run for the reports, its labelled site frame and group-bys
+    from report_engine import Report
+
+    def run():
+        report = Report.load("synthetic", data["store"])
+        return (report.by_region, report.by_industry, report.severity_counts,
+                report.compliance_counts)
+    return run
+
+
+def case_run_digest(data):
+    # Content-hashing every site of a run (counts and facts) for run_history
+    from run_history import digest_sites
+    df = _table(data)
+    facts = make_third_party_facts(df, SEED)
+    return lambda: digest_sites(df, facts)
+
+
+def _report_case(module_name):
+    # A report script end to end: aggregates, figures and data files,
+    # written into the case's working directory
+    def case(data):
+        import importlib
+        from report_engine import Report
+        os.makedirs("visualization", exist_ok=True)
+        module = importlib.import_module(module_name)
+        df = _table(data)
+        return lambda: module.write_reports(Report(df))
+    return case
+
+
+CASES = {
+    "parse_results_inlined": case_parse_results_inlined,
+    "parse_results_inlined_warm": case_parse_results_inlined_warm,
+    "parse_results_scalable": case_parse_results_scalable,
+    "calculate_metrics": case_calculate_metrics,
+    "classify_region": case_classify_region,
+    "classify_regions": case_classify_regions,
+    "classify_industry": case_classify_industry,
+    "classify_industries": case_classify_industries,
+    "tracker_matrix": case_tracker_matrix,
+    "report_aggregates": case_report_aggregates,
+    "run_digest": case_run_digest,
+    "report_analyze_full_study": _report_case("analyze_full_study"),
+    "report_visualize_result250": _report_case("visualization.visualize_result250"),
+    "report_eu_vs_us_comparison": _report_case("visualization.eu_vs_us_comparison"),
+    "report_industry_analysis": _report_case("visualization.industry_analysis"),
+}
+
+# Cases that read the results tree rather than the table
+TREE_CASES = {"parse_results_inlined", "parse_results_inlined_warm", "parse_results_scalable"}
+
+
+# --- Measurement ---
+
+def _status_mb(field):
+    """A memory field of /proc/self/status in MB; None where there is no procfs."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """Resets the peak RSS to the current RSS (Linux); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_mb():
+    peak = _status_mb("VmHWM")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return peak
+
+
+def _measure(conn, name, data):
+    """Runs one case in a fresh process and sends back its measurements."""
+    try:
+        os.chdir(data["workdir"])
+        sys.path.insert(0, ROOT)
+        run = CASES[name](data)
+        reset = _reset_peak()
+        rss = _status_mb("VmRSS") or 0.0
+        # The reports' own output would interleave with the table
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+        peak = _peak_mb()
+        # Without a reset the peak may predate the case, e.g. the setup
+        conn.send({"seconds": seconds, "peak_mb": peak,
+                   "delta_mb": max(0.0, peak - rss) if reset else None})
+    except Exception:
+        conn.send({"error": traceback.format_exc()})
+    finally:
+        conn.close()
+
+
+def measure(name, data):
+    """{"seconds", "peak_mb", "delta_mb"} of one run of a case, or {"error"}."""
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        process = ctx.Process(target=_measure, args=(sender, name, dict(data, workdir=workdir)))
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = {"error": "case process died"}
+        process.join()
+        if process.exitcode and "error" not in result:
+            result = {"error": f"case process exited with {process.exitcode}"}
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def run_suite(scales, cases, repeat=1):
+    """Measures `cases` at every scale; returns the list of case records."""
+    records = []
+    for scale in scales:
+        n = SCALES[scale]
+        data = {"store": prepare_table(n)}
+        if TREE_CASES & set(cases):
+            data["results_dir"] = prepare_tree(n)
+        print(f"\n{scale} sites")
+        for name in cases:
+            if name in TREE_CASES and "results_dir" not in data:
+                continue
+            runs = [measure(name, data) for _ in range(repeat)]
+            errors = [r["error"] for r in runs if "error" in r]
+            record = {"scale": scale, "sites": n, "case": name}
+            if errors:
+                record["error"] = errors[0]
+                print(f"{name:<28} failed:\n{errors[0]}")
+            else:
+                deltas = [r["delta_mb"] for r in runs if r["delta_mb"] is not None]
+                record.update({
+                    "seconds": _median([r["seconds"] for r in runs]),
+                    "runs": [round(r["seconds"], 4) for r in runs],
+                    "peak_mb": round(max(r["peak_mb"] for r in runs), 1),
+                    "delta_mb": round(max(deltas), 1) if deltas else None,
+                })
+                delta = f"{record['delta_mb']:8.1f}" if deltas else "       -"
+                print(f"{name:<28} {record['seconds']:8.2f}s {record['peak_mb']:8.1f} MB peak"
+                      f" {delta} MB during the case")
+            records.append(record)
+    return records
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(records, run_id=None):
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{run_id}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "run": run_id,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": SEED,
+            "cases": records,
+        }, f, indent=2)
+    return path
+
+
+# --- Comparison ---
+
+def list_results():
+    """Stored result files, oldest first."""
+    if not os.path.isdir(RESULTS_DIR):
+        return []
+    return sorted(os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+                  if name.endswith(".json"))
+
+
+def _grew(old, new, threshold, floor):
+    return old is not None and new is not None and new - old > max(old * threshold, floor)
+
+
+def compare(old_path, new_path, threshold=0.2):
+    """Prints both runs side by side; returns the (scale, case) keys that regressed."""
+    with open(old_path) as f:
+        old = {(r["scale"], r["case"]): r for r in json.load(f)["cases"]}
+    with open(new_path) as f:
+        new = json.load(f)["cases"]
+    print(f"{os.path.basename(old_path)} -> {os.path.basename(new_path)}\n")
+    print(f"{'scale':<6} {'case':<28} {'old s':>9} {'new s':>9} {'ratio':>7} {'old MB':>8} {'new MB':>8}")
+    regressions = []
+    for record in new:
+        key = (record["scale"], record["case"])
+        base = old.get(key)
+        if base is None or "error" in base or "error" in record:
+            state = "new" if base is None else "error"
+            print(f"{key[0]:<6} {key[1]:<28} {state:>9}")
+            continue
+        slower = _grew(base["seconds"], record["seconds"], threshold, MIN_SECONDS)
+        bigger = _grew(base.get("delta_mb"), record.get("delta_mb"), threshold, MIN_MB)
+        flag = "  REGRESSION" if slower or bigger else ""
+        if flag:
+            regressions.append(key)
+        old_mb = base.get("delta_mb") if base.get("delta_mb") is not None else base["peak_mb"]
+        new_mb = record.get("delta_mb") if record.get("delta_mb") is not None else record["peak_mb"]
+        print(f"{key[0]:<6} {key[1]:<28} {base['seconds']:9.3f} {record['seconds']:9.3f} "
+              f"{record['seconds'] / max(base['seconds'], 1e-9):7.2f} {old_mb:8.1f} {new_mb:8.1f}{flag}")
+    print(f"\n{len(regressions)} regressions (threshold {threshold:.0%})")
+    return regressions
+
+
+def _option(args, name, default):
+    if name not in args:
+        return args, default
+    i = args.index(name)
+    return args[:i] + args[i + 2:], args[i + 1]
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "run":
+        args, scales = _option(args, "--scales", ",".join(DEFAULT_SCALES))
+        args, cases = _option(args, "--cases", ",".join(CASES))
+        args, repeat = _option(args, "--repeat", "1")
+        scales = [s.lower() for s in scales.split(",")]
+        cases = cases.split(",")
+        unknown = [s for s in scales if s not in SCALES] + [c for c in cases if c not in CASES]
+        if unknown:
+            print(f"Unknown scales or cases: {', '.join(unknown)}")
+            return 2
+        records = run_suite(scales, cases, int(repeat))
+        print(f"\nResults saved to {save_results(records)}")
+    elif args and args[0] == "compare":
+        args, threshold = _option(args, "--threshold", "0.2")
+        paths = args[1:] or list_results()[-2:]
+        if len(paths) != 2:
+            print("Need two result files to compare")
+            return 2
+        return 1 if compare(paths[0], paths[1], float(threshold)) else 0
+    elif args and args[0] == "cases":
+        for name in CASES:
+            print(name)
+    else:
+        print("Usage: python -m benchmarks.bench_suite run [--scales 1k,100k,1m] [--cases a,b] [--repeat N]")
+        print("       python -m benchmarks.bench_suite compare [old.json] [new.json] [--threshold 0.2]")
+        print("       python -m benchmarks.bench_suite cases")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""A sharded study run locally against a stand-in crawler, checked against an unsharded run.
+
+Writes a synthetic domain list (with www./URL duplicates and invalid
+entries), runs every shard in its own process and the same study unsharded,
+merges the shards with shards.merge_shards and compares the merged run with
+the unsharded one: aggregate rows, violation facts and metrics must be
+identical. Each shard goes through the real pipeline - DomainList with
+shard=, RunLedger, StudyScheduler, ResultIndex and the results store - with
+the crawler and detector replaced by a stand-in that writes a synthetic
+result.json per site (and fails a fixed set of sites). No Node or Chrome is
+needed.
+
+Run from the repository root:
+    python -m benchmarks.shard_check [--shards 4] [--sites 2000] [--workdir DIR]
+"""
+import hashlib
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import make_result, site_domains, write_result  # noqa: E402
+from domain_list import DomainList, parse_shard  # noqa: E402
+from process_runner import OK, StageOutcome  # noqa: E402
+from result_index import ResultIndex  # noqa: E402
+from results_store import read_results, read_violations, write_run, write_violations  # noqa: E402
+from run_ledger import RunLedger  # noqa: E402
+from scheduler import StudyScheduler  # noqa: E402
+from shards import merge_shards, shard_paths  # noqa: E402
+from violation_metrics import ViolationMetrics  # noqa: E402
+
+SEED = 636
+
+# One site in FAIL_EVERY fails to crawl, the same ones in every run
+FAIL_EVERY = 50
+
+
+def write_domain_list(path, n, seed=SEED):
+    """A header-less CSV of `n` sites, plus www./URL variants of some and invalid rows."""
+    rng = random.Random(seed)
+    rows = []
+    for domain in site_domains(n, seed):
+        rows.append(domain)
+        if rng.random() < 0.2:
+            rows.append(rng.choice(["www.", "https://www.", "http://"]) + domain + rng.choice(["", "/"]))
+        if rng.random() < 0.01:
+            rows.append("not a domain")
+    with open(path, "w") as f:
+        f.write("\n".join(f"{rank},{row}" for rank, row in enumerate(rows, 1)) + "\n")
+
+
+def _site_seed(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def stand_in_crawl(results_dir):
+    """crawl(url, folder) that writes the site's result.json itself (so detect has nothing to do)."""
+    def crawl(url, folder):
+        started = time.monotonic()
+        key = folder.rpartition("_")[0]
+        seed = _site_seed(key)
+        if seed % FAIL_EVERY == 0:
+            return StageOutcome(False, 1, time.monotonic() - started, "crash")
+        rng = random.Random(seed)
+        counts = [rng.choice([0, 0, 0, 1, 2, 4]), rng.choice([0, 0, 1, 3, 9]), rng.choice([0, 0, 0, 1, 3])]
+        write_result(os.path.join(results_dir, folder, "result.json"),
+                     make_result(key, rng, *counts, third_parties=rng.randint(0, 12), url_length=60))
+        return StageOutcome(True, 1, time.monotonic() - started, OK)
+    return crawl
+
+
+def run_shard(list_path, shard, root, results_dir):
+    """One shard's study: ledger, pipeline, then its run in its own results store."""
+    paths = shard_paths(shard, root)
+    ledger = RunLedger(paths["ledger"], results_dir)
+    domains = DomainList(list_path, shard=shard)
+    for chunk in domains.chunks():
+        known = ledger.known_domains(key for key, _, _ in chunk)
+        ledger.add_sites([site for site in chunk if site[0] not in known])
+    index = ResultIndex(paths["index"], facts=True)
+    scheduler = StudyScheduler(
+        crawl=stand_in_crawl(results_dir),
+        detect=lambda folder: StageOutcome(True, 1, 0.0, OK),
+        parse=lambda site: index.update(results_dir, site[2]),
+        crawl_workers=4,
+        detect_workers=2,
+        host_delay=0,
+        ledger=ledger,
+    )
+    sites = ledger.pending("crawl")
+    crawled_sites = ledger.pending("detect")
+    finished_sites = ledger.pending("parse") + ledger.done()
+    rows = scheduler.run(sites, finished_sites, crawled_sites)
+    ledger.close()
+    folders = [site[2] for site in sites + crawled_sites + finished_sites]
+    run_id = write_run(pd.DataFrame(rows), store=paths["store"])
+    write_violations(index.violations_dataframe(folders), run_id, store=paths["store"])
+    index.close()
+    print(f"shard {shard[0]}/{shard[1]}: {domains.sites - domains.other_shards} of {domains.sites} "
+          f"sites, {len(rows)} results")
+
+
+def _sorted(df, by):
+    return df.astype(str).sort_values(by).reset_index(drop=True)
+
+
+def _same_metrics(a, b):
+    return all(x == y or (isinstance(x, float) and math.isnan(x) and math.isnan(y))
+               for x, y in zip(a.values(), b.values())) and a.keys() == b.keys()
+
+
+def check(shards, n, workdir):
+    os.makedirs(workdir, exist_ok=True)
+    list_path = os.path.join(workdir, "domains.csv")
+    write_domain_list(list_path, n)
+    started = time.perf_counter()
+    command = [sys.executable, "-m", "benchmarks.shard_check", "shard", list_path]
+    runs = [(f"{i}/{shards}", "shards", "Results") for i in range(shards)]
+    runs.append(("0/1", "unsharded", "Results-unsharded"))
+    processes = []
+    for shard, root, results in runs:
+        # The pipeline's per-site output goes to one log per process
+        log = open(os.path.join(workdir, f"{root}-{shard.replace('/', '-of-')}.log"), "w")
+        processes.append((subprocess.Popen(command + [shard, os.path.join(workdir, root),
+                                                      os.path.join(workdir, results)],
+                                           cwd=ROOT, stdout=log, stderr=subprocess.STDOUT), log))
+    for process, log in processes:
+        process.wait()
+        log.close()
+        with open(log.name) as f:
+            print(f.read().strip().splitlines()[-1])
+    if any(process.returncode for process, _ in processes):
+        print("FAILED: a shard process exited with an error")
+        return 1
+    print(f"{shards} shards and the unsharded run finished in {time.perf_counter() - started:.1f}s")
+
+    store = os.path.join(workdir, "merged")
+    run_id, info = merge_shards(shards, os.path.join(workdir, "shards"), store)
+    expected_store = shard_paths((0, 1), os.path.join(workdir, "unsharded"))["store"]
+    merged, expected = read_results(run=run_id, store=store), read_results(store=expected_store)
+    facts, expected_facts = read_violations(run=run_id, store=store), read_violations(store=expected_store)
+    failures = []
+    if info["duplicates"]:
+        failures.append(f"{info['duplicates']} sites stored by more than one shard")
+    if not _sorted(merged, "Website").equals(_sorted(expected, "Website")):
+        failures.append("merged rows differ from the unsharded run")
+    columns = list(expected_facts.columns)
+    if not _sorted(facts, columns).equals(_sorted(expected_facts, columns)):
+        failures.append("merged violation facts differ from the unsharded run")
+    if not _same_metrics(info["metrics"].metrics(), ViolationMetrics.from_frame(expected).metrics()):
+        failures.append("merged metrics differ from the unsharded run")
+    # The shards' own metrics states, merged, give the metrics of the merged run
+    shard_metrics = ViolationMetrics()
+    for i in range(shards):
+        shard_metrics.merge(ViolationMetrics.from_store(
+            store=shard_paths((i, shards), os.path.join(workdir, "shards"))["store"]))
+    if not _same_metrics(shard_metrics.metrics(), info["metrics"].metrics()):
+        failures.append("merged shard metrics differ from the metrics of the merged run")
+    print(f"Merged {len(merged)} sites and {len(facts)} facts from {shards} shards "
+          f"({[s['sites'] for s in info['shards']]}); unsharded: {len(expected)} sites")
+    for failure in failures:
+        print("FAILED:", failure)
+    if not failures:
+        print("OK: the merged shards match the unsharded run")
+    return 1 if failures else 0
+
+
+def _option(args, name, default):
+    if name in args:
+        i = args.index(name)
+        return args[:i] + args[i + 2:], args[i + 1]
+    return args, default
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "shard":
+        list_path, shard, root, results_dir = args[1:5]
+        run_shard(list_path, parse_shard(shard), root, results_dir)
+        return 0
+    if args and args[0] in ("-h", "--help"):
+        print("Usage: python -m benchmarks.shard_check [--shards 4] [--sites 2000] [--workdir DIR]")
+        return 0
+    args, shards = _option(args, "--shards", "4")
+    args, n = _option(args, "--sites", "2000")
+    args, workdir = _option(args, "--workdir", None)
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix="shard-check-")
+    try:
+        return check(int(shards), int(n), workdir)
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
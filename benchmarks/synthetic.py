@@ -0,0 +1,171 @@
+import json
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+TRACKERS = [
+    "doubleclick.net", "google-analytics.com", "facebook.com", "adnxs.com",
+    "criteo.com", "rubiconproject.com", "pubmatic.com", "casalemedia.com",
+    "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com",
+]
+
+
+def _leak_entry(rng, site, url_length):
+    tracker = rng.choice(TRACKERS)
+    value = "%032x" % rng.getrandbits(128)
+    sent = [
+        f"[GET] https://{rng.choice(TRACKERS)}/pixel?id={value}&ref="
+        + "x" * rng.randint(url_length // 2, url_length)
+        for _ in range(rng.randint(1, 6))
+    ]
+    return {
+        "cookie": f"_uid{rng.randint(0, 99)}",
+        "value": value,
+        "domain": "." + site,
+        "associated3rdParties": [tracker],
+        "sent": sent,
+    }
+
+
+def make_result(site, rng, id_leaking=3, cookie_sync=5, fingerprinting=0,
+                third_parties=40, url_length=400):
+    """A result.json payload shaped like the detector's output."""
+    return {
+        "path": "../Results/" + site.replace(".", "_"),
+        "visitedWebsite": f"https://www.{site}/",
+        "idLeaking": [_leak_entry(rng, site, url_length) for _ in range(id_leaking)],
+        "cookieSync": [_leak_entry(rng, site, url_length) for _ in range(cookie_sync)],
+        "fingerprinting": {
+            "status": fingerprinting > 0,
+            "functions": ["getCanvasFp", "getWebglFp", "getAudioFingerprint"][:fingerprinting],
+        },
+        "thirdParties": [f"cdn{i}.{rng.choice(TRACKERS)}" for i in range(third_parties)],
+    }
+
+
+def write_result(path, result):
+    # Same layout as the detector's StoreData: JSON.stringify(data, null, 2)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+def write_results_tree(results_dir, n_sites, seed=0, **sizes):
+    """Creates `n_sites` site folders with a result.json each; returns the folder names."""
+    rng = random.Random(seed)
+    site_dirs = []
+    for i in range(n_sites):
+        site = f"site{i}.com"
+        site_dir = "www_" + site.replace(".", "_")
+        write_result(os.path.join(results_dir, site_dir, "result.json"),
+                     make_result(site, rng, **sizes))
+        site_dirs.append(site_dir)
+    return site_dirs
+
+
+WORDS = [
+    "shop", "news", "cloud", "bank", "travel", "media", "tech", "store", "blog", "mail",
+    "games", "health", "food", "music", "data", "apple", "web", "city", "home", "best",
+]
+TLDS = ["com", "net", "org", "de", "co.uk", "fr", "io", "ru", "it", "gov", "edu", "es", "jp"]
+
+
+def make_domains(n, seed=0):
+    """`n` Tranco-style domains mixing dictionary words, random labels and TLDs."""
+    rng = random.Random(seed)
+    domains = []
+    for _ in range(n):
+        name = rng.choice(WORDS) + "%x" % rng.getrandbits(rng.randint(8, 40))
+        if rng.random() < 0.3:
+            name += rng.choice(WORDS)
+        if rng.random() < 0.1:
+            name = rng.choice(WORDS) + "." + name
+        domains.append(f"{name}.{rng.choice(TLDS)}")
+    return domains
+
+
+def sample_counts(n, seed=0):
+    """(id_leaking, cookie_sync, fingerprinting) count arrays for `n` sites.
+
+    Shaped like the 222-site pilot (Result.xlsx): ~55% of sites are
+    compliant, ID leaking and cookie sync are zero-inflated, heavy-tailed
+    and correlated through a per-site tracker load, and fingerprinting is
+    rare.
+    """
+    rng = np.random.default_rng(seed)
+    tracking = rng.random(n) < 0.45
+    load = rng.gamma(0.5, 2.0, n)
+    id_leaking = np.where(tracking, 1 + rng.poisson(3.0 * load), 0)
+    cookie_sync = np.where(tracking & (rng.random(n) < 0.53), 1 + rng.poisson(15.0 * load), 0)
+    fingerprinting = np.where(rng.random(n) < 0.01, rng.integers(1, 4, n), 0)
+    return id_leaking, cookie_sync, fingerprinting
+
+
+def site_domains(n, seed=0):
+    """make_domains() with duplicates renamed, so every site gets its own folder."""
+    seen = set()
+    domains = []
+    for i, domain in enumerate(make_domains(n, seed)):
+        if domain in seen:
+            domain = f"dup{i}-{domain}"
+        seen.add(domain)
+        domains.append(domain)
+    return domains
+
+
+def make_result_table(n, seed=0):
+    """An aggregate table of `n` sites in the results store schema."""
+    id_leaking, cookie_sync, fingerprinting = sample_counts(n, seed)
+    total = id_leaking + cookie_sync + fingerprinting
+    return pd.DataFrame({
+        "Website": site_domains(n, seed),
+        "ID_Leaking_Count": id_leaking.astype("int32"),
+        "Cookie_Sync_Count": cookie_sync.astype("int32"),
+        "Fingerprinting_Count": fingerprinting.astype("int32"),
+        "Total_Violations": total.astype("int32"),
+        "Is_Compliant": total == 0,
+    })
+
+
+def write_table_tree(results_dir, df, seed=0, third_parties=20, url_length=150):
+    """Writes the site folders whose result.json files aggregate to `df`; returns the folder names."""
+    rng = random.Random(seed)
+    site_dirs = []
+    for site, id_leaking, cookie_sync, fingerprinting in zip(
+            df["Website"], df["ID_Leaking_Count"], df["Cookie_Sync_Count"], df["Fingerprinting_Count"]):
+        site_dir = "www_" + site.replace(".", "_")
+        write_result(os.path.join(results_dir, site_dir, "result.json"),
+                     make_result(site, rng, int(id_leaking), int(cookie_sync), int(fingerprinting),
+                                 third_parties, url_length))
+        site_dirs.append(site_dir)
+    return site_dirs
+
+
+def make_third_party_facts(df, seed=0, n_domains=50_000, per_site=50):
+    """third_party rows of a fact table (see result_index.FACT_COLUMNS) for the sites of `df`.
+
+    Sites load Poisson(`per_site`) distinct domains drawn from a Zipf-like
+    popularity curve over `n_domains` tracker and CDN hostnames.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    loaded = rng.poisson(per_site, n)
+    rows = np.repeat(np.arange(n), loaded)
+    popularity = np.cumsum(1.0 / np.arange(1, n_domains + 1))
+    cols = np.searchsorted(popularity, rng.random(len(rows)) * popularity[-1])
+    # Keep each (site, domain) pair once, like GetThirdParties
+    pairs = np.unique(rows.astype(np.int64) * n_domains + cols)
+    rows, cols = pairs // n_domains, pairs % n_domains
+    names = [f"t{i}.{TRACKERS[i % len(TRACKERS)]}" for i in range(n_domains)]
+    entry = np.arange(len(rows)) - np.searchsorted(rows, np.arange(n))[rows]
+    return pd.DataFrame({
+        "Website": pd.Categorical.from_codes(rows, pd.Index(df["Website"])),
+        "Type": pd.Categorical.from_codes(np.full(len(rows), 3), ["id_leaking", "cookie_sync",
+                                                                  "fingerprinting", "third_party"]),
+        "Entry": entry.astype("int32"),
+        "Domain": pd.Categorical.from_codes(cols, names),
+        "Cookie": pd.Categorical.from_codes(np.full(len(rows), -1), []),
+        "Function": pd.Categorical.from_codes(np.full(len(rows), -1), []),
+    })
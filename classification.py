@@ -0,0 +1,239 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over prioritized keyword groups.
+
+    `groups` is a list of (label, keywords) in priority order. `match`
+    scans a string once and returns the label of the first group with a
+    keyword anywhere in it, or `default` - the same answer as checking
+    each group's keywords with `in`, group by group.
+    """
+
+    def __init__(self, groups, default=None):
+        self.labels = [label for label, _ in groups]
+        self.default = default
+        none = len(groups)
+        goto = [{}]
+        rank = [none]  # best group ending at each state
+        for group, (_, keywords) in enumerate(groups):
+            for keyword in keywords:
+                state = 0
+                for ch in keyword:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        rank.append(none)
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                rank[state] = min(rank[state], group)
+        # Breadth-first: fold the failure links into the transitions (a DFA)
+        # and give each state the best rank along its failure chain
+        fail = [0] * len(goto)
+        delta = [dict(g) for g in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            rank[state] = min(rank[state], rank[fail[state]])
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+            for ch, target in goto[state].items():
+                fail[target] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(target)
+        self._delta = delta
+        self._rank = rank
+
+    def match(self, text):
+        delta, rank = self._delta, self._rank
+        best = len(self.labels)
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if rank[state] < best:
+                best = rank[state]
+                if best == 0:
+                    break
+        return self.labels[best] if best < len(self.labels) else self.default
+
+
+class SuffixMatcher:
+    """Trie over reversed domain labels, e.g. '.co.uk' -> {'uk': {'co': ...}}.
+
+    `matches(domain)` is True when the domain ends with one of the
+    suffixes, like checking `domain.endswith(suffix)` for each.
+    """
+
+    _END = None
+
+    def __init__(self, suffixes):
+        self._root = {}
+        for suffix in suffixes:
+            labels = suffix.split('.')
+            node = self._root
+            for label in reversed(labels[1:]):
+                node = node.setdefault(label, {})
+            # The leading part must end the next label: '' for '.uk',
+            # 'bbc' for 'bbc.co.uk' (which 'news-bbc.co.uk' also ends with)
+            node.setdefault(self._END, set()).add(labels[0])
+
+    def matches(self, domain):
+        node = self._root
+        rest, dot = domain, '.'
+        while dot:
+            rest, dot, label = rest.rpartition('.')
+            heads = node.get(self._END)
+            if heads and ('' in heads or any(label.endswith(h) for h in heads)):
+                return True
+            node = node.get(label)
+            if node is None:
+                return False
+        return False
+
+
+EU_TLDS = [
+    '.uk', '.de', '.fr', '.es', '.it', '.nl', '.be', '.pl', '.se', '.dk',
+    '.fi', '.no', '.ie', '.at', '.pt', '.cz', '.gr', '.hu', '.ro', '.eu'
+]
+
+EU_DOMAINS = [
+    'bbc.', 'theguardian.', 'telegraph.', 'dailymail.',
+    'spiegel.', 'bild.',
+    'lemonde.', 'lefigaro.',
+    'elpais.', 'elmundo.',
+    'corriere.', 'repubblica.',
+]
+
+
+_EU_SUFFIXES = SuffixMatcher(EU_TLDS)
+_EU_KEYWORDS = KeywordMatcher([('EU', EU_DOMAINS)], default='US')
+
+
+def classify_region(domain):
+    domain_lower = domain.lower()
+    if _EU_SUFFIXES.matches(domain_lower):
+        return 'EU'
+    return _EU_KEYWORDS.match(domain_lower)
+
+
+INDUSTRY_RULES = {
+    'News & Media': [
+        'news', 'nytimes', 'washingtonpost', 'guardian', 'telegraph', 'bbc',
+        'cnn', 'fox', 'reuters', 'bloomberg', 'forbes', 'wsj', 'usatoday',
+        'dailymail', 'huffpost', 'time.com', 'newyorker', 'mirror', 'thesun',
+        'independent', 'express', 'metro', 'standard', 'elpais', 'elmundo',
+        'lemonde', 'lefigaro', 'spiegel', 'welt', 'repubblica', 'corriere',
+        'politico', 'thehill', 'axios', 'vox.com', 'slate', 'salon',
+        'buzzfeed', 'vice', 'medium.com', 'substack'
+    ],
+    'E-commerce': [
+        'amazon', 'ebay', 'walmart', 'target', 'bestbuy', 'etsy', 'shopify',
+        'aliexpress', 'alibaba', 'mercadolibre', 'rakuten', 'booking',
+        'expedia', 'airbnb', 'trivago', 'kayak', 'priceline', 'hotels',
+        'wayfair', 'overstock', 'newegg', 'chewy', 'zappos', 'groupon'
+    ],
+    'Technology': [
+        'microsoft', 'apple', 'adobe', 'oracle', 'salesforce', 'sap',
+        'vmware', 'intel', 'cisco', 'dell', 'hp.com', 'ibm', 'nvidia',
+        'github', 'stackoverflow', 'sourceforge', 'bitbucket', 'gitlab',
+        'docker', 'kubernetes', 'aws', 'azure', 'cloudflare', 'akamai',
+        'digitalocean', 'heroku', 'netlify', 'vercel', 'cpanel', 'namecheap'
+    ],
+    'Social Media': [
+        'facebook', 'twitter', 'instagram', 'linkedin', 'pinterest',
+        'reddit', 'tumblr', 'snapchat', 'tiktok', 'whatsapp', 'telegram',
+        'discord', 'twitch', 'youtube', 'vimeo', 'dailymotion', 'youtu.be',
+        'flickr', 'imgur', 'deviantart', 'behance', 'dribbble'
+    ],
+    'Search & Web Services': [
+        'google', 'bing', 'yahoo', 'duckduckgo', 'baidu', 'yandex',
+        'ask.com', 'aol', 'mail.', 'gmail', 'outlook', 'protonmail',
+        'zoho', 'godaddy', 'wordpress', 'blogger', 'wix', 'squarespace',
+        'weebly', 'typepad', 'livejournal', 'jimdo'
+    ],
+    'Entertainment & Streaming': [
+        'netflix', 'hulu', 'disney', 'hbo', 'spotify', 'soundcloud',
+        'pandora', 'apple.music', 'tidal', 'deezer', 'imdb', 'rottentomatoes',
+        'metacritic', 'gamespot', 'ign', 'polygon', 'kotaku', 'steam',
+        'epicgames', 'twitch', 'crunchyroll', 'funimation'
+    ],
+    'Education': [
+        'wikipedia', 'wikimedia', 'coursera', 'udemy', 'edx', 'khanacademy',
+        'skillshare', 'lynda', 'pluralsight', 'codecademy', 'freecodecamp',
+        'mit.edu', 'stanford.edu', 'harvard.edu', 'berkeley.edu', 'ox.ac.uk',
+        'cambridge.org', 'researchgate', 'academia.edu', 'jstor'
+    ],
+    'Health & Wellness': [
+        'webmd', 'mayoclinic', 'healthline', 'medlineplus', 'nih.gov',
+        'cdc.gov', 'who.int', 'drugs.com', 'rxlist', 'medscape',
+        'everydayhealth', 'verywellhealth', 'medicalnewstoday', 'patient.info'
+    ],
+    'Finance & Business': [
+        'paypal', 'stripe', 'square', 'venmo', 'chase', 'bankofamerica',
+        'wellsfargo', 'citibank', 'capitalone', 'amex', 'discover',
+        'mint', 'robinhood', 'coinbase', 'binance', 'kraken', 'etrade',
+        'fidelity', 'schwab', 'vanguard', 'td.ameritrade', 'nasdaq',
+        'nyse', 'marketwatch', 'investing.com', 'finance.yahoo', 'seeking'
+    ],
+    'Government & Public': [
+        'gov.', 'europa.eu', 'un.org', 'nato.int', 'whitehouse.gov',
+        'usa.gov', 'irs.gov', 'sec.gov', 'fda.gov', 'epa.gov',
+        'state.gov', 'defense.gov', 'justice.gov', 'treasury.gov',
+        'parliament.uk', 'bundestag.de', 'senat.fr', 'congreso.es'
+    ],
+    'Travel & Transportation': [
+        'uber', 'lyft', 'airbnb', 'tripadvisor', 'lonely planet',
+        'skyscanner', 'momondo', 'kiwi.com', 'rome2rio', 'viator',
+        'getyourguide', 'ticketmaster', 'stubhub', 'seatgeek', 'eventbrite'
+    ],
+    'Real Estate': [
+        'zillow', 'trulia', 'realtor', 'redfin', 'apartments',
+        'rightmove', 'zoopla', 'immobilienscout', 'seloger', 'idealista'
+    ],
+    'Telecom & ISP': [
+        'verizon', 'att.com', 't-mobile', 'comcast', 'spectrum',
+        'cox.com', 'centurylink', 'frontier', 'vodafone', 'orange',
+        'telekom', 'telefonica', 'bt.com', 'sky.com', 'virgin media'
+    ],
+    'Food & Delivery': [
+        'doordash', 'ubereats', 'grubhub', 'postmates', 'instacart',
+        'deliveroo', 'just-eat', 'foodpanda', 'zomato', 'swiggy',
+        'yelp', 'tripadvisor', 'opentable', 'resy', 'tock'
+    ],
+    'Marketing & Analytics': [
+        'hubspot', 'mailchimp', 'constantcontact', 'sendinblue', 'aweber',
+        'getresponse', 'activecampaign', 'convertkit', 'drip', 'klaviyo',
+        'segment', 'amplitude', 'mixpanel', 'heap', 'hotjar', 'optimizely',
+        'unbounce', 'instapage', 'clickfunnel', 'leadpages'
+    ],
+    'Cloud Storage & File Sharing': [
+        'dropbox', 'box.com', 'onedrive', 'drive.google', 'icloud',
+        'mega.nz', 'mediafire', 'wetransfer', 'sendspace', 'zippyshare',
+        'rapidshare', 'uploaded', 'filehosting', 'fileserve'
+    ],
+    'Other': []
+}
+
+
+_INDUSTRY_KEYWORDS = KeywordMatcher(
+    [(industry, keywords) for industry, keywords in INDUSTRY_RULES.items() if industry != 'Other'],
+    default='Other')
+
+
+def classify_industry(website):
+    return _INDUSTRY_KEYWORDS.match(website.lower())
+
+
+def _classify_column(classify, values):
+    # Each distinct value is classified once
+    cache = {}
+    return [cache[v] if v in cache else cache.setdefault(v, classify(v)) for v in values]
+
+
+def classify_regions(domains):
+    """classify_region over a whole column (any iterable of str); returns a list."""
+    return _classify_column(classify_region, domains)
+
+
+def classify_industries(websites):
+    """classify_industry over a whole column (any iterable of str); returns a list."""
+    return _classify_column(classify_industry, websites)
+
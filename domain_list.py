@@ -0,0 +1,280 @@
+import hashlib
+import re
+import sys
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import tldextract
+except ImportError:
+    tldextract = None
+
+# Rows normalized and deduplicated at a time
+CHUNK_ROWS = 50_000
+
+# Arrow-backed strings, whose regex operations run in C
+STRING = "string[pyarrow]"
+
+# Hex digits of the site key hash in folder names
+DIGEST_CHARS = 10
+
+# Public suffixes of more than one label, used for eTLD+1 when tldextract
+# (the full Public Suffix List) is not installed
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk", "net.uk", "sch.uk", "nhs.uk",
+    "police.uk", "com.au", "net.au", "org.au", "edu.au", "gov.au", "asn.au", "id.au",
+    "co.nz", "org.nz", "net.nz", "ac.nz", "govt.nz", "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp",
+    "co.kr", "or.kr", "ac.kr", "go.kr", "com.br", "net.br", "org.br", "gov.br", "edu.br",
+    "com.cn", "net.cn", "org.cn", "gov.cn", "edu.cn", "com.hk", "org.hk", "edu.hk", "gov.hk",
+    "com.tw", "org.tw", "edu.tw", "gov.tw", "com.sg", "edu.sg", "gov.sg", "com.my", "gov.my",
+    "co.in", "net.in", "org.in", "gov.in", "ac.in", "nic.in", "co.za", "org.za", "gov.za", "ac.za",
+    "com.mx", "org.mx", "gob.mx", "edu.mx", "com.ar", "gob.ar", "org.ar", "com.tr", "org.tr",
+    "gov.tr", "edu.tr", "com.ua", "org.ua", "gov.ua", "co.il", "org.il", "ac.il", "gov.il",
+    "com.pl", "net.pl", "org.pl", "gov.pl", "co.id", "or.id", "go.id", "ac.id", "web.id",
+    "com.vn", "gov.vn", "edu.vn", "com.ph", "gov.ph", "com.pk", "gov.pk", "com.eg", "gov.eg",
+    "com.sa", "gov.sa", "com.ng", "gov.ng", "co.ke", "or.ke", "com.co", "gov.co", "com.pe",
+    "gob.pe", "com.ve", "com.ec", "co.th", "ac.th", "go.th", "in.th", "or.th", "co.at", "or.at",
+    "gv.at", "com.es", "org.es", "gob.es", "edu.es", "com.gr", "gov.gr", "com.pt", "gov.pt",
+    "com.cy", "gov.cy", "com.mt", "gov.mt", "co.hu", "gov.ie", "com.ro", "gov.ro", "com.hr",
+    "gouv.fr", "asso.fr", "com.fr", "gov.it", "edu.it", "com.ru", "org.ru", "gov.ru", "msk.ru",
+    "blogspot.com", "github.io", "herokuapp.com", "appspot.com", "cloudfront.net",
+    "azurewebsites.net", "netlify.app", "vercel.app", "pages.dev", "workers.dev", "wordpress.com",
+}
+
+_SCHEME = r"^[a-z][a-z0-9+.-]*://"
+_HOST = re.compile(r"(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})")
+_IPV4 = re.compile(r"(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)")
+
+_extract = tldextract.TLDExtract(suffix_list_urls=()) if tldextract else None
+
+
+def _to_ascii(host):
+    try:
+        return host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+
+
+def normalize_hosts(values):
+    """Lowercase ASCII hostnames of a column of domains or URLs; NaN where invalid.
+
+    Schemes, user info, ports, paths and trailing dots are removed and
+    international names are converted to punycode.
+    """
+    hosts = pd.Series(values, dtype=STRING).str.strip().str.lower()
+    hosts = hosts.str.replace(_SCHEME, "", regex=True)
+    hosts = hosts.str.replace(r"[/?#\\].*$", "", regex=True)
+    hosts = hosts.str.replace(r"^.*@", "", regex=True)
+    hosts = hosts.str.replace(r":\d*$", "", regex=True)
+    hosts = hosts.str.strip(".")
+    non_ascii = hosts.str.contains(r"[^\x00-\x7f]", regex=True).fillna(False)
+    if non_ascii.any():
+        hosts[non_ascii] = hosts[non_ascii].map(_to_ascii, na_action="ignore")
+    valid = (hosts.str.fullmatch(_HOST.pattern) | hosts.str.fullmatch(_IPV4.pattern)).fillna(False)
+    return hosts.where(valid)
+
+
+def registrable_domains(hosts):
+    """eTLD+1 of each host (IP addresses are kept); NaN for public suffixes and invalid hosts."""
+    hosts = pd.Series(hosts, dtype=STRING)
+    ip = hosts.str.fullmatch(_IPV4.pattern).fillna(False)
+    if _extract is not None:
+        unique = hosts.dropna().unique()
+        registered = {h: _extract(h).registered_domain or None for h in unique}
+        domains = hosts.map(registered, na_action="ignore").astype(STRING)
+    else:
+        last2 = hosts.str.replace(r"^.*\.([^.]+\.[^.]+)$", r"\1", regex=True)
+        last3 = hosts.str.replace(r"^.*\.([^.]+\.[^.]+\.[^.]+)$", r"\1", regex=True)
+        last3 = last3.where(last3.str.count(r"\.") == 2)
+        domains = last2.where(~last2.isin(MULTI_LABEL_SUFFIXES), last3)
+    return domains.where(~ip, hosts)
+
+
+def site_key(domain):
+    """Site key of one domain or URL, e.g. 'https://www.BBC.co.uk/news' -> 'bbc.co.uk'; None if invalid."""
+    key = registrable_domains(normalize_hosts([domain]))[0]
+    return None if pd.isna(key) else key
+
+
+def shard_of(keys, count):
+    """Shard (0 to count-1) of each site key; the same on every machine and Python process."""
+    hashes = pd.util.hash_array(np.asarray(keys, dtype=object))
+    return (hashes % np.uint64(count)).astype(np.int64)
+
+
+def _digest(key):
+    return hashlib.blake2b(key.encode(), digest_size=DIGEST_CHARS // 2).hexdigest()
+
+
+def site_folder(key):
+    """Results folder of a site key: the key itself plus its hash, e.g. 'bbc.co.uk_3f9a0c21d4'.
+
+    Keys are lowercase hostnames, so the folder is filesystem-safe and
+    distinct for every key, and site_from_folder() reverses it.
+    """
+    return f"{key}_{_digest(key)}"
+
+
+def legacy_folder(url):
+    """The folder the crawler derived from a URL before site keys (helpers/utils.js SanitizeUrlName)."""
+    host = urlparse(url if "://" in url else "https://" + url).hostname or url
+    name = re.sub(r"[.\-'/:,\s()]", "_", host).replace("+", "p").replace("&", "and", 1)
+    return re.sub(r"_+", "_", name).strip().rstrip("_")
+
+
+def site_from_folder(folder):
+    """The website of a results folder: the key of a site_folder(), else the legacy guess."""
+    key, _, digest = folder.rpartition("_")
+    if key and len(digest) == DIGEST_CHARS and _digest(key) == digest:
+        return key
+    # Legacy 'www_bbc_com' folders; names with '-' or '_' cannot be recovered
+    return folder.replace("www_", "").replace("_", ".")
+
+
+def _read_chunks(path, column, chunk_rows):
+    """Raw domain values of a list file, `chunk_rows` at a time.
+
+    CSV (optionally compressed) and text files are read without a header
+    unless `column` is given, taking the last field, so Tranco's
+    'rank,domain' lists and plain one-domain-per-line files both work.
+    Excel sheets are streamed row by row and need `column` (default: the
+    first column).
+    """
+    if path.endswith((".xlsx", ".xlsm")):
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+            if column is not None and column not in header:
+                raise ValueError(f"Column '{column}' not found in {path}")
+            index = header.index(column) if column is not None else 0
+            chunk = []
+            for row in rows:
+                if index < len(row) and row[index] is not None:
+                    chunk.append(str(row[index]))
+                if len(chunk) >= chunk_rows:
+                    yield pd.Series(chunk, dtype=STRING)
+                    chunk = []
+            if chunk:
+                yield pd.Series(chunk, dtype=STRING)
+        finally:
+            workbook.close()
+        return
+    if column is not None:
+        reader = pd.read_csv(path, usecols=[column], dtype=str, chunksize=chunk_rows,
+                             skipinitialspace=True)
+        for chunk in reader:
+            yield chunk[column].dropna().astype(STRING)
+    else:
+        reader = pd.read_csv(path, header=None, dtype=str, chunksize=chunk_rows,
+                             skipinitialspace=True, comment="#")
+        for chunk in reader:
+            yield chunk.iloc[:, -1].dropna().astype(STRING)
+
+
+class DomainList:
+    """Streaming reader of a domain list as `(key, url, folder)` sites.
+
+    Reads CSV, Tranco and Excel lists a chunk at a time, normalizes each
+    chunk with vectorized string operations, keys every site by its eTLD+1
+    (so www.x.com and x.com are one site) and drops repeated keys. Memory
+    is one chunk plus 8 bytes per distinct site (the key hashes seen so
+    far), whatever the length of the list. `limit` caps the number of
+    distinct sites. With `shard=(index, count)` only the sites that
+    shard_of() assigns to `index` are yielded; the limit still applies to
+    the whole list, so the shards of a list together yield exactly the
+    sites of the unsharded list. Counts of rows read, invalid entries,
+    duplicates, distinct sites and sites left to other shards are kept as
+    attributes.
+    """
+
+    def __init__(self, path, column=None, limit=None, chunk_rows=CHUNK_ROWS, shard=None):
+        self.path = path
+        self.column = column
+        self.limit = limit
+        self.chunk_rows = chunk_rows
+        self.shard = shard
+        self.rows = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.sites = 0
+        self.other_shards = 0
+
+    def chunks(self):
+        """Yields lists of `(key, url, folder)` tuples, in list order."""
+        seen = np.empty(0, dtype=np.uint64)     # sorted hashes of the keys so far
+        for raw in _read_chunks(self.path, self.column, self.chunk_rows):
+            raw = raw.str.strip()
+            self.rows += len(raw)
+            keys = registrable_domains(normalize_hosts(raw))
+            valid = keys.notna().to_numpy()
+            self.invalid += int((~valid).sum())
+            raw, keys = raw[valid], keys[valid]
+            hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+            # First occurrence within the chunk, then not seen in earlier chunks
+            new = ~pd.Series(hashes).duplicated().to_numpy()
+            if len(seen):
+                new &= seen.take(np.searchsorted(seen, hashes), mode="clip") != hashes
+            self.duplicates += int(len(hashes) - new.sum())
+            if self.limit is not None:
+                new &= np.cumsum(new) <= self.limit - self.sites
+            seen = np.sort(np.concatenate([seen, hashes[new]]))
+            listed = int(new.sum())
+            self.sites += listed
+            if self.shard is not None:
+                # shard_of() of the keys, from the hashes already at hand
+                index, count = self.shard
+                new &= hashes % np.uint64(count) == index
+                self.other_shards += listed - int(new.sum())
+            has_scheme = raw.str.match(r"https?://", case=False).fillna(False).to_numpy()
+            urls = np.where(has_scheme, raw.to_numpy(dtype=object), "https://" + raw.to_numpy(dtype=object))
+            sites = [(key, url, site_folder(key))
+                     for key, url in zip(keys.to_numpy(dtype=object)[new], urls[new])]
+            if sites:
+                yield sites
+            if self.limit is not None and self.sites >= self.limit:
+                return
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+
+def parse_shard(text):
+    """'i/K' -> (i, K): shard i (counted from 0) of K."""
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{text}', expected 'index/count', e.g. '0/4'") from None
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{text}': index must be in 0..{count - 1}")
+    return index, count
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ("-h", "--help"):
+        print("Usage: python domain_list.py <list.csv|list.xlsx> [column] [--limit N] [--shard i/K]")
+        return
+    limit, shard = None, None
+    if "--limit" in args:
+        i = args.index("--limit")
+        limit = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if "--shard" in args:
+        i = args.index("--shard")
+        shard = parse_shard(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    domains = DomainList(args[0], args[1] if len(args) > 1 else None, limit, shard=shard)
+    for key, url, folder in domains:
+        print(f"{key}\t{url}\t{folder}")
+    print(f"{domains.rows} rows: {domains.sites} sites ({domains.other_shards} in other shards), "
+          f"{domains.duplicates} duplicates, {domains.invalid} invalid", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
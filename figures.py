@@ -0,0 +1,111 @@
+import hashlib
+import inspect
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import pandas as pd
+
+# Per output directory: file name -> key of the inputs it was rendered from
+MANIFEST = ".figure_cache.json"
+
+# `render(path, data, **params)` draws one figure and saves it to `path`;
+# `style` holds the rcParams it is drawn with (see capture_style)
+FigureJob = namedtuple("FigureJob", ["path", "render", "data", "params", "style"])
+
+
+def capture_style(apply):
+    """The rcParams that `apply()` changes relative to matplotlib's defaults.
+
+    Figures are drawn with their own script's style, whichever scripts
+    were imported before and whichever process renders them.
+    """
+    with mpl.rc_context():
+        mpl.rc_file_defaults()
+        apply()
+        return {k: v for k, v in mpl.rcParams.items() if v != mpl.rcParamsOrig[k]}
+
+
+def _digest(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(repr((type(obj).__name__, obj.shape, getattr(obj, "name", None),
+                       list(getattr(obj, "columns", [])), obj.index.name)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            h.update(repr(key).encode())
+            _digest(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}[{len(obj)}]".encode())
+        for item in obj:
+            _digest(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+def figure_key(job):
+    """Hash of everything a figure depends on: data, parameters, style and plotting code."""
+    h = hashlib.sha256(mpl.__version__.encode())
+    h.update(f"{job.render.__module__}.{job.render.__qualname__}".encode())
+    h.update(inspect.getsource(job.render).encode())
+    for part in (job.data, job.params, job.style):
+        _digest(h, part)
+    return h.hexdigest()
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _render(job):
+    with mpl.rc_context():
+        mpl.rc_file_defaults()
+        mpl.rcParams.update(job.style)
+        job.render(job.path, job.data, **job.params)
+        plt.close("all")
+    return str(job.path)
+
+
+def render_figures(jobs, workers=None, force=False):
+    """Renders the jobs whose inputs changed since their PNG was written.
+
+    Stale figures are drawn in a process pool; figures whose key matches
+    the manifest and whose file still exists are skipped. Returns the
+    paths that were rendered.
+    """
+    manifests = {}
+    stale = []
+    for job in jobs:
+        directory, name = os.path.split(str(job.path))
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        key = figure_key(job)
+        if force or manifest.get(name) != key or not os.path.exists(job.path):
+            stale.append((job, key))
+    if not stale:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            rendered = list(pool.map(_render, [job for job, _ in stale]))
+    else:
+        rendered = [_render(job) for job, _ in stale]
+    for job, key in stale:
+        directory, name = os.path.split(str(job.path))
+        manifests[directory][name] = key
+    for directory in {os.path.split(str(job.path))[0] for job, _ in stale}:
+        _save_manifest(directory, manifests[directory])
+    return rendered
@@ -0,0 +1,283 @@
+import collections
+import json
+import os
+import sys
+import time
+
+from classification import classify_industry, classify_region
+from domain_list import site_folder
+from process_runner import OK
+from result_index import RESULT_FILE, make_row
+from result_parser import parse_result_file
+from run_ledger import LEDGER_PATH, RunLedger
+from stage_metrics import METRICS_PATH, STAGES
+from trace_store import find_file
+from violation_metrics import ViolationMetrics
+
+# Latest results the rolling compliance is computed over
+WINDOW_SITES = 500
+
+# Seconds of finished sites the throughput (and so the ETA) is measured over
+RATE_WINDOW = 600.0
+
+# Seconds between refreshes, and between re-reads of the ledger's outstanding work
+REFRESH = 2.0
+LEDGER_SYNC = 60.0
+
+# Ledger stages and statuses of sites the run still has to crawl or detect
+_OUTSTANDING = {"crawl", "detect"}, {"pending", "running"}
+
+
+class LogTail:
+    """The records appended to a JSONL file since the last read.
+
+    Each read costs one stat plus reading the new bytes; a line still
+    being written is kept until its newline arrives. A file that shrank
+    (truncated or replaced) is read again from the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._partial = b""
+
+    def read(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            self.offset, self._partial = 0, b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = self._partial + f.read(size - self.offset)
+        self.offset = size
+        *lines, self._partial = data.split(b"\n")
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class LiveStudy:
+    """Running aggregates of the study run being written to a stage metrics log.
+
+    Fed the records of stage_metrics.MetricsLog as they are appended
+    (add), it keeps the outcomes per stage and error class, the times
+    sites finished (for sites/min and the ETA) and, for every successful
+    detection, the site's result.json - read once, from its own folder -
+    folded into the overall ViolationMetrics and the compliance per region
+    and industry, cumulative and over the last `window` results. Each
+    record costs O(1) besides that one parse. Records of an older run are
+    ignored; a newer run starts the aggregates over.
+    """
+
+    def __init__(self, results_dir="Source/Results", ledger_path=LEDGER_PATH, window=WINDOW_SITES):
+        self.results_dir = results_dir
+        self.ledger_path = ledger_path
+        self.window = window
+        self.run = None
+
+    def reset(self, run):
+        self.run = run
+        self.started = None
+        self.last_record = None
+        self.outcomes = collections.Counter()    # (stage, error_class) -> sites
+        self.finished = collections.deque()      # ts of sites done with crawl + detect
+        self.finished_total = 0
+        self.metrics = ViolationMetrics()
+        self.groups = collections.Counter()      # (kind, group, compliant) -> sites
+        self.recent = collections.deque()        # (region, industry, compliant) of the last results
+        self.recent_groups = collections.Counter()
+        self.unreadable = 0
+        self.sync_ledger()
+
+    def sync_ledger(self):
+        """Re-reads how many sites the ledger still has to crawl or detect (None without a ledger)."""
+        stages, statuses = _OUTSTANDING
+        self.outstanding = None
+        if self.ledger_path and os.path.exists(self.ledger_path):
+            ledger = RunLedger(self.ledger_path)
+            self.outstanding = sum(count for (stage, status, _), count in ledger.summary().items()
+                                   if stage in stages and status in statuses)
+            ledger.close()
+        self.synced = time.time()
+        self.finished_since_sync = 0
+
+    def add_records(self, records):
+        """Adds newly read records; on the first read, only those of the log's latest run."""
+        if records and self.run is None:
+            latest = max(r["run"] for r in records)
+            records = [r for r in records if r["run"] == latest]
+        for entry in records:
+            self.add(entry)
+
+    def add(self, entry):
+        if entry["run"] != self.run:
+            if self.run is not None and entry["run"] < self.run:
+                return
+            self.reset(entry["run"])
+        self.started = self.started or entry["ts"]
+        self.last_record = entry["ts"]
+        stage = entry["stage"]
+        self.outcomes[(stage, entry["error_class"])] += 1
+        # A site leaves the outstanding work when its crawl fails or its detection ends
+        if stage == "detect" or (stage == "crawl" and not entry["ok"]):
+            self.finished.append(entry["ts"])
+            self.finished_total += 1
+            if entry["ts"] >= self.synced:
+                self.finished_since_sync += 1
+        if stage == "detect" and entry["ok"]:
+            self._add_result(entry["domain"], entry.get("folder") or site_folder(entry["domain"]))
+
+    def _add_result(self, domain, folder):
+        path = find_file(os.path.join(self.results_dir, folder), RESULT_FILE)
+        counts = parse_result_file(path)[3] if path else None
+        if counts is None:
+            self.unreadable += 1
+            return
+        row = make_row(folder, counts)
+        self.metrics.add(row)
+        compliant = bool(row["Is_Compliant"])
+        site = (classify_region(domain), classify_industry(domain), compliant)
+        self.groups[("Region", site[0], compliant)] += 1
+        self.groups[("Industry", site[1], compliant)] += 1
+        self.recent.append(site)
+        self._count_recent(site, 1)
+        if len(self.recent) > self.window:
+            self._count_recent(self.recent.popleft(), -1)
+
+    def _count_recent(self, site, step):
+        region, industry, compliant = site
+        self.recent_groups[("Region", region, compliant)] += step
+        self.recent_groups[("Industry", industry, compliant)] += step
+
+    def rate(self, now):
+        """Sites finished per minute over the last RATE_WINDOW seconds (or since the run started)."""
+        while self.finished and self.finished[0] < now - RATE_WINDOW:
+            self.finished.popleft()
+        span = min(RATE_WINDOW, now - self.started) if self.started else 0
+        return len(self.finished) * 60 / span if span > 0 else 0.0
+
+    def remaining(self):
+        """Sites still to crawl or detect (None without a ledger)."""
+        if self.outstanding is None:
+            return None
+        return max(0, self.outstanding - self.finished_since_sync)
+
+    def eta(self, now):
+        """Seconds until the remaining sites are done at the current rate (None if unknown)."""
+        remaining, rate = self.remaining(), self.rate(now)
+        if remaining is None:
+            return None
+        if not remaining:
+            return 0.0
+        return remaining * 60 / rate if rate else None
+
+    def compliance(self, kind, recent=False):
+        """{group: (sites, compliant)} per region or industry, cumulative or over the window."""
+        counts = self.recent_groups if recent else self.groups
+        table = {}
+        for (k, group, compliant), sites in counts.items():
+            if k == kind and sites:
+                total, yes = table.get(group, (0, 0))
+                table[group] = (total + sites, yes + (sites if compliant else 0))
+        return dict(sorted(table.items()))
+
+
+def _percent(part, whole):
+    return f"{part / whole * 100:5.1f}%" if whole else "    -"
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def render(study, now=None):
+    """The dashboard as text."""
+    now = now or time.time()
+    if study.run is None:
+        return "Waiting for the study to record its first stage outcome..."
+    lines = [
+        f"Run {study.run}   up {_duration(now - study.started)}   "
+        f"last record {_duration(now - study.last_record)} ago",
+        "",
+        f"Finished sites: {study.finished_total}   {study.rate(now):.1f} sites/min   "
+        f"remaining: {'?' if study.remaining() is None else study.remaining()}   "
+        f"ETA: {_duration(study.eta(now))}",
+        "",
+        f"{'stage':<8} {'sites':>7} {'failed':>7} {'rate':>7}   failures by class",
+    ]
+    for stage in STAGES:
+        outcomes = {error: n for (s, error), n in study.outcomes.items() if s == stage}
+        sites = sum(outcomes.values())
+        if not sites:
+            continue
+        failures = {error: n for error, n in outcomes.items() if error != OK}
+        failed = sum(failures.values())
+        classes = ", ".join(f"{error} {n}" for error, n in sorted(failures.items(), key=lambda i: -i[1]))
+        lines.append(f"{stage:<8} {sites:>7} {failed:>7} {_percent(failed, sites):>7}   {classes}".rstrip())
+    summary = study.metrics.metrics()
+    lines += [
+        "",
+        f"Results: {summary['Total Sites']} sites, {summary['Compliant Sites']} compliant "
+        f"({_percent(summary['Compliant Sites'], summary['Total Sites']).strip()}), "
+        f"{summary['Total Violations Detected']} violations"
+        + (f", {study.unreadable} unreadable" if study.unreadable else ""),
+    ]
+    for kind in ("Region", "Industry"):
+        overall, recent = study.compliance(kind), study.compliance(kind, recent=True)
+        lines += ["", f"{kind + ' compliance':<24} {'all':<17} last {study.window}"]
+        for group, (sites, compliant) in overall.items():
+            recent_sites, recent_compliant = recent.get(group, (0, 0))
+            lines.append(f"{group:<24} {_percent(compliant, sites)} of {sites:<6} "
+                         f"{_percent(recent_compliant, recent_sites)} of {recent_sites}")
+    return "\n".join(lines)
+
+
+def watch(tail, study, interval=REFRESH, once=False):
+    """Feeds new records to `study` and redraws every `interval` seconds until interrupted."""
+    while True:
+        study.add_records(tail.read())
+        now = time.time()
+        if study.run is not None and now - study.synced >= LEDGER_SYNC:
+            study.sync_ledger()
+        if once:
+            print(render(study, now))
+            return
+        # Clear the terminal and draw from the top
+        print("\033[H\033[J" + render(study, now), flush=True)
+        time.sleep(interval)
+
+
+def _option(args, name, default):
+    if name in args:
+        i = args.index(name)
+        return args[:i] + args[i + 2:], args[i + 1]
+    return args, default
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] in ("-h", "--help"):
+        print("Usage: python live_dashboard.py [metrics.jsonl] [--results DIR] [--ledger PATH] "
+              "[--interval S] [--window N] [--once]")
+        return
+    once = "--once" in args
+    args = [a for a in args if a != "--once"]
+    args, results_dir = _option(args, "--results", "Source/Results")
+    args, ledger = _option(args, "--ledger", LEDGER_PATH)
+    args, interval = _option(args, "--interval", REFRESH)
+    args, window = _option(args, "--window", WINDOW_SITES)
+    study = LiveStudy(results_dir, ledger, int(window))
+    try:
+        watch(LogTail(args[0] if args else METRICS_PATH), study, float(interval), once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
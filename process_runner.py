@@ -0,0 +1,132 @@
+import os
+import random
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+# Failure classes
+OK = "ok"
+TIMEOUT = "timeout"                        # killed by our wall-clock limit
+DNS = "dns"                                # domain does not resolve
+NAVIGATION_TIMEOUT = "navigation_timeout"  # Puppeteer gave up loading the page
+CONNECTION = "connection"                  # refused / reset / TLS errors
+CRASH = "crash"                            # browser or node died
+DETECTOR_JSON = "detector_json"            # detector could not parse the traces
+MISSING_INPUT = "missing_input"            # traces not on disk
+UNKNOWN = "unknown"
+
+# Failures that will not go away by running the same command again
+PERMANENT_FAILURES = {DNS, DETECTOR_JSON, MISSING_INPUT}
+
+# Checked in order, first match wins
+_FAILURE_PATTERNS = [
+    (DNS, re.compile(r"ERR_NAME_NOT_RESOLVED|ERR_NAME_RESOLUTION_FAILED|ENOTFOUND|EAI_AGAIN")),
+    (NAVIGATION_TIMEOUT, re.compile(r"Navigation timeout|TimeoutError|Hard timeout of")),
+    (CONNECTION, re.compile(r"ERR_CONNECTION_\w+|ERR_SSL_\w+|ERR_CERT_\w+|ECONNREFUSED|ECONNRESET"
+                            r"|ERR_ADDRESS_UNREACHABLE|ERR_TOO_MANY_REDIRECTS")),
+    (DETECTOR_JSON, re.compile(r"in JSON at position|Unexpected end of JSON input"
+                               r"|Unexpected token .* JSON|is not valid JSON")),
+    (MISSING_INPUT, re.compile(r"ENOENT|no such file or directory")),
+    (CRASH, re.compile(r"Target closed|Protocol error|Session closed|Browser closed"
+                       r"|heap out of memory|Segmentation fault|Failed to launch")),
+]
+
+# `metrics`: optional dict of resource measurements, e.g. {"peak_rss_mb": 812.5}
+StageResult = namedtuple("StageResult", ["returncode", "error_class", "duration", "output", "metrics"],
+                         defaults=(None,))
+
+# Result of a stage including its retries; `metrics` are the last attempt's
+StageOutcome = namedtuple("StageOutcome", ["ok", "attempts", "duration", "error_class", "metrics"],
+                          defaults=(None,))
+
+
+def classify_failure(returncode, output, timed_out=False):
+    """Maps a finished stage process to one of the failure classes above."""
+    if timed_out:
+        return TIMEOUT
+    if returncode == 0:
+        return OK
+    for error_class, pattern in _FAILURE_PATTERNS:
+        if pattern.search(output):
+            return error_class
+    if returncode < 0:
+        return CRASH  # killed by a signal
+    return UNKNOWN
+
+
+def kill_tree(proc):
+    """Kills the process and everything it spawned (e.g. Chrome)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_stage(cmd, cwd, timeout):
+    """Runs `cmd` with a hard wall-clock `timeout` (seconds).
+
+    The process gets its own session so a timeout kills the whole tree,
+    including browsers left behind by a hung Puppeteer page.
+    """
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd, cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, errors="replace",
+        start_new_session=True,
+    )
+    timed_out = False
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        kill_tree(proc)
+        output, _ = proc.communicate()
+    duration = time.monotonic() - started
+    error_class = classify_failure(proc.returncode, output or "", timed_out)
+    return StageResult(proc.returncode, error_class, duration, output or "")
+
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Stops retrying a domain after repeated or permanent failures.
+
+    A domain is opened after `threshold` consecutive failures, or at once
+    on a failure in PERMANENT_FAILURES. A success closes it again.
+    """
+
+    def __init__(self, threshold=3):
+        self.threshold = threshold
+        self._failures = {}
+        self._opened = {}
+        self._lock = threading.Lock()
+
+    def allow(self, domain):
+        with self._lock:
+            return domain not in self._opened
+
+    def open_reason(self, domain):
+        with self._lock:
+            return self._opened.get(domain)
+
+    def record_success(self, domain):
+        with self._lock:
+            self._failures.pop(domain, None)
+            self._opened.pop(domain, None)
+
+    def record_failure(self, domain, error_class):
+        with self._lock:
+            failures = self._failures.get(domain, 0) + 1
+            self._failures[domain] = failures
+            if error_class in PERMANENT_FAILURES or failures >= self.threshold:
+                self._opened[domain] = error_class
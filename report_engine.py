@@ -0,0 +1,152 @@
+import time
+from functools import cached_property
+
+import pandas as pd
+
+from classification import classify_industries, classify_regions
+from figures import render_figures
+from result_schema import (COMPLIANT_LABELS, INDUSTRY, REGION, categorize_severity, compact_results,
+                           sort_by_count, top_by_count)
+from results_store import STORE_PATH, read_results
+from violation_metrics import ViolationMetrics
+
+RESULT_COLUMNS = ['Website', 'ID_Leaking_Count', 'Cookie_Sync_Count', 'Fingerprinting_Count',
+                  'Total_Violations', 'Is_Compliant']
+
+VIOLATION_COLUMNS = ['ID_Leaking', 'Cookie_Sync', 'Fingerprinting']
+
+
+def _group_stats(sites, key):
+    stats = sites.groupby(key, observed=True).agg({
+        'Website': 'count',
+        'Compliant': 'sum',
+        'Total_Violations': 'mean',
+        'ID_Leaking': 'mean',
+        'Cookie_Sync': 'mean',
+        'Fingerprinting': 'mean'
+    })
+    stats.columns = ['Count', 'Compliant_Count', 'Avg_Violations',
+                     'Avg_ID_Leaking', 'Avg_Cookie_Sync', 'Avg_Fingerprinting']
+    return stats
+
+
+class Report:
+    """One loaded results table plus the aggregates every report draws from.
+
+    Each aggregate is computed on first use and then shared, so running all
+    reports loads, relabels and groups the data only once. The table is kept
+    in the compact dtypes of result_schema.compact_results.
+    """
+
+    def __init__(self, df):
+        self.df = compact_results(df)
+        self._top = {}
+
+    @classmethod
+    def load(cls, run=None, store=STORE_PATH):
+        return cls(read_results(columns=RESULT_COLUMNS, run=run, store=store))
+
+    @cached_property
+    def sites(self):
+        """Per-site frame with the short column names and Region/Industry/Severity labels.
+
+        Compliant is bool and the labels are categoricals; see
+        result_schema.export_frame for the 'Yes'/'No' written to files.
+        """
+        sites = self.df.rename(columns={
+            'ID_Leaking_Count': 'ID_Leaking',
+            'Cookie_Sync_Count': 'Cookie_Sync',
+            'Fingerprinting_Count': 'Fingerprinting',
+            'Is_Compliant': 'Compliant'
+        })
+        sites['Region'] = pd.Categorical(classify_regions(sites['Website']), dtype=REGION)
+        sites['Industry'] = pd.Categorical(classify_industries(sites['Website']), dtype=INDUSTRY)
+        sites['Severity'] = categorize_severity(sites['Total_Violations'])
+        return sites
+
+    @cached_property
+    def accumulated(self):
+        """Mergeable counts, sums and violation histogram of the table."""
+        return ViolationMetrics.from_frame(self.df)
+
+    @cached_property
+    def metrics(self):
+        """The overall metrics of analyze_full_study.calculate_metrics."""
+        return self.accumulated.metrics()
+
+    @cached_property
+    def compliance_counts(self):
+        return self.sites['Compliant'].value_counts().rename(index=COMPLIANT_LABELS)
+
+    @cached_property
+    def violation_totals(self):
+        return self.sites[VIOLATION_COLUMNS].sum()
+
+    @cached_property
+    def severity_counts(self):
+        counts = self.sites['Severity'].value_counts()
+        return counts[counts > 0]
+
+    @cached_property
+    def summary(self):
+        """Overall statistics of the per-site frame (for summary tables)."""
+        accumulated = self.accumulated
+        return {
+            'count': accumulated.sites,
+            'compliant': accumulated.compliant,
+            'non_compliant': accumulated.sites - accumulated.compliant,
+            'mean': self.metrics['Avg Violations (All Sites)'],
+            'median': accumulated.median(),
+            'max': accumulated.max,
+            'most_violated': accumulated.most_violated,
+        }
+
+    @cached_property
+    def by_region(self):
+        return _group_stats(self.sites, 'Region')
+
+    @cached_property
+    def by_industry(self):
+        stats = _group_stats(self.sites, 'Industry').round(2)
+        stats['Compliance_Rate'] = (stats['Compliant_Count'] / stats['Count'] * 100).round(1)
+        return stats.sort_values('Count', ascending=False)
+
+    def top_violators(self, n):
+        """The `n` sites with the most violations (all columns)."""
+        if n not in self._top:
+            self._top[n] = top_by_count(self.sites, 'Total_Violations', n)
+        return self._top[n]
+
+    @cached_property
+    def top_non_compliant(self):
+        """Non-compliant sites, most violations first (raw column names)."""
+        return sort_by_count(self.df[self.df['Is_Compliant'] == False], 'Total_Violations', ascending=False)
+
+
+def run_all(run=None):
+    """Loads the results once and writes every report from the shared aggregates.
+
+    The figures of all reports go to one render_figures call, so they share
+    a process pool and unchanged charts are skipped.
+    """
+    import analyze_full_study
+    from visualization import eu_vs_us_comparison, industry_analysis, visualize_result250
+
+    modules = [analyze_full_study, visualize_result250, eu_vs_us_comparison, industry_analysis]
+    started = time.perf_counter()
+    report = Report.load(run)
+    print(f"Loaded {len(report.df)} sites in {time.perf_counter() - started:.2f}s")
+    step = time.perf_counter()
+    jobs = [job for module in modules for job in module.figure_jobs(report)]
+    rendered = render_figures(jobs)
+    print(f"Figures: {len(rendered)} rendered, {len(jobs) - len(rendered)} unchanged "
+          f"in {time.perf_counter() - step:.2f}s")
+    for module in modules:
+        step = time.perf_counter()
+        module.write_reports(report, figures=False)
+        print(f"{module.__name__}: {time.perf_counter() - step:.2f}s")
+    print(f"All reports written in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    run_all()
@@ -0,0 +1,401 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from domain_list import site_from_folder
+from result_parser import FACT_TYPES, parse_packed_result, parse_result_file, parse_result_files
+from result_schema import compact_results
+from trace_store import TracePack, find_file
+
+INDEX_PATH = "Source/Results/result_index.sqlite"
+RESULT_FILE = "result.json"
+
+COLUMNS = [
+    "Website",
+    "ID_Leaking_Count",
+    "Cookie_Sync_Count",
+    "Fingerprinting_Count",
+    "Total_Violations",
+    "Is_Compliant",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    site_dir             TEXT PRIMARY KEY,
+    mtime_ns             INTEGER NOT NULL,
+    size                 INTEGER NOT NULL,
+    sha256               TEXT NOT NULL,
+    website              TEXT NOT NULL,
+    id_leaking_count     INTEGER NOT NULL,
+    cookie_sync_count    INTEGER NOT NULL,
+    fingerprinting_count INTEGER NOT NULL,
+    total_violations     INTEGER NOT NULL,
+    is_compliant         INTEGER NOT NULL,
+    pack                 TEXT,  -- TracePack the result was read from, NULL for a site folder
+    facts                INTEGER NOT NULL DEFAULT 0  -- 1 if the site's violations are kept
+);
+"""
+
+# Violation-level facts (see result_parser.facts_from_result). Sites, domains,
+# cookie and function names are dictionary-encoded through `strings`.
+_FACTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strings (
+    id    INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS violations (
+    site     INTEGER NOT NULL,  -- strings.id of the site folder
+    type     INTEGER NOT NULL,  -- index into FACT_TYPES
+    entry    INTEGER NOT NULL,  -- position of the violation in its list
+    domain   INTEGER,           -- strings.id, NULL if none
+    cookie   INTEGER,
+    function INTEGER
+);
+CREATE INDEX IF NOT EXISTS violations_site ON violations (site);
+CREATE INDEX IF NOT EXISTS violations_domain ON violations (domain, type);
+CREATE INDEX IF NOT EXISTS violations_type ON violations (type, site);
+"""
+
+FACT_COLUMNS = ["Website", "Type", "Entry", "Domain", "Cookie", "Function"]
+
+# Rows of the fact table fetched from SQLite at a time
+_FETCH_ROWS = 100_000
+
+
+def folder_to_website(site_dir):
+    return site_from_folder(site_dir)
+
+
+def make_row(site_dir, counts):
+    """Builds the aggregate row from (id_leaking, cookie_sync, fingerprinting) counts."""
+    id_leaking_count, cookie_sync_count, fingerprinting_count = counts
+    total_violations = id_leaking_count + cookie_sync_count + fingerprinting_count
+    return {
+        "Website": folder_to_website(site_dir),
+        "ID_Leaking_Count": id_leaking_count,
+        "Cookie_Sync_Count": cookie_sync_count,
+        "Fingerprinting_Count": fingerprinting_count,
+        "Total_Violations": total_violations,
+        "Is_Compliant": total_violations == 0,
+    }
+
+
+class ResultIndex:
+    """Persistent per-site index of result.json stats, hashes and rows.
+
+    A site is re-parsed only when its result.json changed size or mtime
+    and its content hash differs, so refreshing after a run costs one
+    `stat` per site plus a parse per new or changed result.
+
+    With `facts`, the exploded violations of every parsed result are kept
+    as well (see violations_dataframe), at the cost of a full JSON parse;
+    without, results are only counted. Sites indexed without their facts
+    are parsed again the next time the index is opened with `facts`.
+    """
+
+    def __init__(self, path=INDEX_PATH, facts=False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = [c[1] for c in self._conn.execute("PRAGMA table_info(results)")]
+        self._has_facts = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'violations'").fetchone() is not None
+        with self._conn:
+            # Indexes written before packed results and kept facts were marked
+            if "pack" not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN pack TEXT")
+            if "facts" not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN facts INTEGER NOT NULL DEFAULT 0")
+                if self._has_facts:
+                    self._conn.execute("UPDATE results SET facts = 1")
+        self.facts = facts
+        if facts:
+            self._conn.executescript(_FACTS_SCHEMA)
+            self._has_facts = True
+            with self._conn:
+                self._conn.execute("DELETE FROM results WHERE facts = 0")
+            self._string_ids = dict(self._conn.execute("SELECT value, id FROM strings"))
+        self._lock = threading.Lock()
+        self._stats = {
+            site_dir: (mtime_ns, size)
+            for site_dir, mtime_ns, size in self._conn.execute(
+                "SELECT site_dir, mtime_ns, size FROM results")
+        }
+        # Site folder -> pack of the sites indexed from a TracePack
+        self._packs = dict(self._conn.execute(
+            "SELECT site_dir, pack FROM results WHERE pack IS NOT NULL"))
+
+    def close(self):
+        self._conn.close()
+
+    def _stat_changed(self, path, site_dir):
+        """True if result.json differs from the indexed stat; None if it is missing."""
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return self._stats.get(site_dir) != (st.st_mtime_ns, st.st_size)
+
+    def _string_id(self, value):
+        """Dictionary code of a string; must hold the lock and a transaction."""
+        if value is None:
+            return None
+        code = self._string_ids.get(value)
+        if code is None:
+            code = self._conn.execute("INSERT INTO strings (value) VALUES (?)", (value,)).lastrowid
+            self._string_ids[value] = code
+        return code
+
+    def _store_facts(self, site_dir, facts):
+        site = self._string_id(site_dir)
+        self._conn.execute("DELETE FROM violations WHERE site = ?", (site,))
+        self._conn.executemany(
+            "INSERT INTO violations VALUES (?, ?, ?, ?, ?, ?)",
+            [(site, fact_type, entry, self._string_id(domain), self._string_id(cookie),
+              self._string_id(function))
+             for fact_type, entry, domain, cookie, function in facts])
+
+    def _forget_facts(self, site_dir):
+        if self.facts:
+            if site_dir in self._string_ids:
+                self._conn.execute("DELETE FROM violations WHERE site = ?", (self._string_ids[site_dir],))
+        elif self._has_facts:
+            # Kept by an earlier session with facts; they no longer match the result
+            self._conn.execute("DELETE FROM violations WHERE site = "
+                               "(SELECT id FROM strings WHERE value = ?)", (site_dir,))
+
+    def _store(self, site_dir, parsed, pack=None):
+        """Writes one parse_result_file() result, read from `pack` if given; must hold the lock and a transaction."""
+        mtime_ns, size, sha256, counts, facts = parsed
+        known = self._conn.execute("SELECT sha256 FROM results WHERE site_dir = ?",
+                                   (site_dir,)).fetchone()
+        if known and known[0] == sha256:
+            # Touched but unchanged: refresh the stat only
+            self._conn.execute("UPDATE results SET mtime_ns = ?, size = ?, pack = ? WHERE site_dir = ?",
+                               (mtime_ns, size, pack, site_dir))
+            self._stats[site_dir] = (mtime_ns, size)
+            self._mark_pack(site_dir, pack)
+            return
+        if counts is None:
+            print(f"⚠️ JSON decode error for {site_dir}, skipping.")
+            self._conn.execute("DELETE FROM results WHERE site_dir = ?", (site_dir,))
+            self._forget_facts(site_dir)
+            self._stats.pop(site_dir, None)
+            self._packs.pop(site_dir, None)
+            return
+        if self.facts:
+            self._store_facts(site_dir, facts)
+        else:
+            self._forget_facts(site_dir)
+        row = make_row(site_dir, counts)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (site_dir, mtime_ns, size, sha256, website, "
+            "id_leaking_count, cookie_sync_count, fingerprinting_count, total_violations, "
+            "is_compliant, pack, facts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (site_dir, mtime_ns, size, sha256, row["Website"],
+             row["ID_Leaking_Count"], row["Cookie_Sync_Count"], row["Fingerprinting_Count"],
+             row["Total_Violations"], int(row["Is_Compliant"]), pack, int(self.facts)))
+        self._stats[site_dir] = (mtime_ns, size)
+        self._mark_pack(site_dir, pack)
+
+    def _mark_pack(self, site_dir, pack):
+        if pack is None:
+            self._packs.pop(site_dir, None)
+        else:
+            self._packs[site_dir] = pack
+
+    def _update_packed(self, site_dir):
+        """Re-indexes a site whose result was read from a pack, if it changed there.
+
+        Returns False if the site is not indexed from a pack, or its pack
+        or packed result is gone.
+        """
+        path = self._packs.get(site_dir)
+        if path is None or not os.path.exists(path):
+            return False
+        with TracePack(path) as pack:
+            entry = pack.entry(site_dir, RESULT_FILE)
+            if entry is None:
+                return False
+            if self._stats.get(site_dir) != (entry[5], entry[3]):
+                parsed = parse_packed_result(pack, site_dir, self.facts)
+                with self._lock, self._conn:
+                    self._store(site_dir, parsed, path)
+        return True
+
+    def update(self, results_dir, site_dir):
+        """Indexes one site folder; returns its row, or None if unusable.
+
+        A site indexed from a pack whose folder was removed is read from
+        the pack instead.
+        """
+        path = find_file(os.path.join(results_dir, site_dir), RESULT_FILE)
+        changed = self._stat_changed(path, site_dir)
+        if changed is None:
+            if self._update_packed(site_dir):
+                return self.get(site_dir)
+            self._forget(site_dir)
+            return None
+        if changed:
+            parsed = parse_result_file(path, self.facts)
+            with self._lock, self._conn:
+                self._store(site_dir, parsed)
+        return self.get(site_dir)
+
+    def _forget(self, site_dir):
+        if site_dir not in self._stats:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE site_dir = ?", (site_dir,))
+            self._forget_facts(site_dir)
+            self._stats.pop(site_dir, None)
+            self._packs.pop(site_dir, None)
+
+    def get(self, site_dir):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT website, id_leaking_count, cookie_sync_count, fingerprinting_count, "
+                "total_violations, is_compliant FROM results WHERE site_dir = ?",
+                (site_dir,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(COLUMNS, row[:-1] + (bool(row[-1]),)))
+
+    def refresh(self, results_dir, site_dirs=None, workers=None):
+        """Brings the index up to date with `results_dir`.
+
+        Without `site_dirs`, every sub-directory is checked and sites whose
+        folder disappeared are dropped, unless they are indexed from a pack
+        that still exists (refresh_pack() keeps those up to date). Changed
+        results are parsed in a process pool. Returns the number of
+        re-parsed sites.
+        """
+        if site_dirs is None:
+            with os.scandir(results_dir) as entries:
+                site_dirs = [e.name for e in entries if e.is_dir()]
+            packs = {path for path in set(self._packs.values()) if os.path.exists(path)}
+            for gone in set(self._stats) - set(site_dirs):
+                if self._packs.get(gone) not in packs:
+                    self._forget(gone)
+        changed, paths = [], []
+        for site_dir in site_dirs:
+            path = find_file(os.path.join(results_dir, site_dir), RESULT_FILE)
+            state = self._stat_changed(path, site_dir)
+            if state is None:
+                if not self._update_packed(site_dir):
+                    self._forget(site_dir)
+            elif state:
+                changed.append(site_dir)
+                paths.append(path)
+        parsed = parse_result_files(paths, workers, self.facts)
+        with self._lock, self._conn:
+            for site_dir, result in zip(changed, parsed):
+                self._store(site_dir, result)
+        return len(changed)
+
+    def refresh_pack(self, pack):
+        """Indexes the results archived in a TracePack, reading only changed entries.
+
+        Sites indexed from here are marked with the pack, so refresh() and
+        update() keep them once their folders are removed. A site still
+        indexed from its folder keeps the folder's result; call this after a
+        full refresh(), which drops the sites whose folders were packed away.
+        Returns the number of re-parsed sites.
+        """
+        changed = 0
+        for site_dir in pack.sites():
+            if site_dir in self._stats and site_dir not in self._packs:
+                continue
+            entry = pack.entry(site_dir, RESULT_FILE)
+            if entry is None or (self._packs.get(site_dir) == pack.path
+                                 and self._stats.get(site_dir) == (entry[5], entry[3])):
+                continue
+            parsed = parse_packed_result(pack, site_dir, self.facts)
+            with self._lock, self._conn:
+                self._store(site_dir, parsed, pack.path)
+            changed += 1
+        return changed
+
+    def to_dataframe(self, site_dirs=None):
+        """The aggregate table (compact dtypes), optionally restricted to `site_dirs`."""
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT site_dir, website, id_leaking_count, cookie_sync_count, "
+                "fingerprinting_count, total_violations, is_compliant FROM results "
+                "ORDER BY site_dir", self._conn)
+        if site_dirs is not None:
+            df = df[df["site_dir"].isin(set(site_dirs))]
+        df = df.drop(columns="site_dir")
+        df.columns = COLUMNS
+        return compact_results(df.reset_index(drop=True))
+
+    def observed_at(self, site_dirs=None):
+        """Website -> when its result.json was last written (epoch seconds), from the indexed mtimes."""
+        with self._lock:
+            stats = dict(self._stats)
+        if site_dirs is not None:
+            stats = {s: stats[s] for s in site_dirs if s in stats}
+        observed = pd.Series([mtime_ns / 1e9 for mtime_ns, _ in stats.values()],
+                             index=[folder_to_website(s) for s in stats], dtype="float64")
+        # Folders that map to the same website: the most recent result counts
+        return observed.groupby(level=0).max()
+
+    def violations_dataframe(self, site_dirs=None, types=None):
+        """The violation-level fact table, optionally restricted to `site_dirs` and `types`.
+
+        One row per leaked cookie and receiving domain, fingerprinting
+        function and loaded third party (FACT_COLUMNS). String columns are
+        categoricals sharing the index's dictionary codes.
+        """
+        if not self.facts:
+            raise ValueError("This index was opened without facts")
+        query = ("SELECT site, type, entry, COALESCE(domain, -1), COALESCE(cookie, -1), "
+                 "COALESCE(function, -1) FROM violations")
+        params = []
+        if types is not None:
+            codes = [FACT_TYPES.index(t) for t in types]
+            query += f" WHERE type IN ({', '.join('?' * len(codes))})"
+            params += codes
+        query += " ORDER BY site, type, entry"
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            chunks = [np.empty((0, 6), dtype=np.int64)]
+            # Converted in chunks so only one chunk is ever held as tuples
+            while True:
+                chunk = cursor.fetchmany(_FETCH_ROWS)
+                if not chunk:
+                    break
+                chunks.append(np.array(chunk, dtype=np.int64))
+            strings = self._conn.execute("SELECT id, value FROM strings ORDER BY id").fetchall()
+            if site_dirs is not None:
+                wanted = [self._string_ids[s] for s in site_dirs if s in self._string_ids]
+        rows = np.concatenate(chunks)
+        if site_dirs is not None:
+            rows = rows[np.isin(rows[:, 0], wanted)]
+        ids = np.array([i for i, _ in strings], dtype=np.int64)
+        values = [v for _, v in strings]
+        # strings.id -> position in `values`; the last slot (-1, NULL) stays missing
+        lookup = np.full(int(ids.max(initial=0)) + 2, -1, dtype=np.int64)
+        lookup[ids] = np.arange(len(ids))
+
+        def column(codes):
+            return pd.Categorical.from_codes(lookup[codes], values).remove_unused_categories()
+
+        sites = column(rows[:, 0])
+        # Distinct folders may map to the same website
+        labels, websites = pd.factorize(pd.Index([folder_to_website(s) for s in sites.categories]))
+        return pd.DataFrame({
+            "Website": pd.Categorical.from_codes(labels[sites.codes], websites),
+            "Type": pd.Categorical.from_codes(rows[:, 1], FACT_TYPES),
+            "Entry": rows[:, 2].astype("int32"),
+            "Domain": column(rows[:, 3]),
+            "Cookie": column(rows[:, 4]),
+            "Function": column(rows[:, 5]),
+        })
@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from trace_store import read_file
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Fact types, in the order of their codes. "third_party" facts record a
+# domain the site loaded (its thirdParties list), not a violation.
+FACT_TYPES = ["id_leaking", "cookie_sync", "fingerprinting", "third_party"]
+
+
+def _count(value):
+    # Detector output holds lists; older pilot outputs stored plain counts
+    if isinstance(value, (list, dict)):
+        return len(value)
+    return int(value or 0)
+
+
+def counts_from_result(result):
+    """(id_leaking, cookie_sync, fingerprinting) counts of a loaded result.json."""
+    fingerprinting_obj = result.get("fingerprinting", {})
+    if isinstance(fingerprinting_obj, dict):
+        fingerprinting = _count(fingerprinting_obj.get("functions", []))
+    else:
+        fingerprinting = _count(fingerprinting_obj)
+    return (
+        _count(result.get("idLeaking", [])),
+        _count(result.get("cookieSync", [])),
+        fingerprinting,
+    )
+
+
+def _leak_facts(fact_type, entries):
+    facts = []
+    for entry, leak in enumerate(entries):
+        cookie = leak.get("cookie")
+        for domain in leak.get("associated3rdParties") or [None]:
+            facts.append((fact_type, entry, domain, cookie, None))
+    return facts
+
+
+def facts_from_result(result):
+    """The exploded violations of a loaded result.json.
+
+    One (type, entry, domain, cookie, function) tuple per leaked cookie
+    and receiving third party, per fingerprinting function and per third
+    party loaded; `type` is an index into FACT_TYPES, `entry` the position
+    of the violation in its list. Older pilot outputs that stored plain
+    counts have no facts.
+    """
+    facts = []
+    for fact_type, key in ((0, "idLeaking"), (1, "cookieSync")):
+        if isinstance(result.get(key), list):
+            facts += _leak_facts(fact_type, result[key])
+    fingerprinting = result.get("fingerprinting")
+    if isinstance(fingerprinting, dict) and isinstance(fingerprinting.get("functions"), list):
+        facts += [(2, entry, None, None, function)
+                  for entry, function in enumerate(fingerprinting["functions"])]
+    if isinstance(result.get("thirdParties"), list):
+        facts += [(3, entry, domain, None, None) for entry, domain in enumerate(result["thirdParties"])]
+    return facts
+
+
+def _array_length(raw, key, indent, start=0, end=None):
+    """Counts the elements of array `key` in `JSON.stringify(data, null, 2)` output.
+
+    JSON strings cannot hold raw newlines, so every line start is
+    structural: the elements of an array whose key sits at `indent`
+    spaces are exactly the lines at `indent + 2` spaces that do not close
+    a nested object or array, which one regex pass can count. Returns 0
+    for a missing key and None when the layout is not the expected one.
+    """
+    end = len(raw) if end is None else end
+    pad = b" " * indent
+    pos = raw.find(b"\n" + pad + b'"' + key + b'": ', start, end)
+    if pos < 0:
+        return 0
+    value = pos + len(pad) + len(key) + 5
+    if raw.startswith(b"[]", value):
+        return 0
+    if not raw.startswith(b"[\n", value):
+        return None
+    close = raw.find(b"\n" + pad + b"]", value, end)
+    if close < 0:
+        return None
+    return len(_element_pattern(indent + 2).findall(raw, value, close))
+
+
+@functools.lru_cache(maxsize=None)
+def _element_pattern(indent):
+    # A line at exactly `indent` spaces that does not close a nested value
+    return re.compile(rb"\n" + b" " * indent + rb"[^ }\]]")
+
+
+def count_violations(raw):
+    """Violation counts of a raw result.json without building the object.
+
+    Uses the pretty-printed layout written by the detector's StoreData and
+    falls back to a full JSON parse for anything else. Raises ValueError
+    (json.JSONDecodeError) for invalid JSON, like json.loads.
+    """
+    if raw.startswith(b'{\n  "') and raw.rstrip().endswith(b"\n}"):
+        id_leaking = _array_length(raw, b"idLeaking", 2)
+        cookie_sync = _array_length(raw, b"cookieSync", 2)
+        fingerprinting = 0
+        fp = raw.find(b'\n  "fingerprinting": ')
+        if fp >= 0:
+            value = fp + len(b'\n  "fingerprinting": ')
+            fp_end = raw.find(b"\n  }", value)
+            if raw.startswith(b"{\n", value) and fp_end >= 0:
+                fingerprinting = _array_length(raw, b"functions", 4, value, fp_end)
+            elif not raw.startswith(b"{}", value):
+                fingerprinting = None
+        if None not in (id_leaking, cookie_sync, fingerprinting):
+            return id_leaking, cookie_sync, fingerprinting
+    result = orjson.loads(raw) if orjson else json.loads(raw)
+    return counts_from_result(result)
+
+
+def _parse_raw(raw, facts):
+    """(counts, facts) of a raw result.json; (None, None) if invalid.
+
+    Counting alone uses the fast path; the facts need the full object.
+    """
+    try:
+        if not facts:
+            return count_violations(raw), None
+        result = orjson.loads(raw) if orjson else json.loads(raw)
+    except ValueError:
+        return None, None
+    return counts_from_result(result), facts_from_result(result)
+
+
+def parse_result_file(path, facts=False):
+    """(mtime_ns, size, sha256, counts, facts) for one result.json.
+
+    counts is None if the file is invalid; facts (see facts_from_result)
+    is only extracted when asked for. Compressed results (result.json.gz,
+    .zst) are read transparently; the stat is the stored file's, the hash
+    is of the uncompressed content.
+    """
+    st = os.stat(path)
+    raw = read_file(path)
+    return (st.st_mtime_ns, st.st_size, hashlib.sha256(raw).hexdigest()) + _parse_raw(raw, facts)
+
+
+def parse_packed_result(pack, site_dir, facts=False):
+    """parse_result_file for the result.json of a site in a TracePack; None if not packed.
+
+    Only that one entry is read from the archive.
+    """
+    entry = pack.entry(site_dir, "result.json")
+    if entry is None:
+        return None
+    _, _, _, length, _, mtime_ns, sha256 = entry
+    return (mtime_ns, length, sha256) + _parse_raw(pack.read(site_dir, "result.json"), facts)
+
+
+def parse_result_files(paths, workers=None, facts=False):
+    """parse_result_file over many paths, in a process pool when worthwhile."""
+    paths = list(paths)
+    parse = functools.partial(parse_result_file, facts=facts)
+    if len(paths) < PARALLEL_THRESHOLD or workers == 1:
+        return [parse(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(parse, paths, chunksize=chunksize))
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from classification import INDUSTRY_RULES
+
+COUNT_COLUMNS = ['ID_Leaking_Count', 'Cookie_Sync_Count', 'Fingerprinting_Count', 'Total_Violations']
+
+# Arrow-backed strings: one buffer per column instead of a Python object per site
+WEBSITE = 'string[pyarrow]'
+
+REGION = pd.CategoricalDtype(['EU', 'US'])
+INDUSTRY = pd.CategoricalDtype(sorted(INDUSTRY_RULES))
+
+SEVERITY_LABELS = ['Compliant (0)', 'Low (1-2)', 'Medium (3-5)', 'High (6+)']
+SEVERITY = pd.CategoricalDtype(SEVERITY_LABELS, ordered=True)
+# Highest violation count of each severity but the last
+SEVERITY_BOUNDS = [0, 2, 5]
+
+# How the Compliant flag is written in reports and exported tables
+COMPLIANT_LABELS = {True: 'Yes', False: 'No'}
+
+_INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def count_dtype(max_value):
+    """The smallest signed int dtype that holds counts up to `max_value`."""
+    for dtype in _INT_DTYPES:
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    raise OverflowError(f"Count {max_value} does not fit in int64")
+
+
+def compact_results(df):
+    """The aggregate table with Arrow strings, bool flags and the smallest safe count dtype.
+
+    Every count column gets the dtype that holds the largest total, so any
+    sum of per-type counts of one site fits too. Columns that are missing
+    are left out.
+    """
+    df = df.copy(deep=False)
+    if 'Website' in df:
+        df['Website'] = df['Website'].astype(WEBSITE)
+    if 'Is_Compliant' in df:
+        df['Is_Compliant'] = df['Is_Compliant'].astype(bool)
+    counts = [c for c in COUNT_COLUMNS if c in df]
+    if counts and len(df):
+        dtype = count_dtype(int(df[counts].max().max()))
+        df[counts] = df[counts].astype(dtype)
+    return df
+
+
+def sort_by_count(df, column, ascending=True):
+    """`df` sorted by a count column, ties in the order they had with int64 counts.
+
+    numpy's default sort does not keep ties in place, and where it leaves
+    them depends on the dtype; sorting the compact counts as int64 keeps
+    rankings (and the charts drawn from them) as they were before
+    compact_results.
+    """
+    return df.sort_values(column, ascending=ascending, key=lambda counts: counts.astype(np.int64))
+
+
+def top_by_count(df, column, n):
+    """The `n` rows with the highest `column`, ties in row order (like nlargest with keep='first')."""
+    return df.sort_values(column, ascending=False, kind='stable').head(n)
+
+
+def categorize_severity(violations):
+    """Severity label(s) of violation counts: a str for a number, a Categorical for an array or Series."""
+    if np.isscalar(violations):
+        return SEVERITY_LABELS[int(np.searchsorted(SEVERITY_BOUNDS, violations))]
+    codes = np.searchsorted(SEVERITY_BOUNDS, np.asarray(violations))
+    severity = pd.Categorical.from_codes(codes, dtype=SEVERITY)
+    if isinstance(violations, pd.Series):
+        return pd.Series(severity, index=violations.index, name='Severity')
+    return severity
+
+
+def compliant_labels(flags):
+    """'Yes'/'No' of a bool Series, as a categorical (for charts and exported tables)."""
+    return pd.Series(pd.Categorical.from_codes(flags.to_numpy(dtype=np.int8), ['No', 'Yes']),
+                     index=flags.index, name=flags.name)
+
+
+def export_frame(sites):
+    """A copy of a site frame as it is written to CSV/Excel, with 'Yes'/'No' for Compliant."""
+    sites = sites.copy(deep=False)
+    if 'Compliant' in sites:
+        sites['Compliant'] = compliant_labels(sites['Compliant'])
+    return sites
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Canonical results dataset: <STORE_PATH>/run=<run_id>/part-0.parquet, with
+# the run's violation-level facts next to it in violations.parquet and its
+# per-site content digests in digest.parquet; <STORE_PATH>/history.parquet
+# holds the per-site change history over runs (see run_history.py)
+STORE_PATH = "results_store"
+
+SCHEMA = pa.schema([
+    ("Website", pa.string()),
+    ("ID_Leaking_Count", pa.int32()),
+    ("Cookie_Sync_Count", pa.int32()),
+    ("Fingerprinting_Count", pa.int32()),
+    ("Total_Violations", pa.int32()),
+    ("Is_Compliant", pa.bool_()),
+])
+
+_DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+# result_index.FACT_COLUMNS; string columns are dictionary-encoded
+VIOLATION_SCHEMA = pa.schema([
+    ("Website", _DICTIONARY),
+    ("Type", _DICTIONARY),
+    ("Entry", pa.int32()),
+    ("Domain", _DICTIONARY),
+    ("Cookie", _DICTIONARY),
+    ("Function", _DICTIONARY),
+])
+
+# Per-site content hashes of a run (run_history.digest_run)
+DIGEST_SCHEMA = pa.schema([
+    ("Website", pa.string()),
+    ("Result_Hash", pa.uint64()),
+    ("Trackers_Hash", pa.uint64()),
+    ("Trackers", pa.int32()),
+    ("Total_Violations", pa.int32()),
+    ("Is_Compliant", pa.bool_()),
+    ("Observed_At", pa.float64()),
+])
+
+HISTORY_FILE = "history.parquet"
+
+# Facts per Parquet row group; groups are sorted by type and domain, so a
+# filter on either skips most of them
+VIOLATION_ROW_GROUP = 256 * 1024
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def list_runs(store=STORE_PATH):
+    """Run ids in the store, oldest first."""
+    if not os.path.isdir(store):
+        return []
+    return sorted(d[len("run="):] for d in os.listdir(store) if d.startswith("run="))
+
+
+def _write_table(table, run_id, name, store, **options):
+    run_dir = os.path.join(store, f"run={run_id}")
+    os.makedirs(run_dir, exist_ok=True)
+    # Write then rename so readers never see a half-written partition
+    tmp_path = os.path.join(run_dir, f".{name}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd", **options)
+    os.replace(tmp_path, os.path.join(run_dir, name))
+
+
+def write_run(df, run_id=None, store=STORE_PATH):
+    """Stores the aggregate table of one run as a typed Parquet partition."""
+    run_id = run_id or new_run_id()
+    table = pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+    _write_table(table, run_id, "part-0.parquet", store)
+    return run_id
+
+
+def write_violations(df, run_id, store=STORE_PATH):
+    """Stores the fact table of a run (ResultIndex.violations_dataframe) next to its aggregate."""
+    # Domains in lexical order, so each row group covers a narrow range
+    domain = df["Domain"].cat.reorder_categories(df["Domain"].cat.categories.sort_values())
+    df = df.assign(Domain=domain).iloc[np.lexsort((domain.cat.codes, df["Type"].cat.codes))]
+    table = pa.Table.from_pandas(df[VIOLATION_SCHEMA.names], schema=VIOLATION_SCHEMA,
+                                 preserve_index=False)
+    _write_table(table, run_id, "violations.parquet", store, row_group_size=VIOLATION_ROW_GROUP)
+    return run_id
+
+
+def write_digest(df, run_id, store=STORE_PATH):
+    """Stores the per-site digests of a run (run_history.digest_run) next to its aggregate."""
+    table = pa.Table.from_pandas(df[DIGEST_SCHEMA.names], schema=DIGEST_SCHEMA, preserve_index=False)
+    _write_table(table, run_id, "digest.parquet", store)
+    return run_id
+
+
+def has_digest(run, store=STORE_PATH):
+    return os.path.exists(os.path.join(store, f"run={run}", "digest.parquet"))
+
+
+def write_history(df, run_id, store=STORE_PATH):
+    """Replaces the per-site history, recording `run_id` as the last run applied to it."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"run": run_id.encode()})
+    os.makedirs(store, exist_ok=True)
+    tmp_path = os.path.join(store, f".{HISTORY_FILE}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, os.path.join(store, HISTORY_FILE))
+
+
+def read_history(store=STORE_PATH):
+    """(history frame, last run applied), or (None, None) before the first run."""
+    path = os.path.join(store, HISTORY_FILE)
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    return table.to_pandas(), table.schema.metadata[b"run"].decode()
+
+
+def read_results(columns=None, run=None, store=STORE_PATH):
+    """Loads one run (latest by default), reading only `columns`."""
+    runs = list_runs(store)
+    if not runs:
+        raise FileNotFoundError(f"No runs found in results store '{store}'")
+    run = run or runs[-1]
+    if run not in runs:
+        raise FileNotFoundError(f"Run '{run}' not found in results store '{store}'")
+    path = os.path.join(store, f"run={run}", "part-0.parquet")
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def read_violations(columns=None, run=None, store=STORE_PATH, filters=None):
+    """Loads the fact table of one run (latest by default) as categoricals.
+
+    `filters` are pushed down to the Parquet reader, e.g.
+    [("Type", "==", "id_leaking"), ("Domain", "in", ["criteo.com"])].
+    """
+    runs = list_runs(store)
+    run = run or (runs[-1] if runs else None)
+    path = os.path.join(store, f"run={run}", "violations.parquet")
+    if run not in runs or not os.path.exists(path):
+        raise FileNotFoundError(f"No violations stored for run '{run}' in results store '{store}'")
+    return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+
+def read_digest(run=None, store=STORE_PATH, columns=None):
+    """Loads the per-site digests of one run (latest by default)."""
+    runs = list_runs(store)
+    run = run or (runs[-1] if runs else None)
+    path = os.path.join(store, f"run={run}", "digest.parquet")
+    if run not in runs or not os.path.exists(path):
+        raise FileNotFoundError(f"No digest stored for run '{run}' in results store '{store}'")
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def read_all_runs(columns=None, store=STORE_PATH):
+    """Loads every run, with a 'run' column identifying each row's run."""
+    paths = [os.path.join(store, f"run={run}", "part-0.parquet") for run in list_runs(store)]
+    dataset = ds.dataset(paths, format="parquet", partitioning="hive", partition_base_dir=store)
+    if columns is not None:
+        columns = list(columns) + ["run"]
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+def top_domains(violations, fact_type, n=10):
+    """The `n` domains that appear on the most sites with facts of `fact_type`."""
+    facts = violations[(violations["Type"] == fact_type) & violations["Domain"].notna()]
+    sites = facts.drop_duplicates(["Website", "Domain"]).groupby("Domain", observed=True).size()
+    return sites.nlargest(n)
+
+
+def export(df, path):
+    """Optional spreadsheet export; the format follows the file extension."""
+    if path.endswith(".xlsx"):
+        df.to_excel(path, index=False)
+    elif path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported export format: {path}")
+
+
+def import_table(path, run_id=None, store=STORE_PATH):
+    """Adds a legacy Result.xlsx / CSV aggregate to the store as a run."""
+    df = pd.read_excel(path) if path.endswith(".xlsx") else pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    return write_run(df, run_id, store)
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "import":
+        run_id = import_table(args[1], args[2] if len(args) > 2 else None)
+        print(f"Imported {args[1]} as run {run_id}")
+    elif len(args) >= 2 and args[0] == "export":
+        run = args[2] if len(args) > 2 else None
+        export(read_results(run=run), args[1])
+        print(f"Exported run {run or list_runs()[-1]} to {args[1]}")
+    elif args and args[0] == "violations":
+        violations = read_violations(columns=["Website", "Type", "Domain"],
+                                     run=args[1] if len(args) > 1 else None)
+        for fact_type in violations["Type"].cat.categories:
+            print(f"{fact_type}: top domains by sites")
+            for domain, sites in top_domains(violations, fact_type).items():
+                print(f"    {sites:8d}  {domain}")
+    elif args and args[0] == "runs":
+        for run in list_runs():
+            print(run)
+    else:
+        print("Usage: python results_store.py runs")
+        print("       python results_store.py import <Result.xlsx|file.csv> [run_id]")
+        print("       python results_store.py export <file.xlsx|file.csv> [run_id]")
+        print("       python results_store.py violations [run_id]")
+
+
+if __name__ == "__main__":
+    main()
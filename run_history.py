@@ -0,0 +1,346 @@
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from result_schema import COUNT_COLUMNS
+from results_store import (STORE_PATH, has_digest, list_runs, read_digest, read_history,
+                           read_results, read_violations, write_digest, write_history)
+
+# Fact columns that make up a site's result besides its counts
+_FACT_FIELDS = ["Type", "Entry", "Domain", "Cookie", "Function"]
+
+# Odd 64-bit multiplier used to combine column hashes (FNV-1a's prime)
+_MIX = np.uint64(0x100000001B3)
+
+# Recrawl prior: a site observed for PRIOR_DAYS with PRIOR_CHANGES changes,
+# so new sites and sites seen only once get a moderate change rate
+PRIOR_CHANGES = 1.0
+PRIOR_DAYS = 30.0
+
+DAY = 86400.0
+
+# Transition per changed site, first match wins (diff_runs)
+TRANSITIONS = ["new_site", "dropped_site", "became_non_compliant", "became_compliant",
+               "violations_changed", "trackers_changed", "result_changed"]
+
+
+def _run_time(run):
+    """Epoch seconds of a run id made by new_run_id(), NaN for other ids."""
+    try:
+        return time.mktime(time.strptime(run, "%Y%m%d-%H%M%S"))
+    except ValueError:
+        return math.nan
+
+
+def _category_hashes(column):
+    """uint64 hash per value of a categorical column; missing values hash to 0."""
+    values = np.asarray(column.cat.categories, dtype=object)
+    lookup = np.append(pd.util.hash_array(values), np.uint64(0))
+    # Code -1 (missing) picks the trailing 0
+    return lookup[column.cat.codes.to_numpy()]
+
+
+def _combine(hashes):
+    combined = np.zeros(len(hashes[0]), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for h in hashes:
+            combined = (combined ^ h) * _MIX
+    return combined
+
+
+def digest_sites(rows, facts=None, observed=None, default_time=math.nan):
+    """Content hashes of every site of an aggregate table, one row per site (DIGEST_SCHEMA).
+
+    Result_Hash covers the site's counts, compliance and every violation
+    fact of `facts` (ResultIndex.violations_dataframe), Trackers_Hash the
+    set of third parties it loaded. Fact hashes are summed per site (mod
+    2**64) rather than chained, so neither depends on the order facts are
+    in. Each category is hashed once and facts map to it through their
+    codes. `observed` maps Website to when its result was produced
+    (ResultIndex.observed_at); other sites get `default_time`.
+    """
+    websites = pd.Index(rows["Website"].astype(str))
+    result_sum = np.zeros(len(rows), dtype=np.uint64)
+    trackers_sum = np.zeros(len(rows), dtype=np.uint64)
+    trackers = np.zeros(len(rows), dtype=np.int32)
+    if facts is not None and len(facts):
+        site = websites.get_indexer(facts["Website"].cat.categories)[facts["Website"].cat.codes]
+        # Facts of sites without an aggregate row are left out
+        keep = site >= 0
+        site = site[keep]
+        combined = np.zeros(len(site), dtype=np.uint64)
+        for name in _FACT_FIELDS:
+            column = facts[name]
+            if name == "Entry":
+                hashes = pd.util.hash_array(column.to_numpy(dtype=np.int64))[keep]
+            else:
+                hashes = _category_hashes(column)[keep]
+            combined ^= hashes
+            with np.errstate(over="ignore"):
+                combined *= _MIX
+            if name == "Type":
+                third_party = (column == "third_party").to_numpy()[keep]
+            elif name == "Domain":
+                # third_party facts are the site's distinct domains (GetThirdParties)
+                np.add.at(trackers_sum, site[third_party], hashes[third_party])
+                trackers += np.bincount(site[third_party], minlength=len(rows)).astype(np.int32)
+        np.add.at(result_sum, site, combined)
+    # Hashed as int64, whatever dtypes the table came with
+    counts = _combine([pd.util.hash_array(rows[c].to_numpy(dtype=np.int64)) for c in COUNT_COLUMNS]
+                      + [pd.util.hash_array(rows["Is_Compliant"].to_numpy(dtype=bool))])
+    observed_at = np.full(len(rows), default_time)
+    if observed is not None:
+        observed_at = observed.reindex(websites).fillna(default_time).to_numpy(dtype="float64")
+    return pd.DataFrame({
+        "Website": websites,
+        "Result_Hash": pd.util.hash_array(_combine([counts, result_sum])),
+        "Trackers_Hash": pd.util.hash_array(trackers_sum),
+        "Trackers": trackers,
+        "Total_Violations": rows["Total_Violations"].to_numpy(dtype=np.int32),
+        "Is_Compliant": rows["Is_Compliant"].to_numpy(dtype=bool),
+        "Observed_At": observed_at,
+    })
+
+
+def digest_run(run, store=STORE_PATH, observed=None):
+    """digest_sites of a run already in the store, e.g. one from before digests were kept.
+
+    Reading the fact table back costs far more than the hashing, so runs
+    of the study are digested as they are written (record_run).
+    """
+    rows = read_results(run=run, store=store)
+    try:
+        facts = read_violations(run=run, store=store)
+    except FileNotFoundError:
+        facts = None
+    return digest_sites(rows, facts, observed, _run_time(run))
+
+
+def record_run(run_id, rows, facts=None, observed=None, store=STORE_PATH):
+    """Digests a run just written to the store and applies it to the history; returns the digest."""
+    digest = digest_sites(rows, facts, observed, _run_time(run_id))
+    write_digest(digest, run_id, store)
+    update_history(run_id, store)
+    return digest
+
+
+def _empty_history():
+    return pd.DataFrame({
+        "Website": pd.Series(dtype=object), "Result_Hash": pd.Series(dtype=np.uint64),
+        "Is_Compliant": pd.Series(dtype=bool), "First_Observed": pd.Series(dtype="float64"),
+        "Last_Observed": pd.Series(dtype="float64"), "Last_Changed": pd.Series(dtype="float64"),
+        "Observations": pd.Series(dtype=np.int32), "Changes": pd.Series(dtype=np.int32),
+        "Compliance_Changes": pd.Series(dtype=np.int32),
+    })
+
+
+def update_history(run, store=STORE_PATH):
+    """Folds the digest of `run` into the per-site history (history.parquet).
+
+    Per site the history keeps the latest Result_Hash and compliance, when
+    it was first and last observed and last changed, and how many
+    observations and changes it has had - enough to diff and schedule
+    without reading earlier runs. A site is observed again only if its
+    Observed_At advanced, so sites carried over from an earlier crawl do
+    not count as unchanged observations. Runs are applied in order; an
+    already applied run is a no-op. Returns the history.
+    """
+    history, applied = read_history(store)
+    if applied is not None and run <= applied:
+        return history
+    if history is None:
+        history = _empty_history()
+    digest = read_digest(run, store, columns=["Website", "Result_Hash", "Is_Compliant", "Observed_At"])
+    digest["Observed_At"] = digest["Observed_At"].fillna(time.time())
+    position = pd.Index(history["Website"]).get_indexer(digest["Website"])
+    new = position < 0
+
+    def before(column, missing):
+        # The site's history value, `missing` for sites seen for the first time
+        values = history[column].to_numpy()
+        if not len(values):
+            return np.full(len(digest), missing, dtype=values.dtype)
+        return np.where(new, missing, values[np.maximum(position, 0)])
+
+    observed = digest["Observed_At"].to_numpy()
+    result_hash, is_compliant = digest["Result_Hash"].to_numpy(), digest["Is_Compliant"].to_numpy()
+    last_observed = before("Last_Observed", np.nan)
+    fresh = new | (observed > last_observed)
+    changed = fresh & ~new & (result_hash != before("Result_Hash", np.uint64(0)))
+    flipped = changed & (is_compliant != before("Is_Compliant", False))
+    # Sites not re-observed keep their history row as it was
+    updated = pd.DataFrame({
+        "Website": digest["Website"],
+        "Result_Hash": np.where(fresh, result_hash, before("Result_Hash", np.uint64(0))),
+        "Is_Compliant": np.where(fresh, is_compliant, before("Is_Compliant", False)),
+        "First_Observed": np.where(new, observed, before("First_Observed", np.nan)),
+        "Last_Observed": np.where(fresh, observed, last_observed),
+        "Last_Changed": np.where(new | changed, observed, before("Last_Changed", np.nan)),
+        "Observations": (before("Observations", 0) + fresh).astype(np.int32),
+        "Changes": (before("Changes", 0) + changed).astype(np.int32),
+        "Compliance_Changes": (before("Compliance_Changes", 0) + flipped).astype(np.int32),
+    })
+    unseen = np.ones(len(history), dtype=bool)
+    unseen[position[~new]] = False
+    # Sites missing from this run first, then the run's sites in its order
+    history = pd.concat([history[unseen], updated], ignore_index=True)
+    write_history(history, run, store)
+    return history
+
+
+def _side(digest, positions, suffix):
+    """The columns of `digest` at `positions` (-1: missing, as NA), with nullable dtypes."""
+    columns = digest.drop(columns="Website").convert_dtypes()
+    return columns.reindex(positions).reset_index(drop=True).add_suffix(suffix)
+
+
+def _differs(sites, column):
+    """Rows of a merge of two digests where `column` differs or is missing on one side."""
+    return (sites[column + "_Old"] != sites[column + "_New"]).fillna(True).to_numpy(dtype=bool)
+
+
+def _flipped(sites, compliant):
+    """Rows of a merge of two digests whose site went from `compliant` to the opposite."""
+    flipped = sites["Is_Compliant_Old"].eq(compliant) & sites["Is_Compliant_New"].eq(not compliant)
+    return flipped.fillna(False).to_numpy(dtype=bool)
+
+
+def _transitions(sites):
+    """The TRANSITIONS label of each row of an outer merge of two digests."""
+    conditions = [
+        sites["Result_Hash_Old"].isna().to_numpy(),
+        sites["Result_Hash_New"].isna().to_numpy(),
+        _flipped(sites, True),
+        _flipped(sites, False),
+        _differs(sites, "Total_Violations"),
+        _differs(sites, "Trackers_Hash"),
+    ]
+    return pd.Categorical(np.select(conditions, TRANSITIONS[:-1], TRANSITIONS[-1]),
+                          categories=TRANSITIONS)
+
+
+def _third_parties(run, websites, store):
+    """{website: set of third-party domains} of `websites` in one run."""
+    facts = read_violations(["Website", "Domain"], run=run, store=store,
+                            filters=[("Type", "==", "third_party"), ("Website", "in", list(websites))])
+    facts = facts.astype({"Website": str, "Domain": str})
+    return facts.groupby("Website")["Domain"].agg(set).to_dict()
+
+
+def diff_runs(old, new, store=STORE_PATH, trackers=True):
+    """Per-site transitions between two runs, from their digests only.
+
+    One row per site whose Result_Hash differs (or that is only in one of
+    the runs), with its TRANSITIONS label, compliance and violations in
+    both runs. With `trackers`, New_Trackers and Dropped_Trackers list the
+    third parties gained and lost, read from the two runs' fact tables
+    for the sites whose tracker set changed only; without, nothing but
+    the digests is read.
+    """
+    columns = ["Website", "Result_Hash", "Trackers_Hash", "Trackers", "Total_Violations", "Is_Compliant"]
+    old_digest, new_digest = read_digest(old, store, columns), read_digest(new, store, columns)
+    # Sites of the new run (position in the old one, -1 if new), then those dropped from the old
+    in_old = pd.Index(old_digest["Website"]).get_indexer(new_digest["Website"])
+    kept = np.zeros(len(old_digest), dtype=bool)
+    kept[in_old[in_old >= 0]] = True
+    dropped = np.flatnonzero(~kept)
+    sites = pd.concat([
+        pd.concat([new_digest["Website"], old_digest["Website"].iloc[dropped]], ignore_index=True),
+        _side(old_digest, np.concatenate([in_old, dropped]), "_Old"),
+        _side(new_digest, np.concatenate([np.arange(len(new_digest)), np.full(len(dropped), -1)]), "_New"),
+    ], axis=1)
+    sites = sites[_differs(sites, "Result_Hash")].reset_index(drop=True)
+    sites.insert(1, "Transition", _transitions(sites))
+    sites = sites[["Website", "Transition", "Is_Compliant_Old", "Is_Compliant_New",
+                  "Total_Violations_Old", "Total_Violations_New", "Trackers_Old", "Trackers_New",
+                  "Trackers_Hash_Old", "Trackers_Hash_New"]]
+    if trackers:
+        changed = sites["Website"][_differs(sites, "Trackers_Hash")]
+        before = _third_parties(old, changed, store) if len(changed) else {}
+        after = _third_parties(new, changed, store) if len(changed) else {}
+        sites["New_Trackers"] = [sorted(after.get(w, set()) - before.get(w, set())) for w in sites["Website"]]
+        sites["Dropped_Trackers"] = [sorted(before.get(w, set()) - after.get(w, set()))
+                                     for w in sites["Website"]]
+    return sites.drop(columns=["Trackers_Hash_Old", "Trackers_Hash_New"])
+
+
+def plan_recrawls(history, budget, now=None):
+    """The `budget` sites most likely to have changed since they were last observed.
+
+    A site's change rate is (Changes + PRIOR_CHANGES) / (days observed +
+    PRIOR_DAYS), and the chance it changed since its last observation
+    1 - exp(-rate * days since). Volatile sites are recrawled often,
+    stable ones once they have gone unseen long enough. Returns the
+    chosen history rows with Change_Rate, Staleness_Days and Priority,
+    highest priority first (ties: stalest, then by website).
+    """
+    now = time.time() if now is None else now
+    span = (history["Last_Observed"] - history["First_Observed"]) / DAY
+    plan = history.assign(
+        Change_Rate=(history["Changes"] + PRIOR_CHANGES) / (span + PRIOR_DAYS),
+        Staleness_Days=((now - history["Last_Observed"]) / DAY).clip(lower=0),
+    )
+    plan["Priority"] = -np.expm1(-plan["Change_Rate"] * plan["Staleness_Days"])
+    plan = plan.sort_values(["Priority", "Staleness_Days", "Website"], ascending=[False, False, True],
+                            kind="stable")
+    return plan.head(budget).reset_index(drop=True)
+
+
+def digested_runs(store=STORE_PATH):
+    """Runs of the store that have a digest, oldest first."""
+    return [run for run in list_runs(store) if has_digest(run, store)]
+
+
+def pending_runs(store=STORE_PATH):
+    """Digested runs newer than the last run applied to the history."""
+    _, applied = read_history(store)
+    return [run for run in digested_runs(store) if applied is None or run > applied]
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ("digest", "update", "diff", "plan"):
+        print("Usage: python run_history.py digest [run] [store]     # hash a run's sites (e.g. older runs)")
+        print("       python run_history.py update [store]           # apply digested runs to the history")
+        print("       python run_history.py diff [old new] [store]   # transitions between runs (latest two)")
+        print("       python run_history.py plan <budget> [store]    # sites to recrawl first")
+        return
+    if args[0] == "digest":
+        store = args[2] if len(args) > 2 else STORE_PATH
+        run = args[1] if len(args) > 1 else list_runs(store)[-1]
+        digest = digest_run(run, store)
+        write_digest(digest, run, store)
+        print(f"Digested {len(digest)} sites of run {run}")
+    elif args[0] == "update":
+        store = args[1] if len(args) > 1 else STORE_PATH
+        for run in pending_runs(store):
+            history = update_history(run, store)
+            print(f"Applied run {run}: {len(history)} sites in the history")
+    elif args[0] == "diff":
+        store = args[3] if len(args) > 3 else STORE_PATH
+        runs = args[1:3] if len(args) > 2 else digested_runs(store)[-2:]
+        if len(runs) < 2:
+            print("Need two digested runs to diff")
+            return
+        sites = diff_runs(runs[0], runs[1], store)
+        print(f"{len(sites)} sites changed from run {runs[0]} to run {runs[1]}")
+        for transition, count in sites["Transition"].value_counts(sort=False).items():
+            print(f"{transition:<22} {count}")
+        with pd.option_context("display.max_rows", 50, "display.width", 160):
+            print(sites)
+    else:
+        store = args[2] if len(args) > 2 else STORE_PATH
+        history, _ = read_history(store)
+        if history is None:
+            print(f"No history in results store '{store}'")
+            return
+        plan = plan_recrawls(history, int(args[1]))
+        with pd.option_context("display.max_rows", None, "display.width", 160):
+            print(plan[["Website", "Observations", "Changes", "Change_Rate", "Staleness_Days", "Priority"]])
+
+
+if __name__ == "__main__":
+    main()
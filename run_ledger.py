@@ -0,0 +1,244 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from domain_list import site_from_folder
+from trace_store import find_file
+
+LEDGER_PATH = "Source/Results/ledger.sqlite"
+
+STAGES = ["crawl", "detect", "parse"]
+NEXT_STAGE = {"crawl": "detect", "detect": "parse", "parse": "done"}
+
+# Files written by each stage, used for the output hash
+CRAWL_OUTPUTS = ["requests.json", "cookies.json", "thirdPartyCookies.json",
+                 "website.json", "functions.json", "cmp.json"]
+DETECT_OUTPUTS = ["result.json"]
+
+# Domains per `IN (...)` query, under SQLite's bound-parameter limit
+_IN_BATCH = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    domain      TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    folder      TEXT NOT NULL,
+    stage       TEXT NOT NULL DEFAULT 'crawl',    -- next stage to run, or 'done'
+    status      TEXT NOT NULL DEFAULT 'pending',  -- pending, running, failed, done
+    error_class TEXT,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS sites_by_status ON sites (status, stage);
+CREATE INDEX IF NOT EXISTS sites_by_error ON sites (error_class) WHERE status = 'failed';
+
+CREATE TABLE IF NOT EXISTS stage_runs (
+    domain      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    duration    REAL,
+    error_class TEXT,
+    output_hash TEXT,
+    finished_at REAL,
+    PRIMARY KEY (domain, stage)
+);
+"""
+
+
+def hash_outputs(folder_path, filenames):
+    """sha256 over the given files of a site folder (None if none exist).
+
+    Each file is hashed as stored, in whichever format it was written.
+    """
+    digest = hashlib.sha256()
+    found = False
+    for name in filenames:
+        path = find_file(folder_path, name)
+        if path is None:
+            continue
+        found = True
+        digest.update(name.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest() if found else None
+
+
+class RunLedger:
+    """SQLite ledger of per-site stage progress for resumable studies.
+
+    Each site sits at one stage (crawl -> detect -> parse -> done) with a
+    status. Only completed stages move a site forward, so a killed run
+    leaves sites at the stage they were in and a restart picks up exactly
+    the pending work. Failed sites stay failed until `requeue` is called.
+    """
+
+    def __init__(self, path=LEDGER_PATH, results_dir="Source/Results"):
+        self.path = path
+        self.results_dir = results_dir
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def _write(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def recover(self):
+        """Returns sites interrupted mid-stage to pending; returns how many."""
+        cur = self._write("UPDATE sites SET status = 'pending' WHERE status = 'running'")
+        return cur.rowcount
+
+    def add_sites(self, sites, finished=()):
+        """Registers `(domain, url, folder)` tuples not seen before.
+
+        `finished` sites already have a result.json from before the ledger
+        existed and are registered straight at the parse stage.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sites (domain, url, folder, updated_at) VALUES (?, ?, ?, ?)",
+                [(d, u, f, now) for d, u, f in sites])
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sites (domain, url, folder, stage, updated_at) "
+                "VALUES (?, ?, ?, 'parse', ?)",
+                [(d, u, f, now) for d, u, f in finished])
+
+    def known_domains(self, domains=None):
+        """Registered domains; only those among `domains` if given (e.g. one chunk of a list)."""
+        if domains is None:
+            return {row[0] for row in self._read("SELECT domain FROM sites")}
+        domains = list(domains)
+        known = set()
+        for i in range(0, len(domains), _IN_BATCH):
+            batch = domains[i:i + _IN_BATCH]
+            known.update(row[0] for row in self._read(
+                f"SELECT domain FROM sites WHERE domain IN ({','.join('?' * len(batch))})", batch))
+        return known
+
+    def pending(self, stage):
+        """Sites waiting for `stage`, as `(domain, url, folder)` tuples."""
+        return self._read(
+            "SELECT domain, url, folder FROM sites WHERE status = 'pending' AND stage = ?",
+            (stage,))
+
+    def done(self):
+        return self._read("SELECT domain, url, folder FROM sites WHERE status = 'done'")
+
+    def start(self, domain, stage):
+        self._write("UPDATE sites SET stage = ?, status = 'running', updated_at = ? WHERE domain = ?",
+                    (stage, time.time(), domain))
+
+    def finish(self, domain, folder, stage, ok, attempts=1, duration=None, error_class=None):
+        """Records the outcome of `stage` and advances the site on success."""
+        output_hash = None
+        if ok and stage != "parse":
+            outputs = CRAWL_OUTPUTS if stage == "crawl" else DETECT_OUTPUTS
+            output_hash = hash_outputs(os.path.join(self.results_dir, folder), outputs)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO stage_runs (domain, stage, attempts, duration, error_class, output_hash, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (domain, stage) DO UPDATE SET attempts = attempts + excluded.attempts, "
+                "duration = excluded.duration, error_class = excluded.error_class, "
+                "output_hash = excluded.output_hash, finished_at = excluded.finished_at",
+                (domain, stage, attempts, duration, error_class, output_hash, now))
+            if ok:
+                next_stage = NEXT_STAGE[stage]
+                self._conn.execute(
+                    "UPDATE sites SET stage = ?, status = ?, error_class = NULL, updated_at = ? WHERE domain = ?",
+                    (next_stage, "done" if next_stage == "done" else "pending", now, domain))
+            else:
+                self._conn.execute(
+                    "UPDATE sites SET stage = ?, status = 'failed', error_class = ?, updated_at = ? "
+                    "WHERE domain = ?",
+                    (stage, error_class, now, domain))
+
+    def requeue(self, error_class=None, stage=None):
+        """Moves failed sites (optionally of one class / stage) back to pending."""
+        sql = "UPDATE sites SET status = 'pending', updated_at = ? WHERE status = 'failed'"
+        params = [time.time()]
+        if error_class:
+            sql += " AND error_class = ?"
+            params.append(error_class)
+        if stage:
+            sql += " AND stage = ?"
+            params.append(stage)
+        return self._write(sql, params).rowcount
+
+    def recrawl(self, domains):
+        """Sends finished sites among `domains` back to the crawl stage; returns how many.
+
+        Used for longitudinal runs (run_history.plan_recrawls): the site is
+        crawled, detected and parsed again, and its new result is a new
+        observation. Sites still in progress or failed are left alone.
+        """
+        domains = list(domains)
+        now = time.time()
+        moved = 0
+        for i in range(0, len(domains), _IN_BATCH):
+            batch = domains[i:i + _IN_BATCH]
+            moved += self._write(
+                "UPDATE sites SET stage = 'crawl', status = 'pending', error_class = NULL, "
+                f"updated_at = ? WHERE status = 'done' AND domain IN ({','.join('?' * len(batch))})",
+                [now] + batch).rowcount
+        return moved
+
+    def finished_domains(self, websites):
+        """Ledger domains of the finished sites stored under `websites`; returns (domains, missing).
+
+        Stored results name a site by site_from_folder() of its folder, which
+        for folders from before site keys ('a_b_com') is not the ledger's
+        domain. `missing` are the websites no finished site is stored under.
+        """
+        by_website = {}
+        for domain, _, folder in self.done():
+            by_website.setdefault(site_from_folder(folder), []).append(domain)
+        domains, missing = [], []
+        for website in websites:
+            if website in by_website:
+                domains += by_website[website]
+            else:
+                missing.append(website)
+        return domains, missing
+
+    def summary(self):
+        """{(stage, status, error_class): count} over all sites."""
+        rows = self._read("SELECT stage, status, error_class, COUNT(*) FROM sites "
+                          "GROUP BY stage, status, error_class ORDER BY stage, status")
+        return {(stage, status, error): count for stage, status, error, count in rows}
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ("summary", "requeue"):
+        print("Usage: python run_ledger.py summary")
+        print("       python run_ledger.py requeue [error_class] [stage]")
+        return
+    ledger = RunLedger()
+    if args[0] == "summary":
+        for (stage, status, error), count in ledger.summary().items():
+            print(f"{stage:<8} {status:<8} {error or '':<20} {count}")
+    else:
+        error_class = args[1] if len(args) > 1 else None
+        stage = args[2] if len(args) > 2 else None
+        print(f"Re-queued {ledger.requeue(error_class, stage)} sites.")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
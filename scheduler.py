@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from process_runner import OK, StageOutcome
+
+# Marks the end of a stage's input queue
+_DONE = object()
+
+
+def host_key(url):
+    """Host used for politeness, e.g. 'https://www.bbc.com/news' -> 'bbc.com'."""
+    if "://" not in url:
+        url = "https://" + url
+    host = (urlparse(url).hostname or url).lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+class HostPoliteness:
+    """Serializes visits to the same host and spaces them by `min_interval` seconds.
+
+    Visits to different hosts never wait on each other, so the global
+    `time.sleep` padding between sites is no longer needed.
+    """
+
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self._last_visit = {}
+
+    def _host_lock(self, host):
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+            return self._host_locks[host]
+
+    @contextmanager
+    def visit(self, url):
+        host = host_key(url)
+        with self._host_lock(host):
+            wait_time = self._last_visit.get(host, 0) + self.min_interval - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+            try:
+                yield
+            finally:
+                self._last_visit[host] = time.monotonic()
+
+
+class StudyScheduler:
+    """Crawl -> detect -> parse pipeline with bounded queues between stages.
+
+    `crawl(url, folder_name)` and `detect(folder_name)` return a
+    `process_runner.StageOutcome`, like `run_crawler_with_retry` /
+    `run_detector_with_retry`; `parse(site)` returns the site's aggregate
+    row (or None). A finished crawl is queued for detection and a finished
+    detection for parsing right away, so the stages overlap. When a
+    downstream queue is full the upstream workers block, which keeps
+    finished-but-unprocessed work bounded.
+
+    If a `run_ledger.RunLedger` is given, every stage start and outcome is
+    recorded in it; a `stage_metrics.MetricsLog` gets every outcome too.
+    """
+
+    def __init__(self, crawl, detect, parse=None, crawl_workers=4, detect_workers=8,
+                 parse_workers=1, host_delay=2.0, queue_size=None, ledger=None, metrics=None):
+        self.crawl = crawl
+        self.detect = detect
+        self.parse = parse
+        self.crawl_workers = crawl_workers
+        self.detect_workers = detect_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size or 2 * detect_workers
+        self.politeness = HostPoliteness(host_delay)
+        self.ledger = ledger
+        self.metrics = metrics
+        self.status = {}
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def _set_status(self, domain, status):
+        with self._lock:
+            self.status[domain] = status
+
+    def _begin(self, site, stage):
+        if self.ledger:
+            self.ledger.start(site[0], stage)
+
+    def _finish(self, site, stage, outcome):
+        if self.ledger:
+            self.ledger.finish(site[0], site[2], stage, outcome.ok, outcome.attempts,
+                               outcome.duration, outcome.error_class)
+        if self.metrics:
+            self.metrics.record(stage, site[0], site[2], outcome)
+
+    def _crawl_site(self, site, detect_q):
+        domain, url, folder_name = site
+        with self.politeness.visit(url):
+            self._begin(site, "crawl")
+            outcome = self.crawl(url, folder_name)
+        self._finish(site, "crawl", outcome)
+        if not outcome.ok:
+            print(f"🚫 Skipping {domain} due to Crawler failure")
+            self._set_status(domain, "crawl_failed")
+            return
+        self._set_status(domain, "crawled")
+        detect_q.put(site)
+
+    def _detect_site(self, site, parse_q):
+        domain, url, folder_name = site
+        self._begin(site, "detect")
+        outcome = self.detect(folder_name)
+        self._finish(site, "detect", outcome)
+        if not outcome.ok:
+            print(f"🚫 Skipping {domain} due to Detector failure")
+            self._set_status(domain, "detect_failed")
+            return
+        self._set_status(domain, "detected")
+        parse_q.put(site)
+
+    def _parse_site(self, site, _):
+        domain = site[0]
+        if not self.parse:
+            self._set_status(domain, "done")
+            return
+        started = time.monotonic()
+        row = self.parse(site)
+        self._finish(site, "parse", StageOutcome(row is not None, 1, time.monotonic() - started,
+                                                 OK if row is not None else "parse_error"))
+        if row is None:
+            self._set_status(domain, "parse_failed")
+            return
+        with self._lock:
+            self.rows.append(row)
+            self.status[domain] = "done"
+
+    def _worker(self, handler, in_q, out_q):
+        while True:
+            site = in_q.get()
+            if site is _DONE:
+                return
+            try:
+                handler(site, out_q)
+            except Exception as e:
+                print(f"⚠️ Unexpected error for {site[0]}: {e}")
+                self._set_status(site[0], "error")
+
+    def _start_stage(self, name, count, handler, in_q, out_q):
+        threads = [
+            threading.Thread(target=self._worker, args=(handler, in_q, out_q),
+                             name=f"{name}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    @staticmethod
+    def _close_stage(threads, in_q):
+        for _ in threads:
+            in_q.put(_DONE)
+        for t in threads:
+            t.join()
+
+    def run(self, sites, finished_sites=(), crawled_sites=()):
+        """Processes `(domain, url, folder_name)` tuples; returns the parsed rows.
+
+        `crawled_sites` already have traces and start at the detect stage;
+        `finished_sites` already have a result.json and go straight to the
+        parse stage.
+        """
+        started = time.monotonic()
+        crawl_q = queue.Queue(self.queue_size)
+        detect_q = queue.Queue(self.queue_size)
+        parse_q = queue.Queue(self.queue_size)
+
+        crawlers = self._start_stage("crawl", self.crawl_workers, self._crawl_site, crawl_q, detect_q)
+        detectors = self._start_stage("detect", self.detect_workers, self._detect_site, detect_q, parse_q)
+        parsers = self._start_stage("parse", self.parse_workers, self._parse_site, parse_q, None)
+
+        def feed(items, q):
+            for site in items:
+                q.put(site)
+
+        feeders = [
+            threading.Thread(target=feed, args=(items, q), name=f"feed-{i}", daemon=True)
+            for i, (items, q) in enumerate([(sites, crawl_q), (crawled_sites, detect_q)])
+        ]
+        for t in feeders:
+            t.start()
+        feed(finished_sites, parse_q)
+        for t in feeders:
+            t.join()
+
+        # Drain the stages in order so every queued site is processed
+        self._close_stage(crawlers, crawl_q)
+        self._close_stage(detectors, detect_q)
+        self._close_stage(parsers, parse_q)
+
+        elapsed = time.monotonic() - started
+        done = sum(1 for s in self.status.values() if s == "done")
+        total = len(sites) + len(crawled_sites) + len(finished_sites)
+        print(f"\n⏱️ Processed {total} sites in {elapsed:.1f}s "
+              f"({done} parsed)")
+        return self.rows
@@ -0,0 +1,201 @@
+import collections
+import json
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from process_runner import CRASH, OK, TIMEOUT, StageResult, classify_failure, kill_tree
+
+SERVICE_CMD = ["node", "service.js"]
+
+
+class _Worker:
+    """One service process speaking JSON lines over stdin/stdout."""
+
+    def __init__(self, cmd, cwd):
+        self.proc = subprocess.Popen(
+            cmd, cwd=cwd,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, errors="replace", bufsize=1,
+            start_new_session=True,
+        )
+        self.requests = 0
+        self._next_id = 0
+        self._responses = queue.Queue()
+        self._stderr = collections.deque(maxlen=50)
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            self._responses.put(line)
+        self._responses.put(None)  # EOF: the worker died
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            self._stderr.append(line.rstrip("\n"))
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def request(self, payload, timeout):
+        """Sends one request; returns a StageResult like process_runner.run_stage."""
+        started = time.monotonic()
+        self._next_id += 1
+        self.requests += 1
+        try:
+            self.proc.stdin.write(json.dumps(dict(payload, id=self._next_id)) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return self._crashed(started)
+        deadline = started + timeout
+        while True:
+            try:
+                line = self._responses.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.kill()
+                return StageResult(None, TIMEOUT, time.monotonic() - started,
+                                   f"Hard timeout of {timeout}s in {' '.join(self.proc.args)}")
+            if line is None:
+                return self._crashed(started)
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue  # stray output, not a protocol line
+            if response.get("id") == self._next_id:
+                break
+        duration = time.monotonic() - started
+        output = response.get("output", "")
+        metrics = response.get("metrics")
+        if response.get("ok"):
+            return StageResult(0, OK, duration, output, metrics)
+        output = "\n".join(filter(None, [output, response.get("error")]))
+        return StageResult(1, classify_failure(1, output), duration, output, metrics)
+
+    def _crashed(self, started):
+        returncode = self.proc.wait()
+        output = "\n".join(self._stderr)
+        error_class = classify_failure(returncode, output) if returncode else CRASH
+        return StageResult(returncode, error_class, time.monotonic() - started, output)
+
+    def kill(self):
+        # SIGTERM first: lets a crawler service take its browser down with it
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+            self.proc.wait(timeout=5)
+        except (OSError, AttributeError, subprocess.TimeoutExpired):
+            kill_tree(self.proc)
+            self.proc.wait()
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class ServicePool:
+    """Warm `node service.js` workers shared by threads.
+
+    `request` hands a payload to an idle worker and waits for its result,
+    so each site costs the work itself, not a Node start-up and the
+    loading of configs (or a browser). A worker that times out is killed
+    and replaced; a worker is also replaced after `recycle_after` requests
+    to bound its memory.
+    """
+
+    def __init__(self, cwd, size=4, recycle_after=500, cmd=SERVICE_CMD):
+        self.cwd = cwd
+        self.size = size
+        self.recycle_after = recycle_after
+        self.cmd = cmd
+        self._idle = queue.LifoQueue()  # most recently used first: warmest caches
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if self._started < self.size:
+                    self._started += 1
+                    try:
+                        return _Worker(self.cmd, self.cwd)
+                    except OSError:
+                        self._started -= 1
+                        raise
+            # All workers busy; a retired one frees a slot without a put()
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                pass
+
+    def _release(self, worker):
+        if not worker.alive() or worker.requests >= self.recycle_after:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+    def _retire(self, worker):
+        worker.close()
+        with self._lock:
+            self._started -= 1
+
+    def request(self, payload, timeout):
+        started = time.monotonic()
+        try:
+            worker = self._checkout()
+        except OSError as e:
+            return StageResult(None, CRASH, time.monotonic() - started,
+                               f"Failed to launch {' '.join(self.cmd)}: {e}")
+        try:
+            return worker.request(payload, timeout)
+        finally:
+            self._release(worker)
+
+    def close(self):
+        """Stops the idle workers; the pool starts new ones if used again."""
+        while True:
+            try:
+                self._retire(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DetectorPool(ServicePool):
+    """Warm detector workers (Source/Detector/service.js)."""
+
+    def analyse(self, folder_path, timeout):
+        """Runs the detector on `folder_path` (relative to `cwd`); returns a StageResult."""
+        return self.request({"dir": folder_path}, timeout)
+
+
+class CrawlerPool(ServicePool):
+    """Warm crawler workers (Source/Crawler/service.js), one browser each.
+
+    The browser is kept between sites (each site gets a clean context)
+    and recycled by the service itself; see Source/Crawler/README.md.
+    """
+
+    def __init__(self, cwd, size=4, recycle_after=1000, cmd=SERVICE_CMD):
+        super().__init__(cwd, size, recycle_after, cmd)
+
+    def crawl(self, url, timeout, folder=None):
+        """Crawls `url` and stores its traces like `node app.js <url> [folder]`; returns a StageResult."""
+        request = {"url": url}
+        if folder is not None:
+            request["folder"] = folder
+        return self.request(request, timeout)
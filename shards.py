@@ -0,0 +1,133 @@
+import os
+import sys
+
+import pandas as pd
+
+from domain_list import parse_shard
+from result_parser import FACT_TYPES
+from results_store import (STORE_PATH, list_runs, new_run_id, read_results, read_violations,
+                           write_run, write_violations)
+from run_ledger import RunLedger
+from violation_metrics import ViolationMetrics
+
+SHARDS_DIR = "Source/Results/shards"
+
+
+def shard_dir(shard, root=SHARDS_DIR):
+    index, count = shard
+    return os.path.join(root, f"{index}-of-{count}")
+
+
+def shard_paths(shard, root=SHARDS_DIR):
+    """Where one shard keeps its ledger, result index, results store and metrics.
+
+    Every shard writes only below its own directory, so shards can run as
+    separate processes on one machine or on separate nodes (each with its
+    copy of the domain list) and be collected with merge_shards().
+    """
+    base = shard_dir(shard, root)
+    return {
+        "ledger": os.path.join(base, "ledger.sqlite"),
+        "index": os.path.join(base, "result_index.sqlite"),
+        "store": os.path.join(base, "store"),
+        "metrics": os.path.join(base, "metrics.jsonl"),
+        "prom": os.path.join(base, "metrics.prom"),
+    }
+
+
+def _latest_run(store):
+    runs = list_runs(store)
+    return runs[-1] if runs else None
+
+
+def _fact_categories(facts):
+    """Categoricals again after concatenating fact tables with different dictionaries."""
+    facts = facts.astype({c: "category" for c in ("Website", "Domain", "Cookie", "Function")})
+    facts["Type"] = pd.Categorical(facts["Type"], categories=FACT_TYPES)
+    return facts
+
+
+def merge_shards(count, root=SHARDS_DIR, store=STORE_PATH, run_id=None):
+    """Combines the latest run of each of `count` shards into one run of `store`.
+
+    A website stored by several shards (e.g. one re-run with a different
+    shard count) is kept once: the row of the newest run, and on equal run
+    ids that of the lowest shard. Its violation facts come from the same
+    run. Rows are ordered by website, so the merged run does not depend
+    on which shard finished first. Returns (run_id, info) where info has
+    the sites and duplicates per shard and the ViolationMetrics of the
+    merged table.
+    """
+    tables, facts, info = [], [], {"shards": []}
+    for index in range(count):
+        shard_store = shard_paths((index, count), root)["store"]
+        run = _latest_run(shard_store)
+        if run is None:
+            raise FileNotFoundError(f"Shard {index}/{count} has no run in '{shard_store}'")
+        df = read_results(run=run, store=shard_store)
+        tables.append(df.assign(_run=run, _shard=index))
+        try:
+            shard_facts = read_violations(run=run, store=shard_store)
+            facts.append(shard_facts.astype({"Website": str}).assign(_run=run, _shard=index))
+        except FileNotFoundError:
+            pass
+        info["shards"].append({"shard": index, "run": run, "sites": len(df)})
+    merged = pd.concat(tables, ignore_index=True)
+    merged = merged.sort_values(["Website", "_run", "_shard"], ascending=[True, False, True],
+                                kind="stable")
+    winners = merged.drop_duplicates("Website", keep="first")
+    info["duplicates"] = len(merged) - len(winners)
+    run_id = write_run(winners.drop(columns=["_run", "_shard"]).reset_index(drop=True),
+                       run_id or new_run_id(), store)
+    if facts:
+        facts = pd.concat(facts, ignore_index=True)
+        facts = facts.merge(winners[["Website", "_run", "_shard"]], on=["Website", "_run", "_shard"])
+        write_violations(_fact_categories(facts.drop(columns=["_run", "_shard"])), run_id, store)
+    info["metrics"] = ViolationMetrics.from_frame(winners)
+    return run_id, info
+
+
+def ledger_summary(count, root=SHARDS_DIR):
+    """{(stage, status, error_class): sites} summed over the ledgers of `count` shards."""
+    total = {}
+    for index in range(count):
+        path = shard_paths((index, count), root)["ledger"]
+        if not os.path.exists(path):
+            continue
+        ledger = RunLedger(path)
+        for key, sites in ledger.summary().items():
+            total[key] = total.get(key, 0) + sites
+        ledger.close()
+    return total
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("merge", "status", "paths"):
+        print("Usage: python shards.py merge <count> [shards_dir] [store]   # one run from every shard")
+        print("       python shards.py status <count> [shards_dir]          # ledgers of every shard")
+        print("       python shards.py paths <i/K> [shards_dir]             # where shard i writes")
+        return
+    root = args[2] if len(args) > 2 else SHARDS_DIR
+    if args[0] == "paths":
+        for name, path in shard_paths(parse_shard(args[1]), root).items():
+            print(f"{name}: {path}")
+        return
+    count = int(args[1])
+    if args[0] == "status":
+        for (stage, status, error_class), sites in sorted(ledger_summary(count, root).items(),
+                                                          key=lambda item: str(item[0])):
+            print(f"{stage:<8} {status:<8} {error_class or '':<20} {sites}")
+        return
+    store = args[3] if len(args) > 3 else STORE_PATH
+    run_id, info = merge_shards(count, root, store)
+    for shard in info["shards"]:
+        print(f"shard {shard['shard']}/{count}: run {shard['run']}, {shard['sites']} sites")
+    print(f"Merged {info['metrics'].sites} sites ({info['duplicates']} duplicates dropped) "
+          f"into run {run_id} of {store}")
+    for key, value in info["metrics"].metrics().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
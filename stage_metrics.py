@@ -0,0 +1,258 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from run_ledger import CRAWL_OUTPUTS
+from trace_store import find_file
+
+METRICS_PATH = "Source/Results/metrics.jsonl"
+PROM_PATH = "Source/Results/metrics.prom"
+
+STAGES = ["crawl", "detect", "parse"]
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300]
+
+# Numeric fields of a record that the summary reports percentiles for
+SUMMARY_FIELDS = ["duration", "peak_rss_mb", "rss_mb", "trace_bytes"]
+
+# Seconds between rewrites of the Prometheus file while a run is going
+_PROM_INTERVAL = 5.0
+
+
+def trace_bytes(folder_path):
+    """Bytes of crawler traces stored in a site folder, in whichever format."""
+    total = 0
+    for name in CRAWL_OUTPUTS:
+        path = find_file(folder_path, name)
+        if path is not None:
+            total += os.path.getsize(path)
+    return total
+
+
+class MetricsLog:
+    """Per-site, per-stage metrics of a study run.
+
+    Every stage outcome is appended to a JSONL log (one record per site
+    and stage, tagged with the run id) and aggregated into counters and
+    duration histograms, which are written in the Prometheus text format
+    to `prom_path` and optionally served over HTTP on `port`.
+    """
+
+    def __init__(self, path=METRICS_PATH, results_dir="Source/Results", prom_path=PROM_PATH,
+                 port=None, run_id=None):
+        self.path = path
+        self.results_dir = results_dir
+        self.prom_path = prom_path
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self._counts = {}        # (stage, error_class) -> sites
+        self._retries = {}       # stage -> retries
+        self._buckets = {}       # stage -> per-bucket counts (last one is +Inf)
+        self._sums = {}          # stage -> total seconds
+        self._trace_bytes = 0
+        self._peak_rss_mb = None
+        self._prom_written = 0.0
+        self._server = None
+        if port:
+            self.serve(port)
+
+    def record(self, stage, domain, folder, outcome):
+        """Logs the StageOutcome of one site's stage."""
+        entry = {
+            "ts": round(time.time(), 3),
+            "run": self.run_id,
+            "stage": stage,
+            "domain": domain,
+            "folder": folder,
+            "ok": outcome.ok,
+            "attempts": outcome.attempts,
+            "retries": max(0, outcome.attempts - 1),
+            "duration": round(outcome.duration, 3),
+            "error_class": outcome.error_class,
+        }
+        entry.update(outcome.metrics or {})
+        if stage == "crawl" and outcome.ok:
+            entry["trace_bytes"] = trace_bytes(os.path.join(self.results_dir, folder))
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            self._aggregate(entry)
+            due = time.monotonic() - self._prom_written >= _PROM_INTERVAL
+        if due:
+            self.write_prometheus()
+
+    def _aggregate(self, entry):
+        stage = entry["stage"]
+        key = (stage, entry["error_class"])
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._retries[stage] = self._retries.get(stage, 0) + entry["retries"]
+        buckets = self._buckets.setdefault(stage, [0] * (len(DURATION_BUCKETS) + 1))
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if entry["duration"] <= bound:
+                buckets[i] += 1
+        buckets[-1] += 1
+        self._sums[stage] = self._sums.get(stage, 0.0) + entry["duration"]
+        self._trace_bytes += entry.get("trace_bytes", 0)
+        if entry.get("peak_rss_mb") is not None:
+            self._peak_rss_mb = max(self._peak_rss_mb or 0, entry["peak_rss_mb"])
+
+    def prometheus_text(self):
+        """The aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP study_stage_sites_total Sites that finished a stage, by error class.",
+                "# TYPE study_stage_sites_total counter",
+            ]
+            for (stage, error_class), count in sorted(self._counts.items()):
+                lines.append(f'study_stage_sites_total{{stage="{stage}",error_class="{error_class}"}} {count}')
+            lines += [
+                "# HELP study_stage_retries_total Retried attempts per stage.",
+                "# TYPE study_stage_retries_total counter",
+            ]
+            for stage, retries in sorted(self._retries.items()):
+                lines.append(f'study_stage_retries_total{{stage="{stage}"}} {retries}')
+            lines += [
+                "# HELP study_stage_duration_seconds Wall time of a site's stage, including retries.",
+                "# TYPE study_stage_duration_seconds histogram",
+            ]
+            for stage, buckets in sorted(self._buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS + ["+Inf"], buckets):
+                    lines.append(f'study_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'study_stage_duration_seconds_sum{{stage="{stage}"}} {self._sums[stage]:.3f}')
+                lines.append(f'study_stage_duration_seconds_count{{stage="{stage}"}} {buckets[-1]}')
+            lines += [
+                "# HELP study_trace_bytes_total Bytes of crawler traces written.",
+                "# TYPE study_trace_bytes_total counter",
+                f"study_trace_bytes_total {self._trace_bytes}",
+            ]
+            if self._peak_rss_mb is not None:
+                lines += [
+                    "# HELP study_chrome_peak_rss_megabytes Highest Chrome memory seen during a crawl.",
+                    "# TYPE study_chrome_peak_rss_megabytes gauge",
+                    f"study_chrome_peak_rss_megabytes {self._peak_rss_mb:.1f}",
+                ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """Rewrites `prom_path` atomically (e.g. for node_exporter's textfile collector)."""
+        if not self.prom_path:
+            return
+        text = self.prometheus_text()
+        with self._lock:
+            self._prom_written = time.monotonic()
+            with open(self.prom_path + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(self.prom_path + ".tmp", self.prom_path)
+
+    def serve(self, port):
+        """Serves the aggregates at http://<host>:<port>/metrics from a daemon thread."""
+        log = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = log.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.write_prometheus()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self._file.close()
+
+
+def read_metrics(path=METRICS_PATH, run=None):
+    """Records of one run (the latest in the log by default)."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        return []
+    run = run or records[-1]["run"]
+    return [r for r in records if r["run"] == run]
+
+
+def percentile(values, q):
+    """The q-th percentile (0-100) of sorted `values`, linearly interpolated."""
+    if not values:
+        return None
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(records, top=10):
+    """{stage: {"sites", "failed", "retries", field: (p50, p95, p99, max), "slowest"}}."""
+    summary = {}
+    for stage in STAGES:
+        rows = [r for r in records if r["stage"] == stage]
+        if not rows:
+            continue
+        stats = {
+            "sites": len(rows),
+            "failed": sum(1 for r in rows if not r["ok"]),
+            "retries": sum(r["retries"] for r in rows),
+        }
+        for field in SUMMARY_FIELDS:
+            values = sorted(r[field] for r in rows if r.get(field) is not None)
+            if values:
+                stats[field] = tuple(percentile(values, q) for q in (50, 95, 99)) + (values[-1],)
+        slowest = sorted(rows, key=lambda r: r["duration"], reverse=True)[:top]
+        stats["slowest"] = [(r["domain"], r["duration"], r["error_class"]) for r in slowest]
+        summary[stage] = stats
+    return summary
+
+
+def print_summary(records, top=10):
+    if not records:
+        print("No metrics recorded.")
+        return
+    print(f"Run {records[0]['run']}: {len({r['domain'] for r in records})} sites\n")
+    summary = summarize(records, top)
+    print(f"{'stage':<8} {'field':<12} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for stage, stats in summary.items():
+        for field in SUMMARY_FIELDS:
+            if field in stats:
+                digits = 3 if field == "duration" else 1
+                cells = " ".join(f"{v:>10.{digits}f}" for v in stats[field])
+                print(f"{stage:<8} {field:<12} {cells}")
+    print()
+    for stage, stats in summary.items():
+        print(f"{stage}: {stats['sites']} sites, {stats['failed']} failed, {stats['retries']} retries; slowest:")
+        for domain, duration, error_class in stats["slowest"]:
+            print(f"    {duration:8.1f}s  {domain:<40} {error_class}")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] != "summary":
+        print("Usage: python stage_metrics.py summary [metrics.jsonl] [run_id] [--top N]")
+        return
+    top = 10
+    if "--top" in args:
+        i = args.index("--top")
+        top = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    path = args[1] if len(args) > 1 else METRICS_PATH
+    run = args[2] if len(args) > 2 else None
+    print_summary(read_metrics(path, run), top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import pytest
+
+from domain_list import DomainList, parse_shard, site_folder, site_from_folder, site_key
+
+KEYS = ["bbc.co.uk", "a-b.com", "a_b.com", "x.com", "xn--bcher-kva.de", "10.0.0.1"]
+
+LIST = """\
+1,www.x.com
+2,https://x.com/login?next=/
+3,X.COM.
+4,news.x.com
+5,not a domain
+6,https://www.bbc.co.uk/news
+7,bücher.de
+8,a-b.com
+9,a_b.com
+10,co.uk
+11,y.org
+"""
+
+
+def _write_list(tmp_path, text=LIST):
+    path = tmp_path / "list.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_site_folder_round_trips():
+    folders = [site_folder(key) for key in KEYS]
+    assert len(set(folders)) == len(KEYS)
+    assert [site_from_folder(folder) for folder in folders] == KEYS
+
+
+def test_legacy_folders_are_guessed():
+    assert site_from_folder("www_bbc_com") == "bbc.com"
+    # A key-like name whose digest does not match is not mistaken for a key
+    assert site_from_folder("x.com_0123456789") == "x.com.0123456789"
+
+
+def test_site_key_normalizes():
+    assert site_key("https://user@WWW.BBC.co.uk:443/news") == "bbc.co.uk"
+    assert site_key("co.uk") is None
+    assert site_key("not a domain") is None
+
+
+@pytest.mark.parametrize("chunk_rows", [2, 100])
+def test_domain_list_dedups_by_site_key(tmp_path, chunk_rows):
+    domains = DomainList(_write_list(tmp_path), chunk_rows=chunk_rows)
+    sites = list(domains)
+    assert [key for key, _, _ in sites] == ["x.com", "bbc.co.uk", "xn--bcher-kva.de",
+                                            "a-b.com", "a_b.com", "y.org"]
+    assert sites[0] == ("x.com", "https://www.x.com", site_folder("x.com"))
+    assert sites[1][1] == "https://www.bbc.co.uk/news"
+    assert (domains.rows, domains.invalid, domains.duplicates, domains.sites) == (11, 2, 3, 6)
+
+
+def test_limit_counts_distinct_sites(tmp_path):
+    domains = DomainList(_write_list(tmp_path), limit=2, chunk_rows=2)
+    assert [key for key, _, _ in domains] == ["x.com", "bbc.co.uk"]
+
+
+@pytest.mark.parametrize("limit", [None, 4])
+def test_shards_partition_the_list(tmp_path, limit):
+    path = _write_list(tmp_path)
+    everything = list(DomainList(path, limit=limit, chunk_rows=3))
+    shards = [DomainList(path, limit=limit, chunk_rows=3, shard=(i, 3)) for i in range(3)]
+    parts = [list(shard) for shard in shards]
+    assert sorted(site for part in parts for site in part) == sorted(everything)
+    for shard, part in zip(shards, parts):
+        assert shard.other_shards == len(everything) - len(part)
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for text in ("4/4", "-1/4", "a/4", "1"):
+        with pytest.raises(ValueError):
+            parse_shard(text)
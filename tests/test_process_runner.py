@@ -0,0 +1,50 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from process_runner import CRASH, DETECTOR_JSON, DNS, UNKNOWN, classify_failure
+
+STORAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "Source", "Detector", "helpers", "storage.js")
+
+REQUESTS = json.dumps([{"url": "https://x.com/pixel?id=%d" % i, "method": "GET"} for i in range(50)])
+
+
+def _stream(path):
+    """Runs the detector's StreamData over one trace, as the detector reads it; returns (rc, output)."""
+    script = f"require({json.dumps(STORAGE)}).StreamData({json.dumps(path)}, () => {{}})"
+    proc = subprocess.run(["node", "-e", script], capture_output=True, text=True, timeout=60)
+    return proc.returncode, proc.stdout + proc.stderr
+
+
+def test_classify_failure():
+    assert classify_failure(1, "Error: net::ERR_NAME_NOT_RESOLVED at https://x.com") == DNS
+    assert classify_failure(1, 'SyntaxError: Unexpected token } in JSON at position 12') == DETECTOR_JSON
+    assert classify_failure(1, "something else") == UNKNOWN
+    assert classify_failure(-9, "") == CRASH
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs Node")
+@pytest.mark.parametrize("text", [
+    REQUESTS[:-20],
+    REQUESTS[:-1],
+    REQUESTS + "]",
+    "{" + REQUESTS[1:],
+    REQUESTS.replace("}", "}}", 1),
+], ids=["truncated", "unclosed", "trailing-data", "not-an-array", "bad-element"])
+def test_broken_trace_is_detector_json(tmp_path, text):
+    path = tmp_path / "requests.json"
+    path.write_text(text)
+    returncode, output = _stream(str(path))
+    assert returncode != 0
+    assert classify_failure(returncode, output) == DETECTOR_JSON, output
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs Node")
+def test_valid_trace_streams(tmp_path):
+    path = tmp_path / "requests.json"
+    path.write_text(REQUESTS)
+    assert _stream(str(path))[0] == 0
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from benchmarks.synthetic import write_results_tree
+from result_index import ResultIndex
+from trace_store import TracePack, pack_sites
+
+
+def _index(tmp_path):
+    return ResultIndex(str(tmp_path / "index.sqlite"))
+
+
+def test_refresh_parses_only_new_and_changed(tmp_path):
+    results = str(tmp_path / "Results")
+    site_dirs = write_results_tree(results, 6, id_leaking=1, cookie_sync=0, third_parties=2)
+    index = _index(tmp_path)
+    assert index.refresh(results) == 6
+    assert index.refresh(results) == 0
+
+    path = os.path.join(results, site_dirs[0], "result.json")
+    with open(path, "a") as f:
+        f.write("\n")
+    os.utime(path, ns=(1, 1))
+    assert index.refresh(results) == 1
+    assert index.refresh(results) == 0
+    assert len(index.to_dataframe()) == 6
+    index.close()
+
+
+def test_removed_folders_are_dropped(tmp_path):
+    results = str(tmp_path / "Results")
+    site_dirs = write_results_tree(results, 4, third_parties=2)
+    index = _index(tmp_path)
+    index.refresh(results)
+    os.remove(os.path.join(results, site_dirs[0], "result.json"))
+    os.rmdir(os.path.join(results, site_dirs[0]))
+    assert index.refresh(results) == 0
+    assert index.get(site_dirs[0]) is None
+    assert len(index.to_dataframe()) == 3
+    index.close()
+
+
+def test_packed_sites_survive_removed_folders(tmp_path):
+    results, pack_path = str(tmp_path / "Results"), str(tmp_path / "run.pack")
+    site_dirs = write_results_tree(results, 20, id_leaking=1, cookie_sync=1, third_parties=2)
+    index = _index(tmp_path)
+    index.refresh(results)
+    expected = index.to_dataframe()
+    assert pack_sites(pack_path, results, site_dirs[:10], remove=True) == 10
+
+    reparsed = []
+    for _ in range(3):
+        with TracePack(pack_path) as pack:
+            reparsed.append(index.refresh(results) + index.refresh_pack(pack))
+    # Indexed once from the pack, then left alone
+    assert reparsed == [10, 0, 0]
+    assert index.to_dataframe().equals(expected)
+    row = index.update(results, site_dirs[0])
+    assert row is not None and row == index.get(site_dirs[0])
+    index.close()
+
+    index = _index(tmp_path)
+    assert index.refresh(results) == 0
+    assert len(index.to_dataframe()) == 20
+    os.remove(pack_path)
+    index.refresh(results)
+    assert len(index.to_dataframe()) == 10
+    index.close()
+
+
+def test_facts_are_kept_only_when_asked_for(tmp_path):
+    results, path = str(tmp_path / "Results"), str(tmp_path / "index.sqlite")
+    site_dirs = write_results_tree(results, 5, id_leaking=2, cookie_sync=1, third_parties=3)
+    index = ResultIndex(path)
+    assert index.refresh(results) == 5
+    with pytest.raises(ValueError):
+        index.violations_dataframe()
+    index.close()
+
+    # Counted-only sites are parsed again for their facts
+    index = ResultIndex(path, facts=True)
+    assert index.refresh(results) == 5
+    assert len(index.violations_dataframe()) == 5 * (2 + 1 + 3)
+    index.close()
+
+    # A result changed while facts were not kept loses its stale facts
+    write_results_tree(results, 1, seed=1, id_leaking=4, cookie_sync=0, third_parties=0)
+    os.utime(os.path.join(results, site_dirs[0], "result.json"), ns=(1, 1))
+    index = ResultIndex(path)
+    assert index.refresh(results) == 1
+    index.close()
+    index = ResultIndex(path, facts=True)
+    assert index.refresh(results) == 1
+    facts = index.violations_dataframe()
+    assert (facts["Website"] == index.get(site_dirs[0])["Website"]).sum() == 4
+    assert len(facts) == 4 + 4 * (2 + 1 + 3)
+    index.close()
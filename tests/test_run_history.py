@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+import run_history
+from results_store import read_history, write_run, write_violations
+from shards import _fact_categories
+
+DAY = run_history.DAY
+T0 = 1_700_000_000.0
+
+RUN_A = "20250101-000000"
+RUN_B = "20250102-000000"
+
+# website: (id_leaking, cookie_sync, facts as (type, domain, cookie))
+SITES_A = {
+    "a.com": (0, 0, [("third_party", "x.com", None), ("third_party", "y.com", None)]),
+    "b.com": (1, 0, [("id_leaking", "x.com", "uid")]),
+    "c.com": (0, 0, [("third_party", "z.com", None), ("third_party", "x.com", None)]),
+    "d.com": (0, 0, []),
+    "f.com": (0, 0, []),
+    "g.com": (1, 0, [("id_leaking", "x.com", "uid")]),
+    "h.com": (1, 0, [("id_leaking", "x.com", "uid")]),
+}
+SITES_B = {
+    "a.com": (0, 0, [("third_party", "x.com", None), ("third_party", "y.com", None),
+                     ("third_party", "w.com", None)]),
+    "b.com": (0, 0, []),
+    # Same facts in another order
+    "c.com": (0, 0, [("third_party", "x.com", None), ("third_party", "z.com", None)][::-1]),
+    "e.com": (0, 1, [("cookie_sync", "q.com", "sid")]),
+    "f.com": (0, 1, [("cookie_sync", "q.com", "sid")]),
+    "g.com": (2, 0, [("id_leaking", "x.com", "uid"), ("id_leaking", "y.com", "uid")]),
+    "h.com": (1, 0, [("id_leaking", "x.com", "sid")]),
+}
+
+EXPECTED = {
+    "a.com": "trackers_changed",
+    "b.com": "became_compliant",
+    "d.com": "dropped_site",
+    "e.com": "new_site",
+    "f.com": "became_non_compliant",
+    "g.com": "violations_changed",
+    "h.com": "result_changed",
+}
+
+
+def _record(store, run, sites, observed):
+    rows = pd.DataFrame([(site, leaks, syncs, 0, leaks + syncs, leaks + syncs == 0)
+                         for site, (leaks, syncs, _) in sites.items()],
+                        columns=["Website", "ID_Leaking_Count", "Cookie_Sync_Count",
+                                 "Fingerprinting_Count", "Total_Violations", "Is_Compliant"])
+    entries = {}
+    facts = []
+    for site, (_, _, site_facts) in sites.items():
+        for fact_type, domain, cookie in site_facts:
+            entry = entries.setdefault((site, fact_type), 0)
+            entries[(site, fact_type)] += 1
+            facts.append((site, fact_type, entry, domain, cookie, None))
+    facts = _fact_categories(pd.DataFrame(
+        facts, columns=["Website", "Type", "Entry", "Domain", "Cookie", "Function"]))
+    write_run(rows, run, store)
+    write_violations(facts, run, store)
+    observed = pd.Series(observed, index=list(sites), dtype="float64")
+    return run_history.record_run(run, rows, facts, observed, store)
+
+
+def _two_runs(tmp_path):
+    store = str(tmp_path / "store")
+    _record(store, RUN_A, SITES_A, T0)
+    _record(store, RUN_B, SITES_B, T0 + DAY)
+    return store
+
+
+def test_stored_digest_matches_recorded(tmp_path):
+    store = str(tmp_path / "store")
+    digest = _record(store, RUN_A, SITES_A, T0)
+    observed = pd.Series(T0, index=list(SITES_A), dtype="float64")
+    assert digest.equals(run_history.digest_run(RUN_A, store, observed))
+
+
+def test_diff_labels_every_transition(tmp_path):
+    store = _two_runs(tmp_path)
+    diff = run_history.diff_runs(RUN_A, RUN_B, store)
+    assert dict(zip(diff["Website"], diff["Transition"].astype(str))) == EXPECTED
+    trackers = diff.set_index("Website")
+    assert trackers.loc["a.com", "New_Trackers"] == ["w.com"]
+    assert trackers.loc["a.com", "Dropped_Trackers"] == []
+    assert trackers.loc["b.com", "Is_Compliant_Old"] == False  # noqa: E712
+    assert trackers.loc["b.com", "Is_Compliant_New"] == True  # noqa: E712
+    assert run_history.diff_runs(RUN_B, RUN_B, store).empty
+
+
+def test_history_update_is_applied_once(tmp_path):
+    store = _two_runs(tmp_path)
+    history, applied = read_history(store)
+    assert applied == RUN_B
+    assert run_history.update_history(RUN_B, store).equals(history)
+    assert run_history.update_history(RUN_A, store).equals(history)
+    assert read_history(store)[0].equals(history)
+    assert run_history.pending_runs(store) == []
+
+    sites = history.set_index("Website")
+    assert sites.loc["c.com", "Observations"] == 2
+    assert sites.loc["c.com", "Changes"] == 0
+    assert sites.loc["b.com", "Compliance_Changes"] == 1
+    assert sites.loc["g.com", ["Changes", "Compliance_Changes"]].tolist() == [1, 0]
+    assert sites.loc["d.com", "Last_Observed"] == T0
+    assert sites.loc["e.com", "First_Observed"] == T0 + DAY
+
+
+def test_carried_over_sites_are_not_observed_again(tmp_path):
+    store = _two_runs(tmp_path)
+    before = read_history(store)[0].set_index("Website")
+    # a.com's result is carried over from run B, the rest crawled again
+    observed = {site: T0 + 2 * DAY for site in SITES_B}
+    observed["a.com"] = T0 + DAY
+    _record(store, "20250103-000000", SITES_B, list(observed.values()))
+    after = read_history(store)[0].set_index("Website")
+    assert after.loc["a.com", "Observations"] == before.loc["a.com", "Observations"]
+    assert after.loc["c.com", "Observations"] == before.loc["c.com", "Observations"] + 1
+
+
+def test_plan_prefers_volatile_then_stale_sites():
+    history = pd.DataFrame({
+        "Website": ["stable.com", "volatile.com", "stale.com", "fresh.com"],
+        "First_Observed": [T0, T0, T0, T0],
+        "Last_Observed": [T0 + 30 * DAY, T0 + 30 * DAY, T0, T0 + 39 * DAY],
+        "Changes": np.array([0, 10, 0, 10], dtype=np.int32),
+    })
+    plan = run_history.plan_recrawls(history, 4, now=T0 + 40 * DAY)
+    assert plan["Website"].tolist() == ["volatile.com", "stale.com", "stable.com", "fresh.com"]
+    assert plan["Priority"].is_monotonic_decreasing
+    assert run_history.plan_recrawls(history, 2, now=T0 + 40 * DAY).equals(plan.head(2))
+
+
+def test_plan_breaks_ties_by_staleness_then_website():
+    history = pd.DataFrame({
+        "Website": ["b.com", "a.com", "c.com"],
+        "First_Observed": [T0, T0, T0 - DAY],
+        "Last_Observed": [T0, T0, T0 - DAY],
+        "Changes": np.array([1000, 1000, 1000], dtype=np.int32),
+    })
+    # Overdue long enough that every priority rounds to 1
+    plan = run_history.plan_recrawls(history, 3, now=T0 + 1000 * DAY)
+    assert (plan["Priority"] == 1).all()
+    assert plan["Website"].tolist() == ["c.com", "a.com", "b.com"]
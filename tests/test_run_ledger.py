@@ -0,0 +1,106 @@
+from domain_list import legacy_folder, site_folder, site_from_folder
+from run_ledger import RunLedger
+
+SITES = [("a.com", "https://a.com", "a_folder"),
+         ("b.com", "https://b.com", "b_folder"),
+         ("c.com", "https://c.com", "c_folder")]
+
+
+def _ledger(tmp_path):
+    return RunLedger(str(tmp_path / "ledger.sqlite"), str(tmp_path / "Results"))
+
+
+def _finish_all(ledger, domain, folder):
+    for stage in ("crawl", "detect", "parse"):
+        ledger.start(domain, stage)
+        ledger.finish(domain, folder, stage, ok=True)
+
+
+def test_crash_mid_stage_resumes_at_that_stage(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.add_sites(SITES)
+    ledger.start("a.com", "crawl")
+    ledger.finish("a.com", "a_folder", "crawl", ok=True)
+    ledger.start("a.com", "detect")
+    ledger.start("b.com", "crawl")
+    ledger.close()
+
+    # Restart after the process died with two sites running
+    ledger = _ledger(tmp_path)
+    assert ledger.pending("detect") == []
+    assert ledger.recover() == 2
+    assert ledger.recover() == 0
+    assert ledger.pending("detect") == [SITES[0]]
+    assert sorted(ledger.pending("crawl")) == SITES[1:]
+    ledger.close()
+
+
+def test_add_sites_keeps_progress(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.add_sites(SITES[:1])
+    _finish_all(ledger, "a.com", "a_folder")
+    ledger.add_sites(SITES, finished=[("d.com", "https://d.com", "d_folder")])
+    assert ledger.done() == [SITES[0]]
+    assert ledger.pending("parse") == [("d.com", "https://d.com", "d_folder")]
+    assert ledger.known_domains(["a.com", "x.com"]) == {"a.com"}
+    ledger.close()
+
+
+def test_requeue_by_error_class_and_stage(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.add_sites(SITES)
+    ledger.start("a.com", "crawl")
+    ledger.finish("a.com", "a_folder", "crawl", ok=False, error_class="timeout")
+    ledger.start("b.com", "crawl")
+    ledger.finish("b.com", "b_folder", "crawl", ok=False, error_class="dns")
+    ledger.start("c.com", "crawl")
+    ledger.finish("c.com", "c_folder", "crawl", ok=True)
+    ledger.start("c.com", "detect")
+    ledger.finish("c.com", "c_folder", "detect", ok=False, error_class="timeout")
+    assert ledger.pending("crawl") == []
+
+    assert ledger.requeue("timeout", stage="crawl") == 1
+    assert ledger.pending("crawl") == [SITES[0]]
+    assert ledger.requeue() == 2
+    assert ledger.pending("crawl") == SITES[:2]
+    assert ledger.pending("detect") == [SITES[2]]
+    assert ledger.requeue() == 0
+    ledger.close()
+
+
+def test_recrawl_moves_only_finished_sites(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.add_sites(SITES)
+    _finish_all(ledger, "a.com", "a_folder")
+    ledger.start("b.com", "crawl")
+    ledger.finish("b.com", "b_folder", "crawl", ok=False, error_class="timeout")
+    ledger.start("c.com", "crawl")
+
+    assert ledger.recrawl(["a.com", "b.com", "c.com", "x.com"]) == 1
+    assert ledger.done() == []
+    assert ledger.pending("crawl") == [SITES[0]]
+    summary = ledger.summary()
+    assert summary[("crawl", "failed", "timeout")] == 1
+    assert summary[("crawl", "running", None)] == 1
+    ledger.close()
+
+
+def test_planned_websites_map_to_ledger_domains(tmp_path):
+    ledger = _ledger(tmp_path)
+    legacy = ("a-b.com", "https://www.a-b.com", legacy_folder("https://www.a-b.com"))
+    keyed = ("x.com", "https://x.com", site_folder("x.com"))
+    running = ("y.com", "https://y.com", site_folder("y.com"))
+    ledger.add_sites([running], finished=[legacy, keyed])
+    for domain, _, folder in (legacy, keyed):
+        ledger.start(domain, "parse")
+        ledger.finish(domain, folder, "parse", ok=True)
+    ledger.start("y.com", "crawl")
+
+    # The stored Website of the legacy folder is not its domain
+    websites = [site_from_folder(folder) for _, _, folder in (legacy, keyed, running)] + ["z.com"]
+    assert websites[0] == "a.b.com"
+    domains, missing = ledger.finished_domains(websites)
+    assert domains == ["a-b.com", "x.com"]
+    assert missing == ["y.com", "z.com"]
+    assert ledger.recrawl(domains) == 2
+    ledger.close()
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from benchmarks import shard_check
+from results_store import read_results, read_violations, write_run, write_violations
+from shards import _fact_categories, merge_shards, shard_paths
+
+
+def _write_shard(root, shard, run, leaks):
+    """Stores run `run` of a shard with `leaks` ID leaks per website, one fact each."""
+    store = shard_paths(shard, root)["store"]
+    write_run(pd.DataFrame({
+        "Website": list(leaks),
+        "ID_Leaking_Count": list(leaks.values()),
+        "Cookie_Sync_Count": 0,
+        "Fingerprinting_Count": 0,
+        "Total_Violations": list(leaks.values()),
+        "Is_Compliant": [n == 0 for n in leaks.values()],
+    }), run, store)
+    facts = [(site, "id_leaking", i, f"tracker-{run}-{shard[0]}.com", "_uid", None)
+             for site, n in leaks.items() for i in range(n)]
+    write_violations(_fact_categories(pd.DataFrame(
+        facts, columns=["Website", "Type", "Entry", "Domain", "Cookie", "Function"])), run, store)
+
+
+def test_merge_keeps_newest_run_then_lowest_shard(tmp_path):
+    root, store = str(tmp_path / "shards"), str(tmp_path / "merged")
+    _write_shard(root, (0, 3), "20250101-000000", {"c.com": 1, "a.com": 0})
+    _write_shard(root, (1, 3), "20250102-000000", {"b.com": 2, "c.com": 3})
+    _write_shard(root, (2, 3), "20250102-000000", {"b.com": 4, "d.com": 1})
+
+    run_id, info = merge_shards(3, root, store, run_id="merged")
+    assert run_id == "merged"
+    assert info["duplicates"] == 2
+    assert [s["sites"] for s in info["shards"]] == [2, 2, 2]
+    merged = read_results(run=run_id, store=store)
+    assert merged["Website"].tolist() == ["a.com", "b.com", "c.com", "d.com"]
+    assert merged["ID_Leaking_Count"].tolist() == [0, 2, 3, 1]
+
+    # Facts come from the run and shard whose row won
+    facts = read_violations(run=run_id, store=store).astype({"Website": str, "Domain": str})
+    owners = facts.groupby("Website")["Domain"].unique().map(list).to_dict()
+    assert owners == {"b.com": ["tracker-20250102-000000-1.com"],
+                      "c.com": ["tracker-20250102-000000-1.com"],
+                      "d.com": ["tracker-20250102-000000-2.com"]}
+    assert info["metrics"].metrics()["Total Sites"] == 4
+
+
+def test_merge_needs_every_shard(tmp_path):
+    root = str(tmp_path / "shards")
+    _write_shard(root, (0, 2), "20250101-000000", {"a.com": 1})
+    with pytest.raises(FileNotFoundError):
+        merge_shards(2, root, str(tmp_path / "merged"))
+
+
+def test_sharded_run_matches_unsharded(tmp_path, capsys):
+    # benchmarks/shard_check.py end to end, on a small list
+    assert shard_check.check(3, 200, str(tmp_path)) == 0
+    assert "OK: the merged shards match the unsharded run" in capsys.readouterr().out
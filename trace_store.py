@@ -0,0 +1,231 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Formats a trace or result may be stored in, in lookup order. NDJSON files
+# hold an array, one element per line; the crawler picks one through the
+# "format" key of Source/Crawler/configs/traces.json.
+FORMATS = ["json", "json.gz", "json.zst", "ndjson", "ndjson.gz", "ndjson.zst"]
+
+TRACE_FILES = ["requests.json", "cookies.json", "thirdPartyCookies.json",
+               "website.json", "functions.json", "cmp.json", "result.json"]
+
+PACK_DIR = "Source/Results/packs"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    site_dir TEXT NOT NULL,
+    name     TEXT NOT NULL,     -- logical name, e.g. 'requests.json'
+    format   TEXT NOT NULL,     -- 'json' or 'ndjson'
+    codec    TEXT NOT NULL,     -- 'gzip' or 'zstd'
+    offset   INTEGER NOT NULL,
+    length   INTEGER NOT NULL,
+    size     INTEGER NOT NULL,  -- uncompressed size
+    mtime_ns INTEGER NOT NULL,  -- of the packed file
+    sha256   TEXT NOT NULL,     -- of the uncompressed content
+    PRIMARY KEY (site_dir, name)
+);
+"""
+
+
+def _loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def compress(raw, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(raw)
+    return gzip.compress(raw, compresslevel=6, mtime=0)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd traces needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+def split_name(filename):
+    """('requests', 'ndjson', 'gzip') for 'requests.ndjson.gz'; codec is None if plain."""
+    codec = None
+    if filename.endswith(".gz"):
+        filename, codec = filename[:-len(".gz")], "gzip"
+    elif filename.endswith(".zst"):
+        filename, codec = filename[:-len(".zst")], "zstd"
+    stem, _, fmt = filename.rpartition(".")
+    return stem, fmt, codec
+
+
+def find_file(site_path, name):
+    """Path of `name` ('result.json') in `site_path`, in whichever format exists; None if missing."""
+    stem = name[:-len(".json")]
+    for fmt in FORMATS:
+        path = os.path.join(site_path, f"{stem}.{fmt}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_file(path):
+    """Uncompressed content of a stored trace or result."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return decompress(data, split_name(os.path.basename(path))[2])
+
+
+def decode(raw, fmt):
+    if fmt == "ndjson":
+        return [_loads(line) for line in raw.splitlines() if line.strip()]
+    return _loads(raw)
+
+
+def load_trace(site_path, name):
+    """Loads trace `name` ('requests.json') of a site folder, whatever its format."""
+    path = find_file(site_path, name)
+    if path is None:
+        raise FileNotFoundError(os.path.join(site_path, name))
+    return decode(read_file(path), split_name(os.path.basename(path))[1])
+
+
+class TracePack:
+    """Append-only archive of site traces and results with an offset index.
+
+    Every file is compressed on its own and appended to `<path>`; the
+    SQLite index `<path>.idx` maps (site folder, file name) to its offset,
+    so a single file is read with one seek. Packing a file again appends a
+    new copy and repoints the index.
+    """
+
+    def __init__(self, path, codec=None):
+        self.path = path
+        self.codec = codec or ("zstd" if zstandard else "gzip")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path + ".idx", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+
+    def close(self):
+        self._file.close()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, site_dir, name, raw, fmt="json", mtime_ns=0):
+        """Appends the uncompressed content of one file."""
+        data = compress(raw, self.codec)
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (site_dir, name, fmt, self.codec, offset, len(data), len(raw),
+                     mtime_ns, hashlib.sha256(raw).hexdigest()))
+
+    def add_site(self, results_dir, site_dir, names=TRACE_FILES):
+        """Appends the files of one site folder; returns how many were packed."""
+        packed = 0
+        for name in names:
+            path = find_file(os.path.join(results_dir, site_dir), name)
+            if path is None:
+                continue
+            fmt = split_name(os.path.basename(path))[1]
+            self.add(site_dir, name, read_file(path), fmt, os.stat(path).st_mtime_ns)
+            packed += 1
+        return packed
+
+    def sites(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT site_dir FROM entries ORDER BY site_dir")]
+
+    def entry(self, site_dir, name):
+        """(format, codec, offset, length, size, mtime_ns, sha256), or None if not packed."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT format, codec, offset, length, size, mtime_ns, sha256 FROM entries "
+                "WHERE site_dir = ? AND name = ?", (site_dir, name)).fetchone()
+
+    def read(self, site_dir, name):
+        """Uncompressed content of one packed file; raises KeyError if not packed."""
+        entry = self.entry(site_dir, name)
+        if entry is None:
+            raise KeyError((site_dir, name))
+        _, codec, offset, length = entry[:4]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return decompress(f.read(length), codec)
+
+    def load(self, site_dir, name):
+        """Loads one packed trace, like load_trace()."""
+        entry = self.entry(site_dir, name)
+        if entry is None:
+            raise KeyError((site_dir, name))
+        return decode(self.read(site_dir, name), entry[0])
+
+
+def pack_sites(pack_path, results_dir, site_dirs, remove=False):
+    """Packs site folders into `pack_path`; with `remove`, deletes them once packed.
+
+    Returns the number of folders packed.
+    """
+    packed = 0
+    with TracePack(pack_path) as pack:
+        for site_dir in site_dirs:
+            if not pack.add_site(results_dir, site_dir):
+                continue
+            packed += 1
+            if remove:
+                shutil.rmtree(os.path.join(results_dir, site_dir))
+    return packed
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "pack":
+        results_dir, pack_path = args[1], args[2]
+        with os.scandir(results_dir) as entries:
+            site_dirs = sorted(e.name for e in entries if e.is_dir())
+        packed = pack_sites(pack_path, results_dir, site_dirs, remove="--remove" in args)
+        print(f"Packed {packed} site folders into {pack_path}")
+    elif len(args) >= 4 and args[0] == "cat":
+        with TracePack(args[1]) as pack:
+            sys.stdout.buffer.write(pack.read(args[2], args[3]))
+    elif len(args) >= 2 and args[0] == "sites":
+        with TracePack(args[1]) as pack:
+            for site_dir in pack.sites():
+                print(site_dir)
+    else:
+        print("Usage: python trace_store.py pack <results_dir> <file.pack> [--remove]")
+        print("       python trace_store.py sites <file.pack>")
+        print("       python trace_store.py cat <file.pack> <site_dir> <file name>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from report_engine import RESULT_COLUMNS, Report
+from results_store import STORE_PATH, read_results, read_violations
+
+SLICES = ["Region", "Industry"]
+
+
+def _indicator(labels):
+    """(groups x sites) 0/1 matrix of a label per site, and the group names."""
+    codes, groups = pd.factorize(np.asarray(labels), sort=True)
+    n = len(codes)
+    matrix = sp.csr_matrix((np.ones(n, dtype=np.int32), (codes, np.arange(n))),
+                           shape=(len(groups), n))
+    return matrix, list(groups)
+
+
+def _top(values, n):
+    """Indices of the `n` largest values, largest first."""
+    if n >= len(values):
+        return np.argsort(-values, kind="stable")
+    top = np.argpartition(-values, n)[:n]
+    return top[np.argsort(-values[top], kind="stable")]
+
+
+class TrackerMatrix:
+    """Site x third-party incidence matrix of one run, with its site labels.
+
+    Row i is the i-th site of `report.sites`, column j the j-th domain of
+    `domains`; an entry is 1 if the site loaded the domain (its
+    thirdParties list). Every statistic is a sparse product with a
+    per-slice indicator matrix, so none loops over sites or domains.
+    """
+
+    def __init__(self, matrix, domains, report):
+        self.matrix = matrix
+        self.domains = pd.Index(domains)
+        self.report = report
+
+    @classmethod
+    def from_facts(cls, report, violations):
+        """Builds the matrix from the third_party rows of a fact table (see read_violations)."""
+        facts = violations[violations["Type"] == "third_party"]
+        facts = facts[facts["Domain"].notna()]
+        websites = facts["Website"].astype("category")
+        domains = facts["Domain"].astype("category").cat.remove_unused_categories()
+        # Fact table websites -> rows of the aggregate table (the first row
+        # of a website listed twice)
+        site_index = pd.Index(report.sites["Website"])
+        first = np.flatnonzero(~site_index.duplicated())
+        row_of = site_index[first].get_indexer(websites.cat.categories)
+        row_of = np.where(row_of >= 0, first[row_of], -1)
+        rows = row_of[websites.cat.codes.to_numpy()]
+        known = rows >= 0
+        cols = domains.cat.codes.to_numpy()[known]
+        matrix = sp.csr_matrix((np.ones(known.sum(), dtype=np.int32), (rows[known], cols)),
+                               shape=(len(report.sites), len(domains.cat.categories)))
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return cls(matrix, domains.cat.categories, report)
+
+    @classmethod
+    def load(cls, run=None, store=STORE_PATH):
+        report = Report(read_results(columns=RESULT_COLUMNS, run=run, store=store))
+        violations = read_violations(columns=["Website", "Type", "Domain"], run=run, store=store,
+                                     filters=[("Type", "==", "third_party")])
+        return cls.from_facts(report, violations)
+
+    def _groups(self, by):
+        if by is None:
+            return _indicator(np.full(self.matrix.shape[0], "All"))
+        if by not in SLICES:
+            raise ValueError(f"Unknown slice '{by}', expected one of {SLICES}")
+        return _indicator(self.report.sites[by])
+
+    def _violating(self, violation):
+        """0/1 per site: any violation, or one violation column ('ID_Leaking', ...)."""
+        sites = self.report.sites
+        if violation is None:
+            return (sites["Total_Violations"] > 0).to_numpy(dtype=np.int32)
+        return (sites[violation] > 0).to_numpy(dtype=np.int32)
+
+    def prevalence(self, n=20, by=None):
+        """The `n` domains loaded by the most sites, per slice.
+
+        Columns: slice, Domain, Sites, Share (of the slice's sites).
+        """
+        groups, names = self._groups(by)
+        counts = (groups @ self.matrix).toarray()
+        sizes = np.asarray(groups.sum(axis=1)).ravel()
+        rows = []
+        for g, name in enumerate(names):
+            for j in _top(counts[g], n):
+                if counts[g, j]:
+                    rows.append((name, self.domains[j], int(counts[g, j]), counts[g, j] / sizes[g]))
+        return pd.DataFrame(rows, columns=[by or "Slice", "Domain", "Sites", "Share"])
+
+    def cooccurrence(self, n=50, by=None, group=None):
+        """Sites loading both domains of each pair, among the `n` most prevalent.
+
+        With `by` and `group` (e.g. by='Region', group='EU'), only that
+        slice's sites count. Returns an n x n frame; the diagonal holds
+        each domain's own site count.
+        """
+        matrix = self.matrix
+        if by is not None:
+            matrix = matrix[(self.report.sites[by] == group).to_numpy()]
+        counts = np.asarray(matrix.sum(axis=0)).ravel()
+        top = _top(counts, n)
+        top = top[counts[top] > 0]
+        sub = matrix[:, top]
+        pairs = (sub.T @ sub).toarray()
+        names = self.domains[top]
+        return pd.DataFrame(pairs, index=names, columns=names)
+
+    def lift(self, n=20, by=None, violation=None, min_sites=10):
+        """Domains whose presence most raises the violation rate, per slice.
+
+        lift = P(violation | domain loaded) / P(violation), within the
+        slice; `violation` is None for any violation or one of 'ID_Leaking',
+        'Cookie_Sync', 'Fingerprinting'. Domains on fewer than `min_sites`
+        sites of a slice are left out. Columns: slice, Domain, Sites,
+        Violating, Confidence, Lift.
+        """
+        groups, names = self._groups(by)
+        violating = self._violating(violation)
+        sites = (groups @ self.matrix).toarray()
+        hits = (groups.multiply(violating) @ self.matrix).toarray()
+        sizes = np.asarray(groups.sum(axis=1)).ravel()
+        base = (groups @ violating) / sizes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = hits / sites
+            lift = confidence / base[:, None]
+        lift = np.where((sites >= min_sites) & np.isfinite(lift), lift, np.nan)
+        rows = []
+        for g, name in enumerate(names):
+            ranked = _top(np.nan_to_num(lift[g], nan=-1.0), n)
+            for j in ranked[~np.isnan(lift[g, ranked])]:
+                rows.append((name, self.domains[j], int(sites[g, j]), int(hits[g, j]),
+                             confidence[g, j], lift[g, j]))
+        return pd.DataFrame(rows, columns=[by or "Slice", "Domain", "Sites", "Violating",
+                                           "Confidence", "Lift"])
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] in ("-h", "--help"):
+        print("Usage: python tracker_matrix.py [run_id] [--by Region|Industry] [--top N]")
+        return
+    by, top = None, 10
+    if "--by" in args:
+        i = args.index("--by")
+        by = args[i + 1]
+        args = args[:i] + args[i + 2:]
+    if "--top" in args:
+        i = args.index("--top")
+        top = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    matrix = TrackerMatrix.load(args[0] if args else None)
+    print(f"{matrix.matrix.shape[0]} sites x {matrix.matrix.shape[1]} third-party domains, "
+          f"{matrix.matrix.nnz} entries\n")
+    with pd.option_context("display.width", 160, "display.max_rows", None):
+        print("--- Prevalence ---")
+        print(matrix.prevalence(top, by).to_string(index=False))
+        print("\n--- Lift (any violation) ---")
+        print(matrix.lift(top, by).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import sys
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from results_store import STORE_PATH, list_runs
+
+TYPE_COLUMNS = {
+    'ID Leaking': 'ID_Leaking_Count',
+    'Cookie Sync': 'Cookie_Sync_Count',
+    'Fingerprinting': 'Fingerprinting_Count',
+}
+
+COLUMNS = ['Website', 'Total_Violations', 'Is_Compliant'] + list(TYPE_COLUMNS.values())
+
+# Rows read from the results store at a time by from_store()
+BATCH_ROWS = 256 * 1024
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else float('nan')
+
+
+class ViolationMetrics:
+    """Mergeable state of analyze_full_study.calculate_metrics.
+
+    Holds counts and sums plus a histogram of the violations per site,
+    which is an exact sketch of their distribution (counts are small
+    integers), so medians and quantiles come out exactly. Sites are added
+    one at a time (add) or a frame at a time (add_frame), and the states
+    of shards or worker processes are combined with merge() or `+`; the
+    result does not depend on how the sites were split.
+    """
+
+    def __init__(self):
+        self.sites = 0
+        self.compliant = 0
+        self.totals = {name: 0 for name in TYPE_COLUMNS}
+        self.violations = 0
+        self.non_compliant_violations = 0
+        self.histogram = {}         # violations per site -> sites
+        self.max = None
+        self.most_violated = None   # first site seen with `max` violations
+
+    def add(self, row):
+        """Adds one aggregate row (a dict like result_index.make_row's)."""
+        violations = int(row['Total_Violations'])
+        self.sites += 1
+        if row['Is_Compliant']:
+            self.compliant += 1
+        else:
+            self.non_compliant_violations += violations
+        for name, column in TYPE_COLUMNS.items():
+            self.totals[name] += int(row[column])
+        self.violations += violations
+        self.histogram[violations] = self.histogram.get(violations, 0) + 1
+        if self.max is None or violations > self.max:
+            self.max, self.most_violated = violations, row['Website']
+        return self
+
+    def add_frame(self, df):
+        """Adds every row of an aggregate table (or a chunk of one)."""
+        if df.empty:
+            return self
+        total = df['Total_Violations'].to_numpy(dtype=np.int64)
+        compliant = df['Is_Compliant'].to_numpy(dtype=bool)
+        self.sites += len(df)
+        self.compliant += int(compliant.sum())
+        self.non_compliant_violations += int(total[~compliant].sum())
+        for name, column in TYPE_COLUMNS.items():
+            self.totals[name] += int(df[column].sum())
+        self.violations += int(total.sum())
+        values, counts = np.unique(total, return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.histogram[value] = self.histogram.get(value, 0) + count
+        top = int(total.argmax())
+        if self.max is None or total[top] > self.max:
+            self.max, self.most_violated = int(total[top]), df['Website'].iloc[top]
+        return self
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().add_frame(df)
+
+    @classmethod
+    def from_store(cls, run=None, store=STORE_PATH, batch_rows=BATCH_ROWS):
+        """The metrics of a stored run, read a batch of rows at a time."""
+        run = run or list_runs(store)[-1]
+        metrics = cls()
+        parquet = pq.ParquetFile(f"{store}/run={run}/part-0.parquet")
+        for batch in parquet.iter_batches(batch_rows, columns=COLUMNS):
+            metrics.add_frame(batch.to_pandas())
+        return metrics
+
+    def merge(self, other):
+        """Adds the sites of another state; `self` keeps its most violated site on ties."""
+        self.sites += other.sites
+        self.compliant += other.compliant
+        for name in TYPE_COLUMNS:
+            self.totals[name] += other.totals[name]
+        self.violations += other.violations
+        self.non_compliant_violations += other.non_compliant_violations
+        for value, count in other.histogram.items():
+            self.histogram[value] = self.histogram.get(value, 0) + count
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max, self.most_violated = other.max, other.most_violated
+        return self
+
+    def __add__(self, other):
+        return ViolationMetrics().merge(self).merge(other)
+
+    def state(self):
+        """A JSON-serializable copy of the state, e.g. to write a shard's partial result."""
+        return {
+            'sites': self.sites,
+            'compliant': self.compliant,
+            'totals': dict(self.totals),
+            'violations': self.violations,
+            'non_compliant_violations': self.non_compliant_violations,
+            'histogram': [[value, count] for value, count in sorted(self.histogram.items())],
+            'max': self.max,
+            'most_violated': self.most_violated,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        metrics = cls()
+        metrics.sites = state['sites']
+        metrics.compliant = state['compliant']
+        metrics.totals = dict(state['totals'])
+        metrics.violations = state['violations']
+        metrics.non_compliant_violations = state['non_compliant_violations']
+        metrics.histogram = {value: count for value, count in state['histogram']}
+        metrics.max = state['max']
+        metrics.most_violated = state['most_violated']
+        return metrics
+
+    def quantile(self, q):
+        """The q-quantile (0-1) of the violations per site, interpolated like pandas."""
+        if not self.sites:
+            return float('nan')
+        position = (self.sites - 1) * q
+        low, high = int(np.floor(position)), int(np.ceil(position))
+        values = sorted(self.histogram.items())
+        bounds = np.cumsum([count for _, count in values])
+        below = values[int(np.searchsorted(bounds, low, side='right'))][0]
+        above = values[int(np.searchsorted(bounds, high, side='right'))][0]
+        return below + (above - below) * (position - low)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def metrics(self):
+        """The dict of analyze_full_study.calculate_metrics."""
+        non_compliant = self.sites - self.compliant
+        return {
+            'Total Sites': self.sites,
+            'Compliant Sites': self.compliant,
+            'Non-Compliant Sites': non_compliant,
+            'Compliance Rate (%)': _ratio(self.compliant, self.sites) * 100,
+            'Non-Compliance Rate (%)': _ratio(non_compliant, self.sites) * 100,
+            'Total Violations Detected': self.violations,
+            'Avg Violations (All Sites)': _ratio(self.violations, self.sites),
+            'Avg Violations (Non-Compliant)':
+                _ratio(self.non_compliant_violations, non_compliant) if non_compliant else 0,
+            'ID Leaking Total': self.totals['ID Leaking'],
+            'Cookie Sync Total': self.totals['Cookie Sync'],
+            'Fingerprinting Total': self.totals['Fingerprinting'],
+            'ID Leaking (%)': _ratio(self.totals['ID Leaking'], self.violations) * 100,
+            'Cookie Sync (%)': _ratio(self.totals['Cookie Sync'], self.violations) * 100,
+            'Fingerprinting (%)': _ratio(self.totals['Fingerprinting'], self.violations) * 100,
+        }
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("Usage: python violation_metrics.py [run_id]")
+        return
+    metrics = ViolationMetrics.from_store(args[0] if args else None)
+    for key, value in metrics.metrics().items():
+        print(f"{key}: {value}")
+    print(f"Median Violations: {metrics.median()}")
+    print(f"Max Violations: {metrics.max} ({metrics.most_violated})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,40 @@
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 11
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from figures import FigureJob, capture_style, render_figures
+from report_engine import Report
+from result_schema import export_frame
 
-EU_TLDS = [
-    '.uk', '.de', '.fr', '.es', '.it', '.nl', '.be', '.pl', '.se', '.dk',
-    '.fi', '.no', '.ie', '.at', '.pt', '.cz', '.gr', '.hu', '.ro', '.eu'
-]
 
-EU_DOMAINS = [
-    'bbc.', 'theguardian.', 'telegraph.', 'dailymail.',
-    'spiegel.', 'bild.',
-    'lemonde.', 'lefigaro.',
-    'elpais.', 'elmundo.',
-    'corriere.', 'repubblica.',
-]
+def apply_style():
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 8)
+    plt.rcParams['font.size'] = 11
 
 
-def classify_region(domain):
-    domain_lower = domain.lower()
-    for tld in EU_TLDS:
-        if domain_lower.endswith(tld):
-            return 'EU'
-    for eu_domain in EU_DOMAINS:
-        if eu_domain in domain_lower:
-            return 'EU'
-    return 'US'
+apply_style()
+STYLE = capture_style(apply_style)
+
+REGION_COLUMNS = ['Website', 'ID_Leaking', 'Cookie_Sync', 'Fingerprinting',
+                  'Total_Violations', 'Compliant', 'Region']
 
 
 def load_and_classify_data():
-    df = pd.read_excel('Result.xlsx')
-    df = df.rename(columns={
-        'ID_Leaking_Count': 'ID_Leaking',
-        'Cookie_Sync_Count': 'Cookie_Sync',
-        'Fingerprinting_Count': 'Fingerprinting',
-        'Is_Compliant': 'Compliant'
-    })
-    df['Compliant'] = df['Compliant'].map({True: 'Yes', False: 'No'})
-    df['Region'] = df['Website'].apply(classify_region)
-    return df
-
-
-def create_comparison_visualizations(df):
-    output_dir = Path('visualization')
-    output_dir.mkdir(exist_ok=True)
+    return Report.load().sites[REGION_COLUMNS]
+
 
-    eu_df = df[df['Region'] == 'EU']
-    us_df = df[df['Region'] == 'US']
+def plot_summary_table(path, by_region, dpi):
+    eu = by_region.loc['EU']
+    us = by_region.loc['US']
+    eu_count, us_count = int(eu['Count']), int(us['Count'])
+    eu_compliant, us_compliant = int(eu['Compliant_Count']), int(us['Compliant_Count'])
 
-    eu_compliant_pct = len(eu_df[eu_df['Compliant'] == 'Yes']) / len(eu_df) * 100
-    us_compliant_pct = len(us_df[us_df['Compliant'] == 'Yes']) / len(us_df) * 100
+    eu_compliant_pct = eu_compliant / eu_count * 100
+    us_compliant_pct = us_compliant / us_count * 100
     eu_noncompliant_pct = 100 - eu_compliant_pct
     us_noncompliant_pct = 100 - us_compliant_pct
 
@@ -64,34 +45,34 @@ def create_comparison_visualizations(df):
     summary_data = [
         ['Metric', 'EU', 'US', 'Difference'],
         ['', '', '', ''],
-        ['Total Websites', f'{len(eu_df)}', f'{len(us_df)}', f'{len(us_df) - len(eu_df):+d}'],
+        ['Total Websites', f'{eu_count}', f'{us_count}', f'{us_count - eu_count:+d}'],
         ['', '', '', ''],
         ['Compliant Websites',
-         f'{len(eu_df[eu_df["Compliant"] == "Yes"])} ({eu_compliant_pct:.1f}%)',
-         f'{len(us_df[us_df["Compliant"] == "Yes"])} ({us_compliant_pct:.1f}%)',
+         f'{eu_compliant} ({eu_compliant_pct:.1f}%)',
+         f'{us_compliant} ({us_compliant_pct:.1f}%)',
          f'{us_compliant_pct - eu_compliant_pct:+.1f}%'],
         ['Non-Compliant Websites',
-         f'{len(eu_df[eu_df["Compliant"] == "No"])} ({eu_noncompliant_pct:.1f}%)',
-         f'{len(us_df[us_df["Compliant"] == "No"])} ({us_noncompliant_pct:.1f}%)',
+         f'{eu_count - eu_compliant} ({eu_noncompliant_pct:.1f}%)',
+         f'{us_count - us_compliant} ({us_noncompliant_pct:.1f}%)',
          f'{us_noncompliant_pct - eu_noncompliant_pct:+.1f}%'],
         ['', '', '', ''],
         ['Avg Violations per Website',
-         f'{eu_df["Total_Violations"].mean():.2f}',
-         f'{us_df["Total_Violations"].mean():.2f}',
-         f'{us_df["Total_Violations"].mean() - eu_df["Total_Violations"].mean():+.2f}'],
+         f'{eu["Avg_Violations"]:.2f}',
+         f'{us["Avg_Violations"]:.2f}',
+         f'{us["Avg_Violations"] - eu["Avg_Violations"]:+.2f}'],
         ['', '', '', ''],
         ['Avg ID Leaking',
-         f'{eu_df["ID_Leaking"].mean():.2f}',
-         f'{us_df["ID_Leaking"].mean():.2f}',
-         f'{us_df["ID_Leaking"].mean() - eu_df["ID_Leaking"].mean():+.2f}'],
+         f'{eu["Avg_ID_Leaking"]:.2f}',
+         f'{us["Avg_ID_Leaking"]:.2f}',
+         f'{us["Avg_ID_Leaking"] - eu["Avg_ID_Leaking"]:+.2f}'],
         ['Avg Cookie Sync',
-         f'{eu_df["Cookie_Sync"].mean():.2f}',
-         f'{us_df["Cookie_Sync"].mean():.2f}',
-         f'{us_df["Cookie_Sync"].mean() - eu_df["Cookie_Sync"].mean():+.2f}'],
+         f'{eu["Avg_Cookie_Sync"]:.2f}',
+         f'{us["Avg_Cookie_Sync"]:.2f}',
+         f'{us["Avg_Cookie_Sync"] - eu["Avg_Cookie_Sync"]:+.2f}'],
         ['Avg Fingerprinting',
-         f'{eu_df["Fingerprinting"].mean():.2f}',
-         f'{us_df["Fingerprinting"].mean():.2f}',
-         f'{us_df["Fingerprinting"].mean() - eu_df["Fingerprinting"].mean():+.2f}'],
+         f'{eu["Avg_Fingerprinting"]:.2f}',
+         f'{us["Avg_Fingerprinting"]:.2f}',
+         f'{us["Avg_Fingerprinting"] - eu["Avg_Fingerprinting"]:+.2f}'],
     ]
 
     table = ax.table(cellText=summary_data, cellLoc='center',
@@ -130,15 +111,32 @@ def create_comparison_visualizations(df):
     plt.title('EU vs US Compliance Comparison Summary\n(Reject All Scenario)',
               fontsize=16, fontweight='bold', pad=20)
 
-    plt.savefig(output_dir / 'eu_vs_us_summary_table.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
 
-def main():
-    df = load_and_classify_data()
-    create_comparison_visualizations(df)
+def figure_jobs(report):
+    output_dir = Path('visualization')
+    output_dir.mkdir(exist_ok=True)
+    return [
+        FigureJob(output_dir / 'eu_vs_us_summary_table.png', plot_summary_table,
+                  report.by_region.loc[['EU', 'US']], {'dpi': 300}, STYLE),
+    ]
+
+
+def create_comparison_visualizations(report):
+    return render_figures(figure_jobs(report))
+
+
+def write_reports(report, figures=True):
+    if figures:
+        create_comparison_visualizations(report)
     output_file = Path('visualization/result250_with_regions.csv')
-    df.to_csv(output_file, index=False)
+    export_frame(report.sites[REGION_COLUMNS]).to_csv(output_file, index=False)
+
+
+def main():
+    write_reports(Report.load())
 
 
 if __name__ == '__main__':
@@ -1,32 +1,32 @@
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 11
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from figures import FigureJob, capture_style, render_figures
+from report_engine import Report
+from result_schema import sort_by_count
+
+
+def apply_style():
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 8)
+    plt.rcParams['font.size'] = 11
+
+
+apply_style()
+STYLE = capture_style(apply_style)
 
 
 def load_data():
-    df = pd.read_excel('Result.xlsx')
-    df = df.rename(columns={
-        'ID_Leaking_Count': 'ID_Leaking',
-        'Cookie_Sync_Count': 'Cookie_Sync',
-        'Fingerprinting_Count': 'Fingerprinting',
-        'Is_Compliant': 'Compliant'
-    })
-    df['Compliant'] = df['Compliant'].map({True: 'Yes', False: 'No'})
-    return df
-
-
-def create_visualizations(df):
-    output_dir = Path('visualization')
-    output_dir.mkdir(exist_ok=True)
+    return Report.load().sites
 
-    # 1. Compliance Overview - Bar Chart
+
+def plot_compliance_overview(path, data, dpi):
+    compliance_counts, n = data['counts'], data['n']
     fig, ax = plt.subplots(figsize=(10, 6))
-    compliance_counts = df['Compliant'].value_counts()
     colors = ['#2ecc71', '#e74c3c']
     bars = ax.bar(compliance_counts.index, compliance_counts.values, color=colors, alpha=0.8, edgecolor='black', linewidth=1.5)
     ax.set_xlabel('Compliance Status', fontsize=14, fontweight='bold')
@@ -36,15 +36,15 @@ def create_visualizations(df):
     for bar in bars:
         height = bar.get_height()
         ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{int(height)}\n({height/len(df)*100:.1f}%)',
+                f'{int(height)}\n({height/n*100:.1f}%)',
                 ha='center', va='bottom', fontsize=13, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(output_dir / 'compliance_overview.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-    # 2. Violation Types Distribution - Bar Chart
+
+def plot_violation_types(path, violation_data, dpi):
     fig, ax = plt.subplots(figsize=(12, 7))
-    violation_data = df[['ID_Leaking', 'Cookie_Sync', 'Fingerprinting']].sum()
     colors_violations = ['#e74c3c', '#f39c12', '#9b59b6']
     bars = ax.bar(violation_data.index, violation_data.values, color=colors_violations, alpha=0.8, edgecolor='black', linewidth=1.5)
     ax.set_xlabel('Violation Type', fontsize=14, fontweight='bold')
@@ -57,12 +57,13 @@ def create_visualizations(df):
                 f'{int(height)}',
                 ha='center', va='bottom', fontsize=13, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(output_dir / 'violation_types_distribution.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-    # 3. Top 20 Violators - Horizontal Bar Chart
+
+def plot_top_violators(path, top_violators, dpi):
     fig, ax = plt.subplots(figsize=(12, 10))
-    top_violators = df.nlargest(20, 'Total_Violations')[['Website', 'Total_Violations']].sort_values('Total_Violations')
+    top_violators = sort_by_count(top_violators, 'Total_Violations')
     bars = ax.barh(top_violators['Website'], top_violators['Total_Violations'],
                    color='#e74c3c', alpha=0.7, edgecolor='black', linewidth=1)
     ax.set_xlabel('Total Violations', fontsize=14, fontweight='bold')
@@ -74,13 +75,13 @@ def create_visualizations(df):
                 f'{int(val)}',
                 ha='left', va='center', fontsize=10, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(output_dir / 'top_violators_ranking.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-    # 4. Violation Type Breakdown - Stacked Horizontal Bar for Top 15
+
+def plot_violation_breakdown(path, top15_temp, dpi):
     fig, ax = plt.subplots(figsize=(14, 10))
-    top15_temp = df.nlargest(15, 'Total_Violations')[['Website', 'ID_Leaking', 'Cookie_Sync', 'Fingerprinting', 'Total_Violations']]
-    top15 = top15_temp.sort_values('Total_Violations')
+    top15 = sort_by_count(top15_temp, 'Total_Violations')
     y_pos = range(len(top15))
     p1 = ax.barh(y_pos, top15['ID_Leaking'], color='#e74c3c', label='ID Leaking', alpha=0.8, edgecolor='black', linewidth=0.5)
     p2 = ax.barh(y_pos, top15['Cookie_Sync'], left=top15['ID_Leaking'],
@@ -96,12 +97,13 @@ def create_visualizations(df):
                  fontsize=16, fontweight='bold', pad=20)
     ax.legend(loc='lower right', fontsize=12, framealpha=0.9)
     plt.tight_layout()
-    plt.savefig(output_dir / 'violation_breakdown_top15.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-    # 5. Compliance Rate by Violation Severity - Pie Chart
+
+def plot_compliance_severity(path, data, dpi):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
-    compliance_counts = df['Compliant'].value_counts()
+    compliance_counts = data['compliance']
     colors_pie = ['#2ecc71', '#e74c3c']
     explode = (0.1, 0)
     wedges1, texts1, autotexts1 = ax1.pie(compliance_counts.values, labels=compliance_counts.index,
@@ -112,18 +114,7 @@ def create_visualizations(df):
     ax1.set_title('Overall Compliance Status\n(Reject All Scenario, N=222)',
                   fontsize=14, fontweight='bold', pad=15)
 
-    def categorize_severity(violations):
-        if violations == 0:
-            return 'Compliant (0)'
-        elif violations <= 2:
-            return 'Low (1-2)'
-        elif violations <= 5:
-            return 'Medium (3-5)'
-        else:
-            return 'High (6+)'
-
-    df['Severity'] = df['Total_Violations'].apply(categorize_severity)
-    severity_counts = df['Severity'].value_counts()
+    severity_counts = data['severity']
     colors_severity = ['#2ecc71', '#f1c40f', '#e67e22', '#e74c3c']
     wedges2, texts2, autotexts2 = ax2.pie(severity_counts.values, labels=severity_counts.index,
                                             autopct='%1.1f%%',
@@ -133,32 +124,38 @@ def create_visualizations(df):
     ax2.set_title('Violation Severity Distribution\n(Reject All Scenario, N=222)',
                   fontsize=14, fontweight='bold', pad=15)
     plt.tight_layout()
-    plt.savefig(output_dir / 'compliance_severity_distribution.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
-    # 6. Summary Statistics Table
-    fig, ax = plt.subplots(figsize=(12, 8))
-    ax.axis('tight')
-    ax.axis('off')
-    summary_data = [
+
+def summary_table_data(report):
+    summary = report.summary
+    totals = report.violation_totals
+    return [
         ['Metric', 'Value'],
         ['', ''],
-        ['Total Websites Analyzed', f"{len(df)}"],
-        ['Compliant Websites', f"{len(df[df['Compliant'] == 'Yes'])} ({len(df[df['Compliant'] == 'Yes'])/len(df)*100:.1f}%)"],
-        ['Non-Compliant Websites', f"{len(df[df['Compliant'] == 'No'])} ({len(df[df['Compliant'] == 'No'])/len(df)*100:.1f}%)"],
+        ['Total Websites Analyzed', f"{summary['count']}"],
+        ['Compliant Websites', f"{summary['compliant']} ({summary['compliant']/summary['count']*100:.1f}%)"],
+        ['Non-Compliant Websites', f"{summary['non_compliant']} ({summary['non_compliant']/summary['count']*100:.1f}%)"],
         ['', ''],
-        ['Total ID Leaking Violations', f"{df['ID_Leaking'].sum():.0f}"],
-        ['Total Cookie Sync Violations', f"{df['Cookie_Sync'].sum():.0f}"],
-        ['Total Fingerprinting Violations', f"{df['Fingerprinting'].sum():.0f}"],
-        ['Total All Violations', f"{df['Total_Violations'].sum():.0f}"],
+        ['Total ID Leaking Violations', f"{totals['ID_Leaking']:.0f}"],
+        ['Total Cookie Sync Violations', f"{totals['Cookie_Sync']:.0f}"],
+        ['Total Fingerprinting Violations', f"{totals['Fingerprinting']:.0f}"],
+        ['Total All Violations', f"{report.metrics['Total Violations Detected']:.0f}"],
         ['', ''],
-        ['Average Violations per Website', f"{df['Total_Violations'].mean():.2f}"],
-        ['Median Violations per Website', f"{df['Total_Violations'].median():.0f}"],
-        ['Max Violations (Single Site)', f"{df['Total_Violations'].max():.0f}"],
+        ['Average Violations per Website', f"{summary['mean']:.2f}"],
+        ['Median Violations per Website', f"{summary['median']:.0f}"],
+        ['Max Violations (Single Site)', f"{summary['max']:.0f}"],
         ['', ''],
-        ['Most Violated Site', f"{df.loc[df['Total_Violations'].idxmax(), 'Website']}"],
-        ['Violations Count', f"{df['Total_Violations'].max():.0f}"],
+        ['Most Violated Site', f"{summary['most_violated']}"],
+        ['Violations Count', f"{summary['max']:.0f}"],
     ]
+
+
+def plot_summary_statistics(path, summary_data, dpi):
+    fig, ax = plt.subplots(figsize=(12, 8))
+    ax.axis('tight')
+    ax.axis('off')
     table = ax.table(cellText=summary_data, cellLoc='left',
                      colWidths=[0.6, 0.4],
                      loc='center',
@@ -182,13 +179,43 @@ def create_visualizations(df):
         cell.set_linewidth(1)
     plt.title('GDPR Cookie Compliance Summary Statistics\n(Reject All Scenario, N=222)',
               fontsize=16, fontweight='bold', pad=20)
-    plt.savefig(output_dir / 'summary_statistics.png', dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
 
 
+def figure_jobs(report):
+    """One FigureJob per chart, each with only the data it plots."""
+    output_dir = Path('visualization')
+    output_dir.mkdir(exist_ok=True)
+    params = {'dpi': 300}
+    return [
+        FigureJob(output_dir / 'compliance_overview.png', plot_compliance_overview,
+                  {'counts': report.compliance_counts, 'n': len(report.sites)}, params, STYLE),
+        FigureJob(output_dir / 'violation_types_distribution.png', plot_violation_types,
+                  report.violation_totals, params, STYLE),
+        FigureJob(output_dir / 'top_violators_ranking.png', plot_top_violators,
+                  report.top_violators(20)[['Website', 'Total_Violations']], params, STYLE),
+        FigureJob(output_dir / 'violation_breakdown_top15.png', plot_violation_breakdown,
+                  report.top_violators(15)[['Website', 'ID_Leaking', 'Cookie_Sync', 'Fingerprinting', 'Total_Violations']],
+                  params, STYLE),
+        FigureJob(output_dir / 'compliance_severity_distribution.png', plot_compliance_severity,
+                  {'compliance': report.compliance_counts, 'severity': report.severity_counts}, params, STYLE),
+        FigureJob(output_dir / 'summary_statistics.png', plot_summary_statistics,
+                  summary_table_data(report), params, STYLE),
+    ]
+
+
+def create_visualizations(report):
+    return render_figures(figure_jobs(report))
+
+
+def write_reports(report, figures=True):
+    if figures:
+        create_visualizations(report)
+
+
 def main():
-    df = load_data()
-    create_visualizations(df)
+    write_reports(Report.load())
 
 
 if __name__ == '__main__':